@@ -0,0 +1,112 @@
+"""
+Pure allocation algorithms.
+
+Nothing in here talks to a database or prints: every function takes plain
+in-memory structures and returns new ones, so the same engine can run against
+Supabase, test fixtures or an offline snapshot (see data_sources.py).
+"""
+import hashlib
+
+# Interview slots each company offers, and interviews each student can get
+INTERVIEW_CAPACITY = 6
+INTERVIEWS_PER_STUDENT = 3
+
+# Positions assumed for a company when no real count is known
+DEFAULT_POSITIONS = 2
+
+
+def tie_break_key(student_id, seed):
+    """A pseudo-random number for a student, the same in every process and run for one seed"""
+    digest = hashlib.blake2b(f"{seed}:{student_id}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def order_students(students, seed):
+    """Students by QCA, highest first, with equal QCAs in an order drawn from seed
+
+    Unknown QCAs come first, as Postgres sorts NULLs in descending order. Unlike
+    ordering ties by StudentID, no student is favoured by the ID they were given,
+    and the same seed always gives the same order.
+    """
+    return sorted(students, key=lambda s: (s["QCA"] is not None, -float(s["QCA"] or 0),
+                                           tie_break_key(s["StudentID"], seed)))
+
+
+def allocate_interview_slots(students, rankings, capacity=INTERVIEW_CAPACITY,
+                             per_student=INTERVIEWS_PER_STUDENT, capacities=None):
+    """Greedy interview allocation in the order students are given
+
+    students is a list of {"StudentID", ...} rows already in priority (QCA) order,
+    rankings maps StudentID to that student's preferences sorted by rank. Each
+    student gets up to per_student of their preferred companies that still have
+    fewer interviewees than their capacity: capacities[CompanyID] if given,
+    otherwise capacity. Returns {StudentID: [CompanyID, ...]}.
+    """
+    capacities = capacities or {}
+    allocation_counts = {}
+    student_allocations = {}
+
+    for student in students:
+        student_id = student["StudentID"]
+        allocated = []
+
+        for pref in rankings.get(student_id, []):
+            company_id = pref["CompanyID"]
+            current_count = allocation_counts.get(company_id, 0)
+
+            if current_count < capacities.get(company_id, capacity):
+                allocation_counts[company_id] = current_count + 1
+                allocated.append(company_id)
+
+                if len(allocated) >= per_student:
+                    break
+
+        student_allocations[student_id] = allocated
+
+    return student_allocations
+
+
+def score_pairs(interview_pairs, student_ranks, company_ranks, qcas):
+    """Join interview pairs with both rank indexes and QCA, keeping pairs ranked by both sides"""
+    matches = []
+    for pair in interview_pairs:
+        student_id = pair["StudentID"]
+        company_id = pair["CompanyID"]
+        s_rank = student_ranks.get((student_id, company_id))
+        c_rank = company_ranks.get((student_id, company_id))
+
+        # Only consider pairs where both have ranked each other
+        if s_rank is not None and c_rank is not None:
+            matches.append({
+                "StudentID": student_id,
+                "CompanyID": company_id,
+                "CombinedScore": s_rank + c_rank,
+                "QCA": qcas.get(student_id)
+            })
+    return matches
+
+
+def match_greedy(matches, company_positions):
+    """Assign students to companies by best combined score, then highest QCA
+
+    Returns (final_matches, company_allocations) where company_allocations counts
+    the students placed at each company in company_positions.
+    """
+    # Sort by lowest combined score (best match), then highest QCA
+    ordered = sorted(matches, key=lambda m: (m["CombinedScore"], -m["QCA"] if m["QCA"] is not None else 0))
+
+    assigned_students = set()
+    company_allocations = {cid: 0 for cid in company_positions}
+    final_matches = []
+
+    for match in ordered:
+        sid = match["StudentID"]
+        cid = match["CompanyID"]
+
+        # Only allocate if the student is still free and the company has room
+        if sid not in assigned_students and company_allocations[cid] < company_positions[cid]:
+            final_matches.append(match)
+            assigned_students.add(sid)
+            company_allocations[cid] += 1
+
+    return final_matches, company_allocations
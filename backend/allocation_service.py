@@ -0,0 +1,404 @@
+"""
+A long-running service that runs allocation jobs and reports their progress.
+
+Jobs are submitted over HTTP (or with AllocationService.submit) and run on a
+pool of worker threads:
+
+    POST /jobs                  {"kind": "interviews", "cohort": "default", "params": {...}}
+    GET  /jobs                  every job, newest last
+    GET  /jobs/<id>             one job, with its result once it has finished
+    GET  /jobs/<id>/events      the job's progress as a server-sent event stream
+
+A job's kind is one of JOB_PARAMETERS: the interview stage, the final match, or
+a what-if comparison of scenarios (see scenarios.py). Its params are passed on
+to allocate_interviews, run_final_match or run_scenarios.
+
+Starting a job rewrites InterviewAllocated or FinalMatches, and job results name
+students, so every request needs the service's shared token as
+"Authorization: Bearer <token>", and only the configured frontend origin is
+allowed to call the service from a browser. The newest max_finished_jobs
+finished jobs are kept for GET; older ones are forgotten.
+
+A cohort is one database, named in the job. Jobs of the same cohort run one at a
+time, in the order they were submitted, so two runs never write the same tables
+at once; jobs of different cohorts run in parallel. Each cohort keeps its client,
+an EntityCache of names and a CapacityCache of Position openings between jobs,
+each for a limited number of seconds, so only the first job in that time pays for
+reading the reference data. Progress events are the phases of the job's RunReport.
+
+    ALLOCATION_SERVICE_TOKEN=... python -m backend.allocation_service --port 8765 --workers 2
+"""
+import argparse
+import hmac
+import json
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from backend.capacities import CapacityCache
+from backend.data_sources import SupabaseDataSource
+from backend.entity_cache import EntityCache
+from backend.instrumentation import RunReport
+from backend.supabase_client import get_client
+
+logger = logging.getLogger(__name__)
+
+# Parameters each kind of job accepts
+JOB_PARAMETERS = {
+    "interviews": {"allocator", "capacity", "per_student", "tie_break_seed", "workers"},
+    "final_match": {"algorithm"},
+    "what_if": {"scenarios", "max_workers"},
+}
+
+DEFAULT_COHORT = "default"
+DEFAULT_WORKERS = 2
+
+# Seconds Position openings, and company and student names, are reused between jobs of a cohort
+DEFAULT_CAPACITY_TTL = 300
+DEFAULT_ENTITY_TTL = 300
+
+# Finished jobs kept for GET /jobs; the oldest are dropped past this
+DEFAULT_MAX_FINISHED_JOBS = 100
+
+# Seconds an event stream waits for news before sending a keep-alive comment
+KEEP_ALIVE_INTERVAL = 15
+
+# Shared secret every request must carry, and the one browser origin allowed to call the service
+TOKEN_VARIABLE = "ALLOCATION_SERVICE_TOKEN"
+ORIGIN_VARIABLE = "ALLOCATION_SERVICE_ORIGIN"
+# Vite's dev server
+DEFAULT_ORIGIN = "http://localhost:5173"
+
+
+class Job:
+    """One allocation job: its state, progress events and, once finished, result or error"""
+
+    def __init__(self, kind, cohort, params):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.cohort = cohort
+        self.params = params
+        self.status = "queued"
+        self.events = []
+        self.result = None
+        self.error = None
+        self.created_at = _now()
+        self.started_at = None
+        self.finished_at = None
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in ("succeeded", "failed")
+
+    def emit(self, event):
+        """Record a progress event and wake anyone streaming this job"""
+        with self._changed:
+            self.events.append(dict(event, job=self.id, seq=len(self.events), time=_now()))
+            self._changed.notify_all()
+
+    def set_status(self, status, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+        self.status = status
+        self.emit({"status": status})
+
+    def wait_for_events(self, after, timeout=None):
+        """Events from index after on, waiting up to timeout for one if there are none yet"""
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.events) > after or self.finished, timeout)
+            return self.events[after:]
+
+    def stream(self, timeout=None):
+        """Yield every event of the job as it happens, ending when the job has finished"""
+        seen = 0
+        while True:
+            events = self.wait_for_events(seen, timeout)
+            yield from events
+            seen += len(events)
+            if self.finished and seen == len(self.events):
+                return
+            if not events:
+                # Nothing happened within timeout
+                yield None
+
+    def wait(self, timeout=None):
+        """Block until the job has finished; True if it has"""
+        with self._changed:
+            return self._changed.wait_for(lambda: self.finished, timeout)
+
+    def to_dict(self, events=False):
+        data = {
+            "id": self.id, "kind": self.kind, "cohort": self.cohort, "params": self.params,
+            "status": self.status, "created_at": self.created_at, "started_at": self.started_at,
+            "finished_at": self.finished_at, "result": self.result, "error": self.error,
+        }
+        if events:
+            data["events"] = list(self.events)
+        return data
+
+
+class Cohort:
+    """A database and everything kept warm for it between jobs"""
+
+    def __init__(self, name, client, capacity_ttl=DEFAULT_CAPACITY_TTL, entity_ttl=DEFAULT_ENTITY_TTL):
+        self.name = name
+        self.client = client
+        self.entity_cache = EntityCache(ttl=entity_ttl)
+        self.capacities = CapacityCache(ttl=capacity_ttl)
+        self.source = SupabaseDataSource(client, entity_cache=self.entity_cache)
+        # Jobs waiting for the one running now, oldest first
+        self.pending = []
+        self.running = None
+
+
+class AllocationService:
+    """Runs allocation jobs on a worker pool, one job per cohort at a time
+
+    clients maps cohort names to Supabase clients. A cohort that is not in it
+    gets its client from client_factory(name), by default the shared client for
+    the default cohort only. token is the secret every HTTP request must carry;
+    without one the HTTP API refuses everything. allowed_origin is the browser
+    origin sent in CORS headers.
+    """
+
+    def __init__(self, clients=None, workers=DEFAULT_WORKERS, capacity_ttl=DEFAULT_CAPACITY_TTL,
+                 client_factory=None, token=None, allowed_origin=DEFAULT_ORIGIN, entity_ttl=DEFAULT_ENTITY_TTL,
+                 max_finished_jobs=DEFAULT_MAX_FINISHED_JOBS):
+        self.clients = dict(clients or {})
+        self.token = token
+        self.allowed_origin = allowed_origin
+        self.client_factory = client_factory or _default_client
+        self.capacity_ttl = capacity_ttl
+        self.entity_ttl = entity_ttl
+        self.max_finished_jobs = max_finished_jobs
+        self.cohorts = {}
+        self.jobs = {}
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="allocation")
+        self.lock = threading.Lock()
+
+    def submit(self, kind, cohort=DEFAULT_COHORT, params=None):
+        """Queue a job and return it; it starts once its cohort has no other job running"""
+        params = dict(params or {})
+        if kind not in JOB_PARAMETERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        unknown = set(params) - JOB_PARAMETERS[kind]
+        if unknown:
+            raise ValueError(f"Unknown parameters for {kind}: {', '.join(sorted(unknown))}")
+        if kind == "what_if" and not params.get("scenarios"):
+            raise ValueError("A what_if job needs a list of scenarios")
+
+        job = Job(kind, cohort, params)
+        with self.lock:
+            target = self._cohort(cohort)
+            self.jobs[job.id] = job
+            job.emit({"status": "queued"})
+            if target.running is None:
+                self._start(target, job)
+            else:
+                target.pending.append(job)
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def authorized(self, header):
+        """Whether an Authorization header carries this service's token"""
+        if not self.token or not header or not header.startswith("Bearer "):
+            return False
+        return hmac.compare_digest(header[len("Bearer "):].encode(), self.token.encode())
+
+    def shutdown(self, wait=True):
+        self.pool.shutdown(wait=wait)
+
+    def _cohort(self, name):
+        if name not in self.cohorts:
+            client = self.clients[name] if name in self.clients else self.client_factory(name)
+            if client is None:
+                raise ValueError(f"No database for cohort {name}")
+            self.cohorts[name] = Cohort(name, client, self.capacity_ttl, self.entity_ttl)
+        return self.cohorts[name]
+
+    def _start(self, cohort, job):
+        # Called with self.lock held
+        cohort.running = job
+        self.pool.submit(self._run, cohort, job)
+
+    def _run(self, cohort, job):
+        job.set_status("running", started_at=_now())
+        try:
+            result = run_job(cohort, job)
+        except Exception as e:
+            logger.exception("Job %s (%s for %s) failed", job.id, job.kind, cohort.name)
+            job.set_status("failed", error=str(e), finished_at=_now())
+        else:
+            job.set_status("succeeded", result=result, finished_at=_now())
+        finally:
+            with self.lock:
+                cohort.running = None
+                self._forget_finished()
+                if cohort.pending:
+                    self._start(cohort, cohort.pending.pop(0))
+
+    def _forget_finished(self):
+        # Called with self.lock held; jobs are in submission order, so the oldest go first
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(len(finished) - self.max_finished_jobs, 0)]:
+            del self.jobs[job_id]
+
+    # HTTP -----------------------------------------------------------------
+
+    def make_server(self, host="127.0.0.1", port=0):
+        """An HTTP server for this service; call serve_forever() on it, or run it on a thread"""
+        server = ThreadingHTTPServer((host, port), _handler_for(self))
+        server.daemon_threads = True
+        return server
+
+
+def run_job(cohort, job):
+    """Run one job against its cohort's warm source, returning its result as plain data"""
+    report = RunReport(job.kind, listener=job.emit)
+    params = job.params
+    if job.kind == "interviews":
+        # Imported here so the service starts without loading the allocation modules' dependencies
+        from backend.interview_allocation import allocate_interviews
+        allocations = allocate_interviews(source=cohort.source, capacity_cache=cohort.capacities, report=report,
+                                          **params)
+        return {"students": len(allocations), "interviews": sum(len(c) for c in allocations.values()),
+                "report": report.to_dict()}
+    if job.kind == "final_match":
+        from backend.position_allocation import run_final_match
+        matches = run_final_match(source=cohort.source, capacity_cache=cohort.capacities, report=report, **params)
+        return {"matches": len(matches), "report": report.to_dict()}
+
+    from backend.scenarios import run_scenarios
+    with report.run(cohort.source):
+        with report.phase("scenarios"):
+            rows = run_scenarios(params["scenarios"], source=cohort.source, max_workers=params.get("max_workers"))
+    return {"scenarios": rows, "report": report.to_dict()}
+
+
+def _default_client(name):
+    return get_client() if name == DEFAULT_COHORT else None
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def _handler_for(service):
+    class Handler(BaseHTTPRequestHandler):
+        def do_OPTIONS(self):
+            # CORS preflight from the frontend
+            self.send_response(204)
+            self._cors()
+            self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
+            self.send_header("Access-Control-Allow-Headers", "Authorization, Content-Type")
+            self.end_headers()
+
+        def do_POST(self):
+            if urlsplit(self.path).path.rstrip("/") != "/jobs":
+                return self._send(404, {"error": "Not found"})
+            if not service.authorized(self.headers.get("Authorization")):
+                return self._send(401, {"error": "Missing or wrong token"})
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                job = service.submit(body.get("kind"), body.get("cohort", DEFAULT_COHORT), body.get("params"))
+            except (ValueError, AttributeError) as e:
+                return self._send(400, {"error": str(e)})
+            self._send(202, job.to_dict())
+
+        def do_GET(self):
+            if not service.authorized(self.headers.get("Authorization")):
+                return self._send(401, {"error": "Missing or wrong token"})
+            parts = [part for part in urlsplit(self.path).path.split("/") if part]
+            if parts == ["jobs"]:
+                return self._send(200, [job.to_dict() for job in list(service.jobs.values())])
+            job = service.get(parts[1]) if len(parts) in (2, 3) and parts[0] == "jobs" else None
+            if job is None:
+                return self._send(404, {"error": "Not found"})
+            if len(parts) == 2:
+                return self._send(200, job.to_dict(events=True))
+            if parts[2] == "events":
+                return self._stream(job)
+            self._send(404, {"error": "Not found"})
+
+        def _stream(self, job):
+            self.send_response(200)
+            self._cors()
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            try:
+                for event in job.stream(timeout=KEEP_ALIVE_INTERVAL):
+                    self.wfile.write(b": keep-alive\n\n" if event is None
+                                     else f"data: {json.dumps(event)}\n\n".encode())
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                # The client stopped listening; the job carries on
+                pass
+
+        def _send(self, status, payload):
+            encoded = json.dumps(payload).encode()
+            self.send_response(status)
+            self._cors()
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(encoded)))
+            self.end_headers()
+            self.wfile.write(encoded)
+
+        def _cors(self):
+            # Only the frontend's origin; other pages cannot read responses or send the token
+            if service.allowed_origin:
+                self.send_header("Access-Control-Allow-Origin", service.allowed_origin)
+                self.send_header("Vary", "Origin")
+
+        def log_message(self, format, *args):
+            logger.debug("%s %s", self.address_string(), format % args)
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve allocation jobs over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="jobs run at once, across cohorts")
+    parser.add_argument("--capacity-ttl", type=float, default=DEFAULT_CAPACITY_TTL,
+                        help="seconds Position openings are reused between jobs")
+    parser.add_argument("--entity-ttl", type=float, default=DEFAULT_ENTITY_TTL,
+                        help="seconds company and student names are reused between jobs")
+    parser.add_argument("--max-finished-jobs", type=int, default=DEFAULT_MAX_FINISHED_JOBS,
+                        help="finished jobs kept for GET /jobs")
+    parser.add_argument("--allowed-origin", default=os.getenv(ORIGIN_VARIABLE, DEFAULT_ORIGIN),
+                        help=f"browser origin allowed to call the service (default ${ORIGIN_VARIABLE} or {DEFAULT_ORIGIN})")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    # Read from the environment only, so the secret stays out of the process list
+    token = os.getenv(TOKEN_VARIABLE)
+    if not token:
+        logger.error("Set %s to the token requests must carry", TOKEN_VARIABLE)
+        return 1
+    service = AllocationService(workers=args.workers, capacity_ttl=args.capacity_ttl, token=token,
+                                allowed_origin=args.allowed_origin, entity_ttl=args.entity_ttl,
+                                max_finished_jobs=args.max_finished_jobs)
+    server = service.make_server(args.host, args.port)
+    logger.info("Allocation service listening on http://%s:%d", *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown(wait=False)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
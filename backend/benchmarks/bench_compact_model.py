@@ -0,0 +1,82 @@
+"""
+Benchmark: peak memory of row dicts vs the compact array-backed model.
+
+The interview allocation's inputs are loaded from an in-memory cohort and the
+allocation is run, once on the dict structures and once on the compact model
+(see compact_model.py). tracemalloc reports the peak memory allocated while
+loading and running, and the number of live memory blocks the loaded inputs
+hold shows how many separate objects were kept. The cohort itself is built
+before tracing starts, so it is not counted. Times are taken under tracemalloc,
+which slows both models alike, and include sorting the cohort's rows. Results
+are checked to be identical.
+
+Run from the project root with
+    python -m backend.benchmarks.bench_compact_model
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+
+from backend.allocation_core import allocate_interview_slots
+from backend.benchmarks.cohort import make_cohort
+from backend.data_sources import InMemoryDataSource
+from backend.indexed_allocation import allocate_interview_slots_indexed
+
+
+def measure(load, run):
+    """(seconds under tracing, peak MB, memory blocks held by the inputs) of run(load())"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    inputs = load()
+    result = run(inputs)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result_blocks = sys.getallocatedblocks()
+    del inputs
+    gc.collect()
+    # What freeing the inputs gives back is what they were holding
+    held_blocks = result_blocks - sys.getallocatedblocks()
+    del result
+    return elapsed, peak / 2 ** 20, held_blocks
+
+
+def interview_inputs(source):
+    return source.load_students(), source.load_student_rankings()
+
+
+def compact_interview_inputs(source):
+    return source.load_students(), source.load_preferences()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--students", type=int, default=100000)
+    parser.add_argument("--companies", type=int, default=2000)
+    parser.add_argument("--prefs", type=int, default=10, help="preferences per student")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    source = InMemoryDataSource(make_cohort(args.students, args.companies, args.prefs, seed=args.seed,
+                                            popularity_skew=1.0))
+    expected = allocate_interview_slots(*interview_inputs(source))
+    assert allocate_interview_slots_indexed(*compact_interview_inputs(source)) == expected
+    del expected
+
+    runs = [
+        ("interviews", "dicts", lambda: interview_inputs(source), lambda i: allocate_interview_slots(*i)),
+        ("interviews", "compact", lambda: compact_interview_inputs(source),
+         lambda i: allocate_interview_slots_indexed(*i)),
+    ]
+    print(f"{args.students} students, {args.companies} companies, {args.prefs} preferences each")
+    print(f"{'stage':>11} {'model':>8} {'traced (s)':>10} {'peak (MB)':>10} {'input blocks':>13}")
+    for stage, model, load, run in runs:
+        elapsed, peak, held_blocks = measure(load, run)
+        print(f"{stage:>11} {model:>8} {elapsed:>10.2f} {peak:>10.1f} {held_blocks:>13}")
+
+
+if __name__ == "__main__":
+    main()
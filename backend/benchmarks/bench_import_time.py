@@ -0,0 +1,49 @@
+"""
+Benchmark: cold import time of the allocation modules.
+
+Each sample imports the modules in a fresh interpreter, which is what a test
+process, a forked worker or a CLI invocation pays before doing any work.
+Run from the project root with
+    python -m backend.benchmarks.bench_import_time
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+MODULES = ["backend.interview_allocation", "backend.position_allocation"]
+
+
+def time_import(statement, samples):
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], check=True, stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument("--max-overhead-ms", type=float, default=None,
+                        help="exit non-zero if importing costs more than this over a bare interpreter")
+    args = parser.parse_args()
+
+    baseline = time_import("pass", args.samples)
+    modules = time_import("import " + ", ".join(MODULES), args.samples)
+    client = time_import("import supabase", args.samples)
+    overhead_ms = (modules - baseline) * 1000
+
+    print(f"bare interpreter:      {baseline * 1000:8.1f} ms")
+    print(f"allocation modules:    {modules * 1000:8.1f} ms  (+{overhead_ms:.1f} ms)")
+    print(f"supabase package only: {client * 1000:8.1f} ms  (+{(client - baseline) * 1000:.1f} ms)")
+
+    if args.max_overhead_ms is not None and overhead_ms > args.max_overhead_ms:
+        print(f"Import overhead {overhead_ms:.1f} ms exceeds {args.max_overhead_ms} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark: dict-based greedy interview loop vs the indexed skip-pointer allocator.
+
+Both allocators run on the same in-memory cohort and their results are checked
+to be identical. The indexed allocator is timed end to end (including building
+its arrays from the row dicts) and for the allocation loop alone. Run from the project root with
+    python -m backend.benchmarks.bench_interview_allocator
+"""
+import argparse
+import time
+
+from backend.allocation_core import allocate_interview_slots
+from backend.benchmarks.cohort import make_cohort
+from backend.data_sources import InMemoryDataSource
+from backend.indexed_allocation import allocate_from_arrays, allocate_interview_slots_indexed, build_preference_arrays
+
+
+def best_time(allocator, students, rankings, repeats):
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = allocator(students, rankings)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--students", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--companies", type=int, default=500)
+    parser.add_argument("--prefs", type=int, default=20)
+    parser.add_argument("--skew", type=float, default=1.0, help="company popularity skew")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'students':>9} {'prefs':>6} {'dict loop (s)':>14} {'indexed (s)':>12} {'arrays only (s)':>16}")
+    for n_students in args.students:
+        source = InMemoryDataSource(make_cohort(n_students, args.companies, args.prefs, popularity_skew=args.skew))
+        students = source.load_students()
+        rankings = source.load_student_rankings()
+
+        old_time, old = best_time(allocate_interview_slots, students, rankings, args.repeats)
+        new_time, new = best_time(allocate_interview_slots_indexed, students, rankings, args.repeats)
+        if old != new:
+            raise SystemExit(f"Allocators disagree for {n_students} students")
+
+        pref_start, pref_company, company_ids = build_preference_arrays(students, rankings)
+        room = [6] * len(company_ids)
+        loop_time, _ = best_time(lambda *_: allocate_from_arrays(pref_start, pref_company, room), None, None, args.repeats)
+        print(f"{n_students:>9} {args.prefs:>6} {old_time:>14.3f} {new_time:>12.3f} {loop_time:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmark: per-student StudentRank1 queries vs one paged bulk read.
+
+Run from the project root with
+    python -m backend.benchmarks.bench_interview_prefetch
+"""
+import argparse
+import time
+from unittest.mock import patch
+
+from backend import interview_allocation
+from backend.benchmarks.cohort import make_cohort
+from backend.fake_supabase import FakeSupabase
+
+
+def per_student_load(students):
+    return {s["StudentID"]: interview_allocation.get_student_rankings(s["StudentID"]) for s in students}
+
+
+def bulk_load(students, page_size):
+    return interview_allocation.get_all_student_rankings(page_size=page_size)
+
+
+def measure(client, loader, students, **kwargs):
+    client.reset_counters()
+    start = time.perf_counter()
+    loader(students, **kwargs)
+    return client.round_trips, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--students", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--companies", type=int, default=100)
+    parser.add_argument("--prefs", type=int, default=5)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="simulated latency per round trip")
+    args = parser.parse_args()
+
+    print(f"{'students':>9} {'per-student trips':>18} {'time (s)':>9} {'bulk trips':>11} {'time (s)':>9}")
+    for n_students in args.students:
+        client = FakeSupabase(make_cohort(n_students, args.companies, args.prefs), latency=args.latency_ms / 1000)
+        students = client.tables["Student"]
+        with patch.object(interview_allocation, "supabase", client):
+            old_trips, old_time = measure(client, per_student_load, students)
+            new_trips, new_time = measure(client, bulk_load, students, page_size=args.page_size)
+        print(f"{n_students:>9} {old_trips:>18} {old_time:>9.3f} {new_trips:>11} {new_time:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Benchmark suite: both allocation stages end to end against FakeSupabase.
+
+For each cohort size a seeded synthetic cohort is generated (see
+cohort.make_allocation_cohort), then allocate_interviews and run_final_match
+run through SupabaseDataSource over a FakeSupabase with simulated latency.
+With --backend http they run through the real supabase client instead, over
+HTTP to a LocalPostgREST server loaded with the cohort.
+Post-interview rankings are generated from the interviews the first stage
+allocated. For each stage the suite records:
+
+    wall_time_s     - best of --repeat runs
+    round_trips     - requests sent to the client, also broken down by kind
+    rows_read/written
+    peak_memory_mb  - tracemalloc peak, from a separate run so tracing does not skew the time
+    throughput      - students (interviews) or interview pairs (final match) per second
+
+Results are written as JSON. --compare reads an earlier file and prints how
+every measurement moved, so a regression shows up against an earlier commit:
+
+    python -m backend.benchmarks.bench_suite --output before.json
+    python -m backend.benchmarks.bench_suite --output after.json --compare before.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from backend.benchmarks.cohort import add_interview_rankings, make_allocation_cohort
+from backend.data_sources import SupabaseDataSource
+from backend.fake_supabase import FakeSupabase, apply_final_matches_diff
+from backend import local_postgrest
+from backend.interview_allocation import allocate_interviews
+from backend.position_allocation import run_final_match
+
+# Fields that identify a measurement, for matching results between two runs
+CONFIG_FIELDS = ["stage", "students", "companies", "prefs", "popularity_skew", "capacity_skew",
+                 "seed", "allocator", "algorithm", "latency_ms", "backend"]
+
+# Relative slowdown of wall time or peak memory that --compare reports as a regression
+REGRESSION_THRESHOLD = 0.10
+
+
+def make_client(tables, latency_ms):
+    # The database function is installed in production, so final matches are written in one call
+    return FakeSupabase(tables, latency=latency_ms / 1000,
+                        functions={"apply_final_matches_diff": apply_final_matches_diff})
+
+
+def make_server(tables, latency_ms):
+    # PostgREST's default db-max-rows on Supabase is 1000
+    return local_postgrest.LocalPostgREST(tables, latency=latency_ms / 1000, max_rows=1000,
+                                          functions=local_postgrest.FUNCTIONS)
+
+
+def run_stage(stage, tables, config):
+    """Run one stage on a fresh backend over tables, returning (backend, seconds)
+
+    The backend is the FakeSupabase or the (stopped) LocalPostgREST the stage ran
+    against; both count round trips and rows and read tables back with rows().
+    """
+    if config.get("backend", "fake") == "http":
+        backend = make_server(tables, config["latency_ms"]).start()
+        client = backend.client()
+    else:
+        backend = client = make_client(tables, config["latency_ms"])
+    source = SupabaseDataSource(client)
+    try:
+        start = time.perf_counter()
+        if stage == "interviews":
+            allocate_interviews(source=source, allocator=config["allocator"])
+        else:
+            run_final_match(source=source, algorithm=config["algorithm"])
+        elapsed = time.perf_counter() - start
+    finally:
+        if backend is not client:
+            backend.stop()
+    return backend, elapsed
+
+
+def peak_memory_mb(stage, tables, config):
+    tracemalloc.start()
+    try:
+        run_stage(stage, tables, config)
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def measure_stage(stage, tables, config, repeat=1, trace_memory=True):
+    """One result row for stage on tables; returns (row, client of the last run)"""
+    best = float("inf")
+    for _ in range(repeat):
+        client, elapsed = run_stage(stage, tables, config)
+        best = min(best, elapsed)
+    items = len(tables["Student"]) if stage == "interviews" else len(tables["InterviewAllocated"])
+    row = dict(config, stage=stage)
+    row.update({
+        "items": items,
+        "wall_time_s": round(best, 4),
+        "round_trips": client.round_trips,
+        "requests": dict(client.requests),
+        "rows_read": client.rows_read,
+        "rows_written": client.rows_written,
+        "peak_memory_mb": round(peak_memory_mb(stage, tables, config), 2) if trace_memory else None,
+        "throughput_per_s": round(items / best, 1) if best > 0 else None,
+    })
+    return row, client
+
+
+def run_suite(configs, repeat=1, trace_memory=True):
+    """Measure both stages for every config, returning one result row per stage"""
+    results = []
+    for config in configs:
+        tables = make_allocation_cohort(config["students"], config["companies"], config["prefs"],
+                                        seed=config["seed"], popularity_skew=config["popularity_skew"],
+                                        capacity_skew=config["capacity_skew"])
+        row, client = measure_stage("interviews", tables, config, repeat, trace_memory)
+        results.append(row)
+
+        # The final match runs on the interviews just allocated, ranked by both sides
+        tables = dict(tables, InterviewAllocated=client.rows("InterviewAllocated"))
+        add_interview_rankings(tables, seed=config["seed"])
+        results.append(measure_stage("final_match", tables, config, repeat, trace_memory)[0])
+    return results
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(previous, current, threshold=REGRESSION_THRESHOLD):
+    """Lines describing how each measurement moved, and the number of regressions
+
+    A regression is wall time or peak memory up by more than threshold, or more round trips.
+    """
+    def key(row):
+        # Results from before --backend existed ran against FakeSupabase
+        return tuple(row.get(field, "fake" if field == "backend" else None) for field in CONFIG_FIELDS)
+
+    before = {key(row): row for row in previous["results"]}
+    lines = []
+    regressions = 0
+    for row in current["results"]:
+        old = before.get(key(row))
+        label = f"{row['stage']:>11} {row['students']:>7} students"
+        if old is None:
+            lines.append(f"{label}: no earlier result")
+            continue
+        changes = []
+        regressed = row["round_trips"] > old["round_trips"]
+        changes.append(f"round trips {old['round_trips']} -> {row['round_trips']}")
+        for field in ("wall_time_s", "peak_memory_mb"):
+            if old.get(field) and row.get(field) is not None:
+                change = row[field] / old[field] - 1
+                regressed = regressed or change > threshold
+                changes.append(f"{field} {old[field]} -> {row[field]} ({change:+.0%})")
+        regressions += regressed
+        lines.append(f"{label}: {', '.join(changes)}{'  REGRESSION' if regressed else ''}")
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--students", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--companies", type=int, default=200)
+    parser.add_argument("--prefs", type=int, default=10, help="preferences per student")
+    parser.add_argument("--popularity-skew", type=float, default=1.0)
+    parser.add_argument("--capacity-skew", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--allocator", default="loop")
+    parser.add_argument("--algorithm", default="greedy")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="simulated latency per round trip")
+    parser.add_argument("--backend", choices=["fake", "http"], default="fake",
+                        help="FakeSupabase in process, or the supabase client over HTTP to LocalPostgREST")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced peak memory runs")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="an earlier results file to compare against")
+    args = parser.parse_args()
+
+    configs = [{
+        "students": n_students, "companies": args.companies, "prefs": args.prefs,
+        "popularity_skew": args.popularity_skew, "capacity_skew": args.capacity_skew, "seed": args.seed,
+        "allocator": args.allocator, "algorithm": args.algorithm, "latency_ms": args.latency_ms,
+        "backend": args.backend,
+    } for n_students in args.students]
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "results": run_suite(configs, repeat=args.repeat, trace_memory=not args.no_memory),
+    }
+
+    print(f"{'stage':>11} {'students':>8} {'time (s)':>9} {'trips':>6} {'peak (MB)':>10} {'items/s':>10}")
+    for row in report["results"]:
+        peak = "-" if row["peak_memory_mb"] is None else f"{row['peak_memory_mb']:.1f}"
+        print(f"{row['stage']:>11} {row['students']:>8} {row['wall_time_s']:>9.3f} {row['round_trips']:>6} "
+              f"{peak:>10} {row['throughput_per_s']:>10}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            lines, regressions = compare_results(json.load(f), report)
+        print("\n".join(lines))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Synthetic cohorts for benchmarking the allocation stages against FakeSupabase.
+"""
+import random
+
+
+def make_cohort(n_students, n_companies, prefs_per_student=5, seed=0, popularity_skew=0.0):
+    """Build Student and StudentRank1 rows for a random cohort
+
+    With popularity_skew > 0 companies are picked with Zipf-like weights
+    (company k weighted 1 / k ** popularity_skew), so a few popular companies
+    appear in most students' preferences and fill up early.
+    """
+    rng = random.Random(seed)
+    company_ids = list(range(1, n_companies + 1))
+    prefs_per_student = min(prefs_per_student, n_companies)
+    weights = [1 / k ** popularity_skew for k in company_ids] if popularity_skew > 0 else None
+
+    students = []
+    rankings = []
+    for student_id in range(1, n_students + 1):
+        students.append({"StudentID": student_id, "QCA": round(rng.uniform(2.0, 4.2), 2)})
+        for rank, company_id in enumerate(_pick_companies(rng, company_ids, prefs_per_student, weights), start=1):
+            rankings.append({"StudentID": student_id, "CompanyID": company_id, "Rank": rank})
+
+    return {
+        "Student": students,
+        "StudentRank1": rankings,
+        "InterviewAllocated": [],
+    }
+
+
+def _pick_companies(rng, company_ids, count, weights):
+    """Pick count distinct companies, uniformly or by popularity weight"""
+    if weights is None:
+        return rng.sample(company_ids, count)
+    picked = {}
+    while len(picked) < count:
+        for company_id in rng.choices(company_ids, weights=weights, k=count - len(picked)):
+            picked.setdefault(company_id, None)
+    return list(picked)
+
+
+def make_match_cohort(n_students, n_companies, interviews_per_student=3, seed=0, missing_rate=0.05):
+    """Build the tables run_final_match reads: interview pairs plus both post-interview rankings
+
+    A fraction of rankings (missing_rate) is left out on each side, as happens when
+    a student or company never submits their post-interview ranking.
+    """
+    rng = random.Random(seed)
+    company_ids = list(range(1, n_companies + 1))
+    interviews_per_student = min(interviews_per_student, n_companies)
+
+    tables = {
+        "Student": [],
+        "Company": [{"CompanyID": cid, "CompanyName": f"Company {cid}"} for cid in company_ids],
+        "InterviewAllocated": [],
+        "StudentInterviewRank": [],
+        "CompanyInterviewRank": [],
+        "FinalMatches": [],
+    }
+    interviewees = {cid: [] for cid in company_ids}
+
+    for student_id in range(1, n_students + 1):
+        tables["Student"].append({"StudentID": student_id, "QCA": round(rng.uniform(2.0, 4.2), 2)})
+        companies = rng.sample(company_ids, interviews_per_student)
+        for rank, company_id in enumerate(companies, start=1):
+            tables["InterviewAllocated"].append({"StudentID": student_id, "CompanyID": company_id})
+            interviewees[company_id].append(student_id)
+            if rng.random() >= missing_rate:
+                tables["StudentInterviewRank"].append(
+                    {"StudentID": student_id, "CompanyID": company_id, "Rank": rank})
+
+    for company_id, student_ids in interviewees.items():
+        rng.shuffle(student_ids)
+        for rank, student_id in enumerate(student_ids, start=1):
+            if rng.random() >= missing_rate:
+                tables["CompanyInterviewRank"].append(
+                    {"StudentID": student_id, "CompanyID": company_id, "Rank": rank})
+
+    return tables
+
+
+def make_allocation_cohort(n_students, n_companies, prefs_per_student=5, seed=0, popularity_skew=0.0,
+                           mean_positions=2, capacity_skew=0.0):
+    """Build every table both stages read before interviews: students, preferences, companies and positions
+
+    Each company lists one Position with mean_positions Openings when capacity_skew is 0. With
+    capacity_skew > 0 the counts are drawn from a log-normal distribution with that
+    sigma (at least one each), so a few companies offer many positions and most offer
+    few. Everything is drawn from seed, so the same arguments give the same cohort.
+    """
+    tables = make_cohort(n_students, n_companies, prefs_per_student, seed=seed, popularity_skew=popularity_skew)
+    rng = random.Random(f"{seed}-positions")
+    tables["Company"] = [{"CompanyID": cid, "CompanyName": f"Company {cid}"} for cid in range(1, n_companies + 1)]
+    tables["Position"] = []
+    for company in tables["Company"]:
+        count = mean_positions
+        if capacity_skew > 0:
+            # exp(-sigma^2 / 2) keeps the mean at mean_positions
+            count = max(1, round(mean_positions * rng.lognormvariate(-capacity_skew ** 2 / 2, capacity_skew)))
+        tables["Position"].append({"CompanyID": company["CompanyID"], "Openings": count})
+    tables["StudentInterviewRank"] = []
+    tables["CompanyInterviewRank"] = []
+    tables["FinalMatches"] = []
+    return tables
+
+
+def make_multi_university_cohort(n_universities, n_students, n_companies, prefs_per_student=5, seed=0, **kwargs):
+    """Several allocation cohorts in one set of tables, each university ranking only its own companies
+
+    Every university gets n_students students and n_companies companies, drawn
+    like make_allocation_cohort (which gets the remaining arguments). IDs are
+    offset per university so they never collide, and QCAs are shared at two
+    decimals, so ties between universities are common.
+    """
+    tables = {}
+    for university in range(n_universities):
+        offset = university * max(n_students, n_companies)
+        part = make_allocation_cohort(n_students, n_companies, prefs_per_student, seed=f"{seed}-{university}",
+                                      **kwargs)
+        for table, rows in part.items():
+            merged = tables.setdefault(table, [])
+            for row in rows:
+                row = dict(row)
+                for column in ("StudentID", "CompanyID"):
+                    if column in row:
+                        row[column] += offset
+                if "CompanyName" in row:
+                    row["CompanyName"] = f"Company {row['CompanyID']}"
+                merged.append(row)
+    return tables
+
+
+def add_interview_rankings(tables, seed=0, missing_rate=0.05):
+    """Fill in both post-interview rank tables from the allocated interviews
+
+    Students rank their interviews in a random order and companies rank their
+    interviewees in a random order; a fraction (missing_rate) of rankings is
+    left out on each side.
+    """
+    rng = random.Random(f"{seed}-interview-ranks")
+    by_student = {}
+    by_company = {}
+    for pair in tables["InterviewAllocated"]:
+        by_student.setdefault(pair["StudentID"], []).append(pair["CompanyID"])
+        by_company.setdefault(pair["CompanyID"], []).append(pair["StudentID"])
+
+    tables["StudentInterviewRank"] = []
+    for student_id, company_ids in by_student.items():
+        rng.shuffle(company_ids)
+        tables["StudentInterviewRank"].extend(
+            {"StudentID": student_id, "CompanyID": company_id, "Rank": rank}
+            for rank, company_id in enumerate(company_ids, start=1) if rng.random() >= missing_rate)
+    tables["CompanyInterviewRank"] = []
+    for company_id, student_ids in by_company.items():
+        rng.shuffle(student_ids)
+        tables["CompanyInterviewRank"].extend(
+            {"StudentID": student_id, "CompanyID": company_id, "Rank": rank}
+            for rank, student_id in enumerate(student_ids, start=1) if rng.random() >= missing_rate)
+    return tables
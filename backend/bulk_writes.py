@@ -0,0 +1,180 @@
+"""
+Chunked bulk writes to Supabase tables.
+
+Each chunk is sent as a single multi-row insert, which PostgREST runs as one
+statement, so a chunk either lands completely or not at all. Whole-table
+replacement keeps a copy of the previous contents and restores it if any chunk
+still fails after its retries, so readers never see a half-written table once
+the call returns.
+
+Where only some rows change, diff_rows() works out which, and the diff is either
+applied in one transaction by a database function (see supabase/migrations) or,
+where that function is not installed, as batched deletes and inserts.
+"""
+import logging
+import time
+from collections import Counter
+
+from backend.pagination import fetch_pages
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_RETRIES = 3
+DEFAULT_RETRY_DELAY = 0.5
+
+# Database function applying a FinalMatches diff atomically, and PostgREST's
+# error code for calling a function that does not exist
+FINAL_MATCHES_FUNCTION = "apply_final_matches_diff"
+MISSING_FUNCTION_CODE = "PGRST202"
+
+# Key of the allocation output tables
+PAIR_KEY = ["StudentID", "CompanyID"]
+
+
+def chunked(rows, chunk_size):
+    """Split a list of rows into consecutive chunks of at most chunk_size"""
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    return [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+
+
+def execute_with_retry(build_request, retries=DEFAULT_RETRIES, retry_delay=DEFAULT_RETRY_DELAY,
+                       retry_if=None):
+    """Execute a request, retrying with exponential backoff before giving up
+
+    retry_if, when given, is called with the error and only errors it accepts are retried.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return build_request().execute()
+        except Exception as e:
+            if attempt == retries or (retry_if is not None and not retry_if(e)):
+                raise
+            logger.warning("Request failed (%s), retrying in %.2fs", e, retry_delay * 2 ** attempt)
+            time.sleep(retry_delay * 2 ** attempt)
+
+
+def insert_chunks(client, table, rows, chunk_size=DEFAULT_CHUNK_SIZE,
+                  retries=DEFAULT_RETRIES, retry_delay=DEFAULT_RETRY_DELAY):
+    """Insert rows as a series of bulk inserts, retrying each chunk independently"""
+    for chunk in chunked(rows, chunk_size):
+        execute_with_retry(lambda: client.table(table).insert(chunk),
+                           retries=retries, retry_delay=retry_delay)
+    return len(rows)
+
+
+def replace_table_rows(client, table, rows, key_column="StudentID", order_columns=PAIR_KEY,
+                       chunk_size=DEFAULT_CHUNK_SIZE, retries=DEFAULT_RETRIES, retry_delay=DEFAULT_RETRY_DELAY):
+    """Replace the whole contents of a table with rows, rolling back on failure
+
+    The previous contents are read before the clear, paged in order_columns order,
+    which must be unique per row. If a chunk cannot be written the partial rows are
+    removed and the previous contents re-inserted, then the original error is raised.
+    """
+    def build_query():
+        query = client.table(table).select("*")
+        for column in order_columns:
+            query = query.order(column)
+        return query
+    previous = list(fetch_pages(build_query))
+
+    execute_with_retry(lambda: client.table(table).delete().neq(key_column, 0),
+                       retries=retries, retry_delay=retry_delay)
+    try:
+        return insert_chunks(client, table, rows, chunk_size=chunk_size,
+                             retries=retries, retry_delay=retry_delay)
+    except Exception:
+        logger.error("Writing %s failed, restoring the previous %d rows", table, len(previous))
+        execute_with_retry(lambda: client.table(table).delete().neq(key_column, 0),
+                           retries=retries, retry_delay=retry_delay)
+        insert_chunks(client, table, previous, chunk_size=chunk_size,
+                      retries=retries, retry_delay=retry_delay)
+        raise
+
+
+def delete_keys(client, table, keys, key_columns, retries=DEFAULT_RETRIES, retry_delay=DEFAULT_RETRY_DELAY):
+    """Delete every row whose key_columns values are one of keys, one request per leading value
+
+    Keys sharing their first column are deleted together with an in_ filter on the
+    second, so removing several pairs for one student costs a single request.
+    """
+    groups = {}
+    for key in keys:
+        groups.setdefault(key[:-1], []).append(key[-1])
+    for prefix, last_values in groups.items():
+        def build_request(prefix=prefix, last_values=last_values):
+            request = client.table(table).delete()
+            for column, value in zip(key_columns, prefix):
+                request = request.eq(column, value)
+            return request.in_(key_columns[-1], last_values)
+        execute_with_retry(build_request, retries=retries, retry_delay=retry_delay)
+    return len(keys)
+
+
+def apply_row_diff(client, table, inserts, deleted, key_columns, chunk_size=DEFAULT_CHUNK_SIZE,
+                   retries=DEFAULT_RETRIES, retry_delay=DEFAULT_RETRY_DELAY):
+    """Delete the deleted rows (matched on key_columns) and insert inserts, undoing both on failure
+
+    If any request still fails after its retries, the inserted keys are removed
+    and the deleted rows put back, then the original error is raised.
+    """
+    deleted_keys = list(dict.fromkeys(tuple(row[c] for c in key_columns) for row in deleted))
+    inserted_keys = list(dict.fromkeys(tuple(row[c] for c in key_columns) for row in inserts))
+    delete_keys(client, table, deleted_keys, key_columns, retries=retries, retry_delay=retry_delay)
+    try:
+        insert_chunks(client, table, inserts, chunk_size=chunk_size, retries=retries, retry_delay=retry_delay)
+    except Exception:
+        logger.error("Updating %s failed, restoring %d deleted rows", table, len(deleted))
+        delete_keys(client, table, inserted_keys, key_columns, retries=retries, retry_delay=retry_delay)
+        insert_chunks(client, table, deleted, chunk_size=chunk_size, retries=retries, retry_delay=retry_delay)
+        raise
+    return len(inserts) + len(deleted)
+
+
+def diff_rows(current, desired, key_columns=PAIR_KEY):
+    """Rows to delete and insert to turn current into desired, compared key by key
+
+    Returns (inserts, deleted): every row of a key that is gone or changed is
+    deleted, and every row of a key that is new or changed is inserted.
+    """
+    def by_key(rows):
+        grouped = {}
+        for row in rows:
+            grouped.setdefault(tuple(row.get(c) for c in key_columns), []).append(row)
+        return grouped
+
+    def same(a, b):
+        return Counter(tuple(sorted(row.items())) for row in a) == Counter(tuple(sorted(row.items())) for row in b)
+
+    current_by_key = by_key(current)
+    desired_by_key = by_key(desired)
+    inserts = []
+    deleted = []
+    for key, rows in current_by_key.items():
+        if key not in desired_by_key or not same(rows, desired_by_key[key]):
+            deleted.extend(rows)
+    for key, rows in desired_by_key.items():
+        if key not in current_by_key or not same(rows, current_by_key[key]):
+            inserts.extend(rows)
+    return inserts, deleted
+
+
+def is_missing_function(error):
+    return getattr(error, "code", None) == MISSING_FUNCTION_CODE
+
+
+def apply_diff_in_transaction(client, function, inserts, deleted, key_columns,
+                              retries=DEFAULT_RETRIES, retry_delay=DEFAULT_RETRY_DELAY):
+    """Apply a diff with one call to a database function, so readers see all of it or none
+
+    The function receives the rows to upsert and the keys to delete. Raises the
+    PostgREST error straight away, without retrying, if the function is missing.
+    """
+    params = {
+        "upserts": inserts,
+        "deletes": [{c: row[c] for c in key_columns} for row in deleted],
+    }
+    execute_with_retry(lambda: client.rpc(function, params), retries=retries, retry_delay=retry_delay,
+                       retry_if=lambda e: not is_missing_function(e))
+    return len(inserts) + len(deleted)
@@ -0,0 +1,63 @@
+"""
+Per-company capacities from the Position table.
+
+A company's Position row is its job listing, and its Openings column the number
+of students it will take. Companies without a listing, or whose listing leaves
+Openings empty, fall back to DEFAULT_POSITIONS, and interview slots scale with
+openings so a company with the default keeps the full interview capacity.
+"""
+import time
+
+from backend.allocation_core import DEFAULT_POSITIONS, INTERVIEW_CAPACITY
+
+
+class CapacityCache:
+    """Holds one bulk read of Position openings, optionally reused across runs for ttl seconds
+
+    With the default ttl of 0 the counts are loaded once per run and never reused.
+    A cache bound to one data source reloads if it is asked about another.
+    """
+
+    def __init__(self, ttl=0):
+        self.ttl = ttl
+        self._positions = None
+        self._source = None
+        self._loaded_at = 0.0
+
+    def get(self, source):
+        """Return {CompanyID: positions} for source, loading it if the cached copy is stale"""
+        key = _source_key(source)
+        fresh = self._positions is not None and self._source is key \
+            and self.ttl > 0 and time.monotonic() - self._loaded_at < self.ttl
+        if not fresh:
+            self._positions = source.load_company_positions()
+            self._source = key
+            self._loaded_at = time.monotonic()
+        return self._positions
+
+    def invalidate(self):
+        self._positions = None
+        self._source = None
+
+
+def _source_key(source):
+    # A snapshot shares counts with the source it was read from, and Supabase
+    # sources wrapping the same client share one set of cached counts
+    source = getattr(source, "source", source)
+    client = getattr(source, "client", source)
+    # A client counted for a run report (see instrumentation.py) is still the same client
+    return getattr(client, "client", client)
+
+
+def positions_for(company_id, positions):
+    """Openings at a company, falling back to the default when none are listed"""
+    return positions.get(company_id, DEFAULT_POSITIONS)
+
+
+def interview_capacities(positions, capacity=INTERVIEW_CAPACITY):
+    """Interview slots per company with listed openings; others use capacity
+
+    capacity is the slots of a company with DEFAULT_POSITIONS openings, and other
+    companies get the same slots per opening, rounded down only once at the end.
+    """
+    return {company_id: count * capacity // DEFAULT_POSITIONS for company_id, count in positions.items()}
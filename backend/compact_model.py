@@ -0,0 +1,192 @@
+"""
+Compact in-memory model of the allocation inputs.
+
+The data sources hand rows over as one dict per row, and holding a cohort's
+preferences as lists of those dicts costs a few hundred bytes per preference.
+This module keeps the same data in flat arrays instead:
+
+    IdIndex      - IDs numbered 0..n-1 in the order they are first seen, and back
+    Students     - a QCA per dense student number, NaN where unknown
+    Preferences  - per-student rows in CSR form: student n's entries are
+                   company[start[n]:start[n + 1]], with their ranks alongside
+
+Rows are streamed from read_rows straight into the arrays, so no list of row
+dicts is built. Preferences also answers get() like the {StudentID: [{"CompanyID",
+"Rank"}, ...]} mapping load_student_rankings returns, building a student's list
+only when it is asked for, so the interview allocators take it unchanged, and
+the array-based final match reads the interview and rank tables from its columns.
+"""
+from array import array
+
+import numpy as np
+
+# Stands in for a rank that is missing (no row, or a NULL Rank)
+MISSING_RANK = np.iinfo(np.int64).max
+
+
+def rank_values(ranks):
+    """Ranks as an int64 array (MISSING_RANK for NULL), or float64 (inf for NULL) if any is fractional"""
+    if isinstance(ranks, np.ndarray):
+        return ranks if ranks.dtype.kind in "iuf" else rank_values(ranks.tolist())
+    # Integer ranks stay integers so combined scores match the dict pipeline exactly
+    types = set(map(type, ranks))
+    if types <= {int}:
+        return np.array(ranks, dtype=np.int64)
+    if types <= {int, type(None)}:
+        return np.array([MISSING_RANK if rank is None else rank for rank in ranks], dtype=np.int64)
+    return np.array([np.inf if rank is None else rank for rank in ranks], dtype=np.float64)
+
+
+class IdIndex:
+    """IDs numbered densely in first-seen order"""
+
+    __slots__ = ("ids", "numbers")
+
+    def __init__(self, ids=()):
+        self.ids = []        # dense number -> ID
+        self.numbers = {}    # ID -> dense number
+        for value in ids:
+            self.add(value)
+
+    def add(self, value):
+        """The dense number of value, numbering it if it is new"""
+        number = self.numbers.get(value)
+        if number is None:
+            number = self.numbers[value] = len(self.ids)
+            self.ids.append(value)
+        return number
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, value):
+        return value in self.numbers
+
+
+class Students:
+    """QCA per dense student number, as load_student_qcas reads it"""
+
+    __slots__ = ("index", "qca")
+
+    def __init__(self, index, qca):
+        self.index = index
+        self.qca = qca    # float64 per dense number, NaN for a 0, NULL or missing QCA
+
+    @classmethod
+    def from_rows(cls, rows, index=None):
+        """Read {"StudentID", "QCA"} rows, the first row per student winning"""
+        index = index if index is not None else IdIndex()
+        qca = array("d")
+        seen = bytearray()
+        for row in rows:
+            number = index.add(row["StudentID"])
+            if number >= len(seen):
+                grow = len(index) - len(seen)
+                seen.extend(bytes(grow))
+                qca.extend([np.nan] * grow)
+            if not seen[number]:
+                seen[number] = 1
+                qca[number] = float(row["QCA"]) if row["QCA"] else np.nan
+        qca.extend([np.nan] * (len(index) - len(qca)))
+        return cls(index, np.frombuffer(qca, dtype=np.float64))
+
+    def qca_of(self, numbers):
+        """QCA for each dense student number, NaN for students numbered after loading"""
+        result = np.full(len(numbers), np.nan)
+        known = numbers < len(self.qca)
+        result[known] = self.qca[numbers[known]]
+        return result
+
+
+class Preferences:
+    """Per-student rows of a (StudentID, CompanyID[, Rank]) table in CSR form"""
+
+    __slots__ = ("students", "companies", "start", "company", "rank", "row_student")
+
+    def __init__(self, students, companies, start, company, rank=None, row_student=None):
+        self.students = students        # IdIndex of StudentIDs
+        self.companies = companies      # IdIndex of CompanyIDs
+        self.start = start              # int64, len(students) + 1 offsets into company
+        self.company = company          # int32 dense company number per entry
+        self.rank = rank                # rank per entry (see rank_values), or None
+        self.row_student = row_student  # int32 dense student number per entry
+
+    @classmethod
+    def from_rows(cls, rows, students=None, companies=None, rank_column="Rank"):
+        """Read rows into CSR form, keeping each student's rows in the order they were read
+
+        Pass the same IdIndex objects when loading several tables so their dense
+        numbers agree. rank_column=None reads a table without ranks.
+        """
+        students = students if students is not None else IdIndex()
+        companies = companies if companies is not None else IdIndex()
+        row_student = array("i")
+        row_company = array("i")
+        ranks = []
+        for row in rows:
+            row_student.append(students.add(row["StudentID"]))
+            row_company.append(companies.add(row["CompanyID"]))
+            if rank_column is not None:
+                ranks.append(row[rank_column])
+
+        student = np.frombuffer(row_student, dtype=np.intc)
+        company = np.frombuffer(row_company, dtype=np.intc)
+        rank = rank_values(ranks) if rank_column is not None else None
+
+        # Group rows by student; the sort is stable so each student keeps their read order
+        order = np.argsort(student, kind="stable")
+        if np.any(order != np.arange(len(order))):
+            student, company = student[order], company[order]
+            rank = rank[order] if rank is not None else None
+        start = np.zeros(len(students) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(student, minlength=len(students)), out=start[1:])
+        return cls(students, companies, start, company, rank, student)
+
+    def _number(self, student_id):
+        number = self.students.numbers.get(student_id)
+        if number is None or number >= len(self.start) - 1 or self.start[number] == self.start[number + 1]:
+            return None
+        return number
+
+    def get(self, student_id, default=None):
+        """A student's rows as [{"CompanyID", "Rank"}, ...], or default if they have none"""
+        number = self._number(student_id)
+        if number is None:
+            return default
+        begin, end = int(self.start[number]), int(self.start[number + 1])
+        company_ids = [self.companies.ids[c] for c in self.company[begin:end].tolist()]
+        if self.rank is None:
+            return [{"CompanyID": company_id} for company_id in company_ids]
+        ranks = [None if r == MISSING_RANK or r == np.inf else r for r in self.rank[begin:end].tolist()]
+        return [{"CompanyID": company_id, "Rank": rank} for company_id, rank in zip(company_ids, ranks)]
+
+    def __getitem__(self, student_id):
+        rows = self.get(student_id)
+        if rows is None:
+            raise KeyError(student_id)
+        return rows
+
+    def __contains__(self, student_id):
+        return self._number(student_id) is not None
+
+    def __len__(self):
+        return int(np.count_nonzero(np.diff(self.start)))
+
+    def in_order(self, student_ids):
+        """The entries of student_ids, in that order, as (start, company) CSR arrays"""
+        numbers = np.array([self.students.numbers.get(sid, -1) for sid in student_ids], dtype=np.int64)
+        known = (numbers >= 0) & (numbers < len(self.start) - 1)
+        # Index start with known students only: with no rows at all it holds a single offset
+        first = np.zeros(len(numbers), dtype=np.int64)
+        lengths = np.zeros(len(numbers), dtype=np.int64)
+        first[known] = self.start[numbers[known]]
+        lengths[known] = self.start[numbers[known] + 1] - first[known]
+        start = np.zeros(len(numbers) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=start[1:])
+        # Position of every selected entry: its student's first entry plus its offset in the list
+        positions = np.repeat(first - start[:-1], lengths) + np.arange(start[-1])
+        return start, self.company[positions]
+
+    def columns(self):
+        """(dense student, dense company, rank) per entry, grouped by student"""
+        return self.row_student, self.company, self.rank
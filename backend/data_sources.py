@@ -0,0 +1,322 @@
+"""
+Where the allocation engines read their inputs from and write their results to.
+
+DataSource is the interface both allocation stages use. TableDataSource derives
+every load/save from three table primitives, and the concrete sources only
+supply those primitives:
+
+    SupabaseDataSource  - the production database, streamed a page at a time
+    InMemoryDataSource  - a dict of table name -> rows, for tests and fixtures
+    FileDataSource      - a JSON file holding the same dict, for offline runs
+
+snapshot.py and snapshot_bundle.py build further sources on InMemoryDataSource:
+a snapshot read concurrently from another source, and a NumPy bundle on disk.
+"""
+import json
+import logging
+import os
+from typing import Protocol
+
+from backend.bulk_writes import (DEFAULT_CHUNK_SIZE, DEFAULT_RETRIES, DEFAULT_RETRY_DELAY, FINAL_MATCHES_FUNCTION,
+                                 PAIR_KEY, apply_diff_in_transaction, apply_row_diff, diff_rows,
+                                 execute_with_retry, is_missing_function, replace_table_rows)
+from backend.entity_cache import company_names, shared_cache, student_names
+from backend.pagination import DEFAULT_PAGE_SIZE, fetch_keyset, fetch_pages
+
+logger = logging.getLogger(__name__)
+
+# Database function running the whole interview allocation (see supabase/migrations)
+INTERVIEW_ALLOCATION_FUNCTION = "allocate_interviews"
+
+# Two preferences may share a rank, so CompanyID makes the order total and keeps
+# offset pages from skipping or repeating rows between requests
+RANKING_ORDER = [("StudentID", False), ("Rank", False), ("CompanyID", False)]
+
+
+class DataSource(Protocol):
+    def iter_students(self):
+        """Stream students as {"StudentID", "QCA"} rows, highest QCA first"""
+
+    def load_students(self):
+        """Students as {"StudentID", "QCA"} rows, highest QCA first"""
+
+    def load_student_rankings(self):
+        """Pre-interview preferences as {StudentID: [{"CompanyID", "Rank"}, ...]} in rank order"""
+
+    def load_preferences(self):
+        """The same preferences as load_student_rankings, held compactly (see compact_model.Preferences)"""
+
+    def iter_interview_pairs(self):
+        """Stream allocated interviews as {"StudentID", "CompanyID"} rows"""
+
+    def load_interview_pairs(self):
+        """Allocated interviews as {"StudentID", "CompanyID"} rows"""
+
+    def load_rank_index(self, table):
+        """A post-interview rank table as {(StudentID, CompanyID): Rank}"""
+
+    def load_student_qcas(self):
+        """Every student's QCA as {StudentID: float or None}"""
+
+    def load_company_positions(self):
+        """Openings listed per company as {CompanyID: openings}, leaving out companies without any"""
+
+    def get_company_name(self, company_id):
+        """A company's display name"""
+
+    def load_company_names(self, company_ids):
+        """Display names of several companies as {CompanyID: name}, read together"""
+
+    def load_student_names(self, student_ids):
+        """Display names of several students as {StudentID: "FirstName Surname"}, read together"""
+
+    def save_interview_allocations(self, rows):
+        """Replace InterviewAllocated with rows"""
+
+    def save_final_matches(self, rows):
+        """Make FinalMatches hold exactly rows, writing only the rows that changed"""
+
+    def load_final_matches(self):
+        """The persisted FinalMatches as {"StudentID", "CompanyID", "CombinedScore"} rows"""
+
+    def update_rows(self, table, inserts, deleted, key_columns):
+        """Delete the rows in deleted (matched on key_columns) from table and insert inserts"""
+
+    def allocate_interviews_in_database(self, capacity, per_student, default_positions):
+        """Allocate interviews and write InterviewAllocated where the data lives
+
+        Returns [{"StudentID", "CompanyIDs", "HasPreferences"}, ...] in processing
+        order. Raises NotImplementedError if the source cannot.
+        """
+
+
+class TableDataSource:
+    """Implements DataSource on top of read_rows() and replace_rows()"""
+
+    def read_rows(self, table, columns, order):
+        """Yield rows of table with the given columns, sorted by [(column, desc), ...]"""
+        raise NotImplementedError
+
+    def replace_rows(self, table, rows):
+        """Replace the whole contents of table with rows"""
+        raise NotImplementedError
+
+    def update_rows(self, table, inserts, deleted, key_columns):
+        """Delete every row sharing a key with deleted, then insert inserts"""
+        raise NotImplementedError
+
+    def iter_students(self):
+        # StudentID makes the order total, so equal-QCA students page consistently
+        return self.read_rows("Student", ["StudentID", "QCA"], [("QCA", True), ("StudentID", False)])
+
+    def load_students(self):
+        return list(self.iter_students())
+
+    def load_student_rankings(self):
+        rankings = {}
+        for row in self.read_rows("StudentRank1", ["StudentID", "CompanyID", "Rank"], RANKING_ORDER):
+            rankings.setdefault(row["StudentID"], []).append({
+                "CompanyID": row["CompanyID"],
+                "Rank": row["Rank"]
+            })
+        return rankings
+
+    def load_preferences(self):
+        # Imported here so NumPy is only loaded when the compact model is used
+        from backend.compact_model import Preferences
+        return Preferences.from_rows(self.read_rows("StudentRank1", ["StudentID", "CompanyID", "Rank"],
+                                                    RANKING_ORDER))
+
+    def iter_interview_pairs(self):
+        return self.read_rows("InterviewAllocated", ["StudentID", "CompanyID"],
+                              [("StudentID", False), ("CompanyID", False)])
+
+    def load_interview_pairs(self):
+        return list(self.iter_interview_pairs())
+
+    def load_rank_index(self, table):
+        ranks = {}
+        for row in self.read_rows(table, ["StudentID", "CompanyID", "Rank"],
+                                  [("StudentID", False), ("CompanyID", False)]):
+            # Keep the first rank seen for a pair, as the per-pair lookups did
+            ranks.setdefault((row["StudentID"], row["CompanyID"]), row["Rank"])
+        return ranks
+
+    def load_student_qcas(self):
+        qcas = {}
+        for row in self.read_rows("Student", ["StudentID", "QCA"], [("StudentID", False)]):
+            qcas.setdefault(row["StudentID"], float(row["QCA"]) if row["QCA"] else None)
+        return qcas
+
+    def load_company_positions(self):
+        # One listing per company; a listing without Openings keeps the default capacity
+        positions = {}
+        for row in self.read_rows("Position", ["CompanyID", "Openings"], [("CompanyID", False)]):
+            if row["Openings"] is not None:
+                positions[row["CompanyID"]] = positions.get(row["CompanyID"], 0) + int(row["Openings"])
+        return positions
+
+    def get_company_name(self, company_id):
+        for row in self.read_rows("Company", ["CompanyID", "CompanyName"], []):
+            if row["CompanyID"] == company_id:
+                return row["CompanyName"]
+        return f"Company {company_id}"
+
+    def load_company_names(self, company_ids):
+        names = {cid: f"Company {cid}" for cid in company_ids}
+        for row in self.read_rows("Company", ["CompanyID", "CompanyName"], []):
+            if row["CompanyID"] in names:
+                names[row["CompanyID"]] = row["CompanyName"]
+        return names
+
+    def load_student_names(self, student_ids):
+        names = {sid: f"Student {sid}" for sid in student_ids}
+        for row in self.read_rows("User", ["ID", "FirstName", "Surname"], []):
+            if row["ID"] in names:
+                names[row["ID"]] = f"{row['FirstName']} {row['Surname']}"
+        return names
+
+    def save_interview_allocations(self, rows):
+        return self.replace_rows("InterviewAllocated", rows)
+
+    def save_final_matches(self, rows):
+        # Dashboards read FinalMatches during a run, so never empty it: write only the changes
+        inserts, deleted = diff_rows(self.load_final_matches(), rows, PAIR_KEY)
+        if not inserts and not deleted:
+            return 0
+        return self.update_rows("FinalMatches", inserts, deleted, PAIR_KEY)
+
+    def allocate_interviews_in_database(self, capacity, per_student, default_positions):
+        raise NotImplementedError(f"{type(self).__name__} has no database to allocate in")
+
+    def load_final_matches(self):
+        return list(self.read_rows("FinalMatches", ["StudentID", "CompanyID", "CombinedScore"],
+                                   [("StudentID", False), ("CompanyID", False)]))
+
+
+class SupabaseDataSource(TableDataSource):
+    """Reads and writes through a Supabase client, paging reads and chunking writes"""
+
+    def __init__(self, client, page_size=DEFAULT_PAGE_SIZE, chunk_size=DEFAULT_CHUNK_SIZE,
+                 retries=DEFAULT_RETRIES, retry_delay=DEFAULT_RETRY_DELAY, entity_cache=None):
+        self.client = client
+        self.entity_cache = entity_cache or shared_cache
+        self.page_size = page_size
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+    def read_rows(self, table, columns, order):
+        def build_query():
+            query = self.client.table(table).select(", ".join(columns))
+            for column, desc in order:
+                query = query.order(column, desc=desc)
+            return query
+        return fetch_pages(build_query, page_size=self.page_size)
+
+    def load_student_qcas(self):
+        # StudentID is unique, so page by key instead of by offset
+        qcas = {}
+        for row in fetch_keyset(lambda: self.client.table("Student").select("StudentID, QCA"),
+                                "StudentID", page_size=self.page_size):
+            qcas.setdefault(row["StudentID"], float(row["QCA"]) if row["QCA"] else None)
+        return qcas
+
+    def save_final_matches(self, rows):
+        inserts, deleted = diff_rows(self.load_final_matches(), rows, PAIR_KEY)
+        if not inserts and not deleted:
+            return 0
+        try:
+            # One transaction, so readers see the old matches or the new ones and nothing in between
+            return apply_diff_in_transaction(self.client, FINAL_MATCHES_FUNCTION, inserts, deleted, PAIR_KEY,
+                                             retries=self.retries, retry_delay=self.retry_delay)
+        except Exception as e:
+            if not is_missing_function(e):
+                raise
+            logger.warning("Database function %s not found, writing the changes in batches", FINAL_MATCHES_FUNCTION)
+            return self.update_rows("FinalMatches", inserts, deleted, PAIR_KEY)
+
+    def allocate_interviews_in_database(self, capacity, per_student, default_positions):
+        # Replacing the whole table is idempotent, so a failed call can safely be retried
+        params = {"capacity": capacity, "per_student": per_student, "default_positions": default_positions}
+        result = execute_with_retry(lambda: self.client.rpc(INTERVIEW_ALLOCATION_FUNCTION, params),
+                                    retries=self.retries, retry_delay=self.retry_delay,
+                                    retry_if=lambda e: not is_missing_function(e))
+        return result.data
+
+    def get_company_name(self, company_id):
+        return self.load_company_names([company_id])[company_id]
+
+    def load_company_names(self, company_ids):
+        # Names rarely change, so they come from the entity cache and only unknown IDs are fetched
+        return company_names(self.client, company_ids, self.entity_cache)
+
+    def load_student_names(self, student_ids):
+        return student_names(self.client, student_ids, self.entity_cache)
+
+    def replace_rows(self, table, rows):
+        return replace_table_rows(self.client, table, rows, chunk_size=self.chunk_size,
+                                  retries=self.retries, retry_delay=self.retry_delay)
+
+    def update_rows(self, table, inserts, deleted, key_columns):
+        return apply_row_diff(self.client, table, inserts, deleted, key_columns, chunk_size=self.chunk_size,
+                              retries=self.retries, retry_delay=self.retry_delay)
+
+
+class InMemoryDataSource(TableDataSource):
+    """Works on a dict of table name -> list of row dicts, sorting the way Postgres does"""
+
+    def __init__(self, tables=None):
+        self.tables = {name: [dict(row) for row in rows] for name, rows in (tables or {}).items()}
+
+    def read_rows(self, table, columns, order):
+        rows = list(self.tables.get(table, []))
+        # Apply the sort keys last-to-first so the first one wins
+        for column, desc in reversed(order):
+            rows.sort(key=lambda row: _postgres_sort_key(row.get(column)), reverse=desc)
+        return ({column: row.get(column) for column in columns} for row in rows)
+
+    def replace_rows(self, table, rows):
+        self.tables[table] = [dict(row) for row in rows]
+        return len(rows)
+
+    def update_rows(self, table, inserts, deleted, key_columns):
+        # Goes through replace_rows so subclasses persist the change the usual way
+        self.replace_rows(table, merge_rows(self.tables.get(table, []), inserts, deleted, key_columns))
+        return len(inserts) + len(deleted)
+
+
+class FileDataSource(InMemoryDataSource):
+    """An InMemoryDataSource loaded from, and saved back to, a JSON file of tables"""
+
+    def __init__(self, path):
+        self.path = path
+        tables = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                tables = json.load(f)
+        super().__init__(tables)
+
+    def replace_rows(self, table, rows):
+        written = super().replace_rows(table, rows)
+        self.flush()
+        return written
+
+    def flush(self):
+        """Write every table back to the file, replacing it in one step"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.tables, f)
+        os.replace(tmp_path, self.path)
+
+
+def merge_rows(rows, inserts, deleted, key_columns):
+    """rows without any row sharing a key with deleted, followed by inserts"""
+    deleted_keys = {tuple(row[c] for c in key_columns) for row in deleted}
+    kept = [row for row in rows if tuple(row.get(c) for c in key_columns) not in deleted_keys]
+    return kept + [dict(row) for row in inserts]
+
+
+def _postgres_sort_key(value):
+    # NULLs sort after every value, so they come last ascending and first descending
+    return (value is None, value if value is not None else 0)
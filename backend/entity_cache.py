@@ -0,0 +1,150 @@
+"""
+Cached lookups of entity rows (Company, User) by ID.
+
+Reports and the command line output resolve names for many IDs, often
+the same ones over and over. An EntityCache sits in front of a Supabase client:
+get_many() answers what it already holds and fetches every missing ID of a table
+with one in_ request per chunk, so resolving the names for a whole run costs one
+bulk fetch instead of a query per row. IDs without a row are remembered as
+missing too.
+
+The cache holds at most max_size rows, evicting the least recently used, and is
+bound to one client: asked about another it starts again empty. Entities can
+change between runs, so whoever changes them (or knows they changed) calls
+invalidate(table, ids) or clear(). A cache given a ttl also starts again empty
+once its oldest rows are ttl seconds old, for long-lived processes that cannot
+know when a row changed.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from backend.bulk_writes import chunked, execute_with_retry
+
+DEFAULT_MAX_SIZE = 10000
+
+# IDs per in_ filter, keeping request URLs well under PostgREST's limits
+DEFAULT_LOOKUP_CHUNK = 200
+
+_MISSING = object()
+
+
+class LRUCache:
+    """A dict of at most max_size entries that drops the least recently used one when full"""
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        if key not in self.entries:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def pop(self, key):
+        return self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class EntityCache:
+    """Rows of entity tables by ID, fetched in bulk and kept in an LRU cache"""
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, chunk_size=DEFAULT_LOOKUP_CHUNK, ttl=None):
+        self.rows = LRUCache(max_size)
+        self.chunk_size = chunk_size
+        self.ttl = ttl
+        self._client = None
+        self._filled_at = None
+        self._lock = threading.Lock()
+
+    def get_many(self, client, table, key_column, ids, columns="*"):
+        """{ID: row, or None if there is none} for ids, fetching the uncached ones in bulk"""
+        with self._lock:
+            self._bind(client)
+            self._expire()
+            found = {}
+            missing = []
+            for entity_id in dict.fromkeys(ids):
+                row = self.rows.get((table, key_column, columns, entity_id), _MISSING)
+                if row is _MISSING:
+                    missing.append(entity_id)
+                else:
+                    found[entity_id] = row
+
+        for chunk in chunked(missing, self.chunk_size):
+            result = execute_with_retry(lambda: client.table(table).select(columns).in_(key_column, chunk))
+            fetched = {row[key_column]: row for row in result.data}
+            with self._lock:
+                if self._filled_at is None:
+                    self._filled_at = time.monotonic()
+                for entity_id in chunk:
+                    found[entity_id] = fetched.get(entity_id)
+                    self.rows.put((table, key_column, columns, entity_id), found[entity_id])
+        return found
+
+    def get(self, client, table, key_column, entity_id, columns="*"):
+        """One entity's row, or None"""
+        return self.get_many(client, table, key_column, [entity_id], columns)[entity_id]
+
+    def invalidate(self, table, ids=None):
+        """Forget the cached rows of table, or only those of ids"""
+        ids = None if ids is None else set(ids)
+        with self._lock:
+            for key in [key for key in self.rows.entries if key[0] == table and (ids is None or key[3] in ids)]:
+                self.rows.pop(key)
+
+    def clear(self):
+        with self._lock:
+            self.rows.clear()
+            self._filled_at = None
+
+    def _expire(self):
+        # Called with self._lock held; drops everything once the first rows fetched are ttl old
+        if self.ttl is not None and self._filled_at is not None and time.monotonic() - self._filled_at >= self.ttl:
+            self.rows.clear()
+            self._filled_at = None
+
+    def _bind(self, client):
+        # A client counted for a run report (see instrumentation.py) is still the same client
+        client = getattr(client, "client", client)
+        if client is not self._client:
+            self.rows.clear()
+            self._filled_at = None
+            self._client = client
+
+
+# Shared by every SupabaseDataSource that is not given its own cache
+shared_cache = EntityCache()
+
+
+def company_names(client, company_ids, cache=shared_cache):
+    """{CompanyID: CompanyName} with the same fallback name get_company_name uses"""
+    rows = cache.get_many(client, "Company", "CompanyID", company_ids, "CompanyID, CompanyName")
+    return {cid: row["CompanyName"] if row else f"Company {cid}" for cid, row in rows.items()}
+
+
+def student_names(client, student_ids, cache=shared_cache):
+    """{StudentID: "FirstName Surname"} from the User table"""
+    rows = cache.get_many(client, "User", "ID", student_ids, "ID, FirstName, Surname")
+    return {sid: f"{row['FirstName']} {row['Surname']}" if row else f"Student {sid}" for sid, row in rows.items()}
@@ -0,0 +1,283 @@
+"""
+In-memory stand-in for the Supabase client.
+
+Implements the part of the supabase-py query builder used by the allocation
+modules (select / filters / order / range / insert / delete, and rpc) over
+plain lists of dicts, and counts every .execute() as one round trip so tests
+and benchmarks can see how chatty a code path is.
+"""
+import copy
+import threading
+import time
+from collections import Counter
+
+
+class FakeAPIError(Exception):
+    """Raised by execute() when a test asks for a request to fail"""
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    def __init__(self, client, table_name):
+        self.client = client
+        self.table_name = table_name
+        self.action = "select"
+        self.columns = None
+        self.count = None
+        self.payload = None
+        self.filters = []
+        self.orders = []
+        self.start = None
+        self.end = None
+
+    # Query builder -------------------------------------------------------
+
+    def select(self, *columns, count=None):
+        self.action = "select"
+        self.columns = _parse_columns(columns)
+        self.count = count
+        return self
+
+    def insert(self, rows):
+        self.action = "insert"
+        self.payload = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def neq(self, column, value):
+        self.filters.append(lambda row: row.get(column) != value)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row.get(column) > value)
+        return self
+
+    def in_(self, column, values):
+        values = list(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def range(self, start, end):
+        self.start = start
+        self.end = end
+        return self
+
+    def limit(self, size):
+        self.start = self.start or 0
+        self.end = self.start + size - 1
+        return self
+
+    # Execution -----------------------------------------------------------
+
+    def execute(self):
+        with self.client.lock:
+            self.client.round_trips += 1
+            self.client.requests[self.action] += 1
+            self.client.requests_by_table[self.table_name] += 1
+            self.client.in_flight += 1
+            self.client.peak_in_flight = max(self.client.peak_in_flight, self.client.in_flight)
+        try:
+            if self.client.latency:
+                time.sleep(self.client.latency)
+            with self.client.lock:
+                return self._run()
+        finally:
+            with self.client.lock:
+                self.client.in_flight -= 1
+
+    def _run(self):
+        if self.client.fail_when is not None and self.client.fail_when(self):
+            raise FakeAPIError(f"Injected failure on {self.action} {self.table_name}")
+
+        rows = self.client.tables.setdefault(self.table_name, [])
+
+        if self.action == "insert":
+            self.client.rows_written += len(self.payload)
+            inserted = [copy.copy(row) for row in self.payload]
+            rows.extend(inserted)
+            self.client.sorted_cache.pop(self.table_name, None)
+            return FakeResponse(inserted)
+
+        if not self.filters and self.action == "select":
+            # Paging through a whole table re-reads it in the same order, as an index would serve it
+            cached = self.client.sorted_cache.setdefault(self.table_name, {})
+            key = (tuple(self.orders), id(rows), len(rows))
+            if key not in cached:
+                cached[key] = _sorted(rows, self.orders)
+            matched = cached[key]
+        else:
+            matched = _sorted([row for row in rows if all(f(row) for f in self.filters)], self.orders)
+
+        if self.action == "delete":
+            deleted = {id(row) for row in matched}
+            self.client.tables[self.table_name] = [row for row in rows if id(row) not in deleted]
+            self.client.sorted_cache.pop(self.table_name, None)
+            return FakeResponse(matched)
+
+        total = len(matched)
+        if self.start is not None:
+            matched = matched[self.start:self.end + 1]
+        if self.client.max_rows is not None:
+            matched = matched[:self.client.max_rows]
+
+        data = [_project(row, self.columns) for row in matched]
+        self.client.rows_read += len(data)
+        return FakeResponse(data, count=total if self.count else None)
+
+
+class FakeRPC:
+    """A call to a database function, run as one atomic step like a Postgres transaction"""
+
+    def __init__(self, client, name, params):
+        self.client = client
+        self.table_name = name
+        self.action = "rpc"
+        self.params = params
+
+    def execute(self):
+        client = self.client
+        with client.lock:
+            client.round_trips += 1
+            client.requests[self.action] += 1
+            client.requests_by_table[self.table_name] += 1
+        if client.latency:
+            time.sleep(client.latency)
+        with client.lock:
+            if self.table_name not in client.functions:
+                raise FakeAPIError(f"Could not find the function public.{self.table_name}", code="PGRST202")
+            if client.fail_when is not None and client.fail_when(self):
+                raise FakeAPIError(f"Injected failure on rpc {self.table_name}")
+            return FakeResponse(client.functions[self.table_name](client, self.params))
+
+
+def sorted_rows(rows, key_columns=("StudentID", "CompanyID")):
+    """Rows in key order, to compare tables whose stored order does not matter"""
+    return sorted(rows, key=lambda row: tuple(row[c] for c in key_columns))
+
+
+def apply_final_matches_diff(client, params):
+    """Twin of the apply_final_matches_diff database function
+
+    Runs on FakeSupabase and LocalPostgREST alike, through their delete_keys and
+    insert_rows, so both stand-ins apply a diff the same way.
+    """
+    upserts = params.get("upserts", [])
+    keys = {(row["StudentID"], row["CompanyID"]) for row in params.get("deletes", []) + upserts}
+    deleted = client.delete_keys("FinalMatches", ["StudentID", "CompanyID"], keys)
+    client.insert_rows("FinalMatches", upserts)
+    client.rows_written += len(upserts)
+    return {"deleted": deleted, "upserted": len(upserts)}
+
+
+class FakeSupabase:
+    """Minimal Supabase client backed by a dict of table name -> list of rows"""
+
+    def __init__(self, tables=None, latency=0.0, max_rows=None, functions=None):
+        self.tables = {name: [dict(row) for row in rows] for name, rows in (tables or {}).items()}
+        self.latency = latency
+        # Like PostgREST's db-max-rows: no response carries more rows than this
+        self.max_rows = max_rows
+        # Database functions callable with rpc(), as name -> function(client, params)
+        self.functions = dict(functions or {})
+        # Optional predicate on the query; when it returns True execute() raises FakeAPIError
+        self.fail_when = None
+        # Requests may come from several threads; the lock keeps tables and counters consistent
+        self.lock = threading.RLock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.round_trips = 0
+        self.requests = Counter()
+        self.requests_by_table = Counter()
+        self.rows_read = 0
+        self.rows_written = 0
+        # Whole-table sort orders reused across pages, dropped whenever the table is written
+        self.sorted_cache = {}
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params=None):
+        return FakeRPC(self, name, params or {})
+
+    def rows(self, table):
+        """Every row of table, in insertion order"""
+        return self.tables.get(table, [])
+
+    def delete_keys(self, table, columns, keys):
+        """Delete the rows whose values in columns are one of keys; for database function twins"""
+        rows = self.tables.setdefault(table, [])
+        kept = [row for row in rows if tuple(row.get(c) for c in columns) not in keys]
+        self.tables[table] = kept
+        self.sorted_cache.pop(table, None)
+        return len(rows) - len(kept)
+
+    def insert_rows(self, table, rows):
+        """Append rows to table; for database function twins"""
+        self.tables.setdefault(table, []).extend(dict(row) for row in rows)
+        self.sorted_cache.pop(table, None)
+        return len(rows)
+
+    def reset_counters(self):
+        self.peak_in_flight = 0
+        self.round_trips = 0
+        self.requests = Counter()
+        self.requests_by_table = Counter()
+        self.rows_read = 0
+        self.rows_written = 0
+
+
+def _sorted(rows, orders):
+    # Apply the sort keys last-to-first so the first order() call wins
+    rows = list(rows)
+    for column, desc in reversed(orders):
+        rows.sort(key=lambda row: _sort_key(row.get(column)), reverse=desc)
+    return rows
+
+
+def _parse_columns(columns):
+    """Turn select("A, B", "C") into [(output name, source column), ...]"""
+    parsed = []
+    for arg in columns:
+        for column in arg.split(","):
+            column = column.strip()
+            if not column:
+                continue
+            if column == "*":
+                return None
+            if ":" in column:
+                alias, source = column.split(":", 1)
+                parsed.append((alias.strip(), source.strip()))
+            else:
+                parsed.append((column, column))
+    return parsed or None
+
+
+def _project(row, columns):
+    if columns is None:
+        return dict(row)
+    return {alias: row.get(source) for alias, source in columns}
+
+
+def _sort_key(value):
+    # PostgREST puts NULLs last on ascending sorts
+    return (value is None, value if value is not None else 0)
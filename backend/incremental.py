@@ -0,0 +1,173 @@
+"""
+Incremental re-allocation after a few rankings change.
+
+A full run recomputes everything and rewrites whole output tables. This module
+keeps a small state from the last persisted run: a fingerprint of every
+student's inputs, in the QCA order they were processed, and each stage's
+settings. There is no updated-at column to use as a watermark, so changes are
+found by fingerprinting the inputs instead.
+
+Interview allocation is a cascade in QCA order: a student's interviews depend
+only on the students before them. Everyone before the first student whose
+inputs changed (or whose place in the order changed) keeps their previous
+interviews, and the allocation is resumed from there with the capacity those
+students already used. Final matching is a global sort, so it is recomputed in
+memory whenever any of its inputs change, and skipped entirely when none did.
+
+Either way only a diff is written: rows whose key (StudentID, CompanyID) is new,
+gone or changed (see bulk_writes.diff_rows). The state is plain JSON so it can be kept between runs:
+
+    python -m backend.incremental <state.json>
+"""
+import hashlib
+import json
+import logging
+import os
+import sys
+from collections import Counter
+
+from backend.allocation_core import (INTERVIEW_CAPACITY, INTERVIEWS_PER_STUDENT, allocate_interview_slots,
+                                     score_pairs)
+from backend.bulk_writes import PAIR_KEY, diff_rows
+from backend.capacities import interview_capacities, positions_for
+from backend.interview_allocation import allocation_rows
+from backend.position_allocation import get_matcher, matched_ranks, persist_final_match, result_views_for
+
+logger = logging.getLogger(__name__)
+
+def fingerprint(value):
+    """A stable digest of a JSON-serialisable value, the same in every process"""
+    encoded = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(encoded.encode(), digest_size=8).hexdigest()
+
+
+def first_difference(previous, current):
+    """Index of the first entry that differs between two sequences"""
+    for i, (old, new) in enumerate(zip(previous, current)):
+        if old != new:
+            return i
+    return min(len(previous), len(current))
+
+
+def write_diff(source, table, current, desired):
+    """Write only the difference between current and desired rows of table"""
+    inserts, deleted = diff_rows(current, desired, PAIR_KEY)
+    if inserts or deleted:
+        source.update_rows(table, inserts, deleted, PAIR_KEY)
+    return inserts, deleted
+
+
+def allocate_interviews_incremental(source, state=None, capacity=INTERVIEW_CAPACITY,
+                                    per_student=INTERVIEWS_PER_STUDENT):
+    """Interview allocation resumed from the first student whose inputs changed
+
+    state is what the previous call returned (or None for a full run). Returns
+    (student_allocations, new_state), with the same allocations a full run of
+    allocate_interviews would give, and writes only the changed InterviewAllocated rows.
+    """
+    state = state or {}
+    rankings = source.load_student_rankings()
+    students = source.load_students()
+    capacities = interview_capacities(source.load_company_positions(), capacity=capacity)
+
+    settings = fingerprint([capacity, per_student, sorted(capacities.items(), key=str)])
+    keys = [fingerprint([s["StudentID"], s["QCA"], rankings.get(s["StudentID"], [])]) for s in students]
+    start = first_difference(state.get("students", []), keys) if state.get("settings") == settings else 0
+
+    # Students before start keep their interviews; the rest get what capacity is left
+    previous = dict((sid, companies) for sid, companies in state.get("allocations", []))
+    student_allocations = {s["StudentID"]: previous[s["StudentID"]] for s in students[:start]}
+    used = {}
+    for companies in student_allocations.values():
+        for company_id in companies:
+            used[company_id] = used.get(company_id, 0) + 1
+    remaining = dict(capacities)
+    for company_id, count in used.items():
+        remaining[company_id] = capacities.get(company_id, capacity) - count
+    student_allocations.update(allocate_interview_slots(students[start:], rankings, capacity=capacity,
+                                                        per_student=per_student, capacities=remaining))
+
+    inserts, deleted = write_diff(source, "InterviewAllocated", source.load_interview_pairs(),
+                                  allocation_rows(student_allocations))
+    logger.info("Recomputed interviews from student %d of %d: %d inserted, %d deleted",
+                start, len(students), len(inserts), len(deleted))
+
+    return student_allocations, {
+        "settings": settings,
+        "students": keys,
+        "allocations": [[sid, companies] for sid, companies in student_allocations.items()],
+    }
+
+
+def run_final_match_incremental(source, state=None, algorithm="greedy"):
+    """Final matching recomputed only if its inputs changed since state
+
+    Returns (final_matches, new_state), with the same matches run_final_match
+    gives, and writes only the changed FinalMatches rows.
+    """
+    state = state or {}
+    student_ranks = source.load_rank_index("StudentInterviewRank")
+    company_ranks = source.load_rank_index("CompanyInterviewRank")
+    qcas = source.load_student_qcas()
+    positions = source.load_company_positions()
+    pairs = source.load_interview_pairs()
+    matches = score_pairs(pairs, student_ranks, company_ranks, qcas)
+    # Companies in the order their first interview appears, as run_final_match builds them
+    company_positions = {}
+    for pair in pairs:
+        company_positions.setdefault(pair["CompanyID"], positions_for(pair["CompanyID"], positions))
+
+    inputs = fingerprint([algorithm, matches, list(company_positions.items())])
+    if state.get("inputs") == inputs:
+        logger.info("Final match inputs unchanged, nothing to write")
+        return state["matches"], state
+
+    matcher = get_matcher(algorithm)
+    if algorithm == "stable":
+        final_matches, company_allocations = matcher(matches, company_positions, student_ranks, company_ranks)
+    else:
+        final_matches, company_allocations = matcher(matches, company_positions)
+
+    # Saving final matches already writes only the rows that changed, and the views only change with them
+    details = {"interviews": Counter(pair["CompanyID"] for pair in pairs),
+               "interviewed": list(dict.fromkeys(pair["StudentID"] for pair in pairs)),
+               "ranks": matched_ranks(final_matches, student_ranks, company_ranks)}
+    views = result_views_for(source, final_matches, company_positions, company_allocations, details)
+    written = persist_final_match(source, final_matches, views)
+    logger.info("Final matches: %d rows changed", written)
+
+    return final_matches, {"inputs": inputs, "matches": final_matches}
+
+
+def load_state(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(path, state):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python -m backend.incremental <state.json>")
+        sys.exit(1)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    from backend.data_sources import SupabaseDataSource
+    from backend.supabase_client import get_client
+
+    client = get_client()
+    if client is None:
+        logger.error("Cannot re-allocate: Supabase client not initialized")
+        sys.exit(1)
+    source = SupabaseDataSource(client)
+    state = load_state(sys.argv[1])
+    _, state["interviews"] = allocate_interviews_incremental(source, state.get("interviews"))
+    _, state["final"] = run_final_match_incremental(source, state.get("final"))
+    save_state(sys.argv[1], state)
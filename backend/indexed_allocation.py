@@ -0,0 +1,119 @@
+"""
+Array-backed interview allocation that skips companies once they are full.
+
+Produces exactly the same allocation as allocation_core.allocate_interview_slots.
+Every student's preferences are laid out back to back in one flat array, in
+the order students are processed, and companies are mapped to dense integers
+with their remaining capacity in a compact array. An "open" flag per flat
+preference position is cleared for all of a company's positions, in one
+vectorised step, as soon as the company fills, so each student only looks at
+the preferences that can still be allocated. Once every company is full the
+remaining students are skipped outright instead of walking their whole lists.
+"""
+import numpy as np
+
+from backend.allocation_core import INTERVIEW_CAPACITY, INTERVIEWS_PER_STUDENT
+from backend.compact_model import Preferences
+
+
+def dense_numbers(ids):
+    """Map IDs to 0..n-1, returning (distinct ids, dense number per entry)"""
+    id_types = set(map(type, ids))
+    if id_types == {int} or id_types == {str}:
+        distinct, dense = np.unique(np.asarray(ids), return_inverse=True)
+        return distinct.tolist(), dense
+
+    # NumPy would coerce mixed ID types to strings, so number them in first-seen order
+    index = {}
+    dense = np.fromiter((index.setdefault(i, len(index)) for i in ids), dtype=np.int64, count=len(ids))
+    return list(index), dense
+
+
+def build_preference_arrays(students, rankings):
+    """Flatten preferences in processing order into compact arrays
+
+    Returns (pref_start, pref_company, company_ids): student k's preferences are
+    pref_company[pref_start[k]:pref_start[k + 1]], as dense numbers into company_ids.
+    Compact Preferences (see compact_model.py) are already in this form and are
+    only reordered, without building a dict per preference.
+    """
+    if isinstance(rankings, Preferences):
+        pref_start, pref_company = rankings.in_order([student["StudentID"] for student in students])
+        return pref_start, pref_company, rankings.companies.ids
+
+    preference_lists = [rankings.get(student["StudentID"], ()) for student in students]
+    flat_company_ids = [pref["CompanyID"] for prefs in preference_lists for pref in prefs]
+    pref_start = np.zeros(len(students) + 1, dtype=np.int64)
+    np.cumsum([len(prefs) for prefs in preference_lists], out=pref_start[1:])
+    if not flat_company_ids:
+        return pref_start, np.zeros(0, dtype=np.int64), []
+    company_ids, pref_company = dense_numbers(flat_company_ids)
+    return pref_start, pref_company, company_ids
+
+
+def allocate_from_arrays(pref_start, pref_company, room, per_student=INTERVIEWS_PER_STUDENT):
+    """Greedy allocation over compact arrays
+
+    room[c] is the number of interview slots dense company c offers. Returns one
+    sequence of dense company numbers per student, in processing order.
+    """
+    n_students = len(pref_start) - 1
+    # Students only get their own list once they are allocated something
+    allocations = [()] * n_students
+    if len(pref_company) == 0:
+        return allocations
+
+    # Each company's flat positions, so filling it can close them all at once.
+    # A narrow dtype lets NumPy use a radix sort for the grouping.
+    narrow = np.int16 if len(room) < 2 ** 15 else np.int64
+    by_company = np.argsort(pref_company.astype(narrow), kind="stable")
+    boundaries = np.cumsum(np.bincount(pref_company, minlength=len(room)))[:-1]
+    positions_of = np.split(by_company, boundaries)
+    remaining = list(room)
+
+    # open_position[p] is False once preference p's company has no room left
+    open_position = np.ones(len(pref_company), dtype=bool)
+    for c, slots in enumerate(remaining):
+        if slots <= 0:
+            open_position[positions_of[c]] = False
+    open_slots = sum(slots for slots in remaining if slots > 0)
+    pref_start = pref_start.tolist() if isinstance(pref_start, np.ndarray) else pref_start
+    pref_company = pref_company.tolist()
+
+    for k in range(n_students):
+        # Once every company is full nobody later can be allocated anything
+        if open_slots == 0:
+            break
+
+        start = pref_start[k]
+        allocated = []
+        for position in (start + np.flatnonzero(open_position[start:pref_start[k + 1]])).tolist():
+            c = pref_company[position]
+            # A company can fill part way through this student's own list
+            if remaining[c] <= 0:
+                continue
+            allocated.append(c)
+            remaining[c] -= 1
+            open_slots -= 1
+            if remaining[c] == 0:
+                open_position[positions_of[c]] = False
+            if len(allocated) >= per_student:
+                break
+        if allocated:
+            allocations[k] = allocated
+
+    return allocations
+
+
+def allocate_interview_slots_indexed(students, rankings, capacity=INTERVIEW_CAPACITY,
+                                     per_student=INTERVIEWS_PER_STUDENT, capacities=None):
+    """Same inputs and result as allocate_interview_slots, using compact arrays"""
+    students = list(students)
+    capacities = capacities or {}
+    pref_start, pref_company, company_ids = build_preference_arrays(students, rankings)
+    room = [capacities.get(cid, capacity) for cid in company_ids]
+    allocations = allocate_from_arrays(pref_start, pref_company, room, per_student)
+    return {
+        student["StudentID"]: [company_ids[c] for c in allocated]
+        for student, allocated in zip(students, allocations)
+    }
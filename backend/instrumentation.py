@@ -0,0 +1,214 @@
+"""
+Run reports for the allocation stages.
+
+A RunReport collects, for one run of allocate_interviews or run_final_match:
+
+    phases    - wall time per phase (load, score, match, persist, ...)
+    counters  - database round trips and rows read, written and deleted, counted
+                on the client, plus what the stage counts itself (students, pairs, matches)
+    profile   - with profile=True, the functions cProfile saw take the most time
+    memory    - with trace_memory=True, tracemalloc's peak and largest allocation sites
+
+to_dict() gives it as plain data and write() saves it as JSON. A listener, if
+given, is called as each phase starts and finishes, to report progress while
+the run is still going. Round trips are
+counted by wrapping the data source's Supabase client for the duration of the run
+(see RunReport.run), so every request is seen, whichever helper sends it. The
+profiler only sees the calling thread, not snapshot reader threads.
+"""
+import contextlib
+import cProfile
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+
+from backend.data_sources import TableDataSource
+
+# Entries kept from the profile and from tracemalloc's allocation sites
+TOP_ENTRIES = 15
+
+# Query builder calls that decide what kind of request is sent
+READ_ACTIONS = {"select"}
+WRITE_ACTIONS = {"insert", "upsert", "update"}
+
+
+class RunReport:
+    """Phase timings, request counters and optional profiles for one allocation run"""
+
+    def __init__(self, name, profile=False, trace_memory=False, listener=None):
+        self.name = name
+        self.profile = profile
+        self.trace_memory = trace_memory
+        # Called with {"phase", "status": "started"|"finished", "seconds"} events
+        self.listener = listener
+        self.started_at = None
+        self.wall_time = None
+        self.phases = {}
+        self.counters = Counter()
+        self.profile_stats = None
+        self.memory = None
+        # Snapshot loads send requests from several threads
+        self._lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Time a phase; a phase entered more than once accumulates"""
+        if self.listener:
+            self.listener({"phase": name, "status": "started"})
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+            if self.listener:
+                self.listener({"phase": name, "status": "finished", "seconds": round(seconds, 4)})
+
+    @contextlib.contextmanager
+    def run(self, source=None):
+        """Time the whole run, count the requests source sends and run the optional profilers"""
+        restore = attach(source, self) if source is not None else (lambda: None)
+        profiler = cProfile.Profile() if self.profile else None
+        if self.trace_memory:
+            tracemalloc.start()
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            yield self
+        finally:
+            if profiler:
+                profiler.disable()
+                self.profile_stats = top_functions(profiler)
+            self.wall_time = time.perf_counter() - start
+            if self.trace_memory:
+                self.memory = memory_summary()
+                tracemalloc.stop()
+            restore()
+
+    def summary(self):
+        """One line of phase times, for the log"""
+        phases = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.phases.items())
+        trips = self.counters.get("round_trips")
+        return f"{self.name}: {phases}" + (f", {trips} round trips" if trips is not None else "")
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "started_at": self.started_at,
+            "wall_time_s": None if self.wall_time is None else round(self.wall_time, 4),
+            "phases_s": {name: round(seconds, 4) for name, seconds in self.phases.items()},
+            "counters": dict(self.counters),
+            "profile": self.profile_stats,
+            "memory": self.memory,
+        }
+
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+def top_functions(profiler, limit=TOP_ENTRIES):
+    """The functions with the most cumulative time, as plain rows"""
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+        rows.append({"function": f"{filename}:{line}({function})", "calls": calls,
+                     "own_s": round(own, 4), "cumulative_s": round(cumulative, 4)})
+    rows.sort(key=lambda row: row["cumulative_s"], reverse=True)
+    return rows[:limit]
+
+
+def memory_summary(limit=TOP_ENTRIES):
+    """tracemalloc's peak and the source lines holding the most memory now"""
+    current, peak = tracemalloc.get_traced_memory()
+    sites = tracemalloc.take_snapshot().statistics("lineno")[:limit]
+    return {
+        "current_mb": round(current / 2 ** 20, 2),
+        "peak_mb": round(peak / 2 ** 20, 2),
+        "top_sites": [{"site": str(stat.traceback), "size_kb": round(stat.size / 1024, 1), "blocks": stat.count}
+                      for stat in sites],
+    }
+
+
+class CountingClient:
+    """Wraps a Supabase client, counting every request it executes in a RunReport"""
+
+    def __init__(self, client, report):
+        self.client = client
+        self.report = report
+
+    def table(self, name):
+        return CountingRequest(self.client.table(name), self.report, name)
+
+    def rpc(self, name, *args, **kwargs):
+        return CountingRequest(self.client.rpc(name, *args, **kwargs), self.report, name, "rpc")
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+class CountingRequest:
+    """A query builder step; execute() sends the request and counts it"""
+
+    def __init__(self, request, report, table, action=None, payload_rows=0):
+        self.request = request
+        self.report = report
+        self.table = table
+        self.action = action
+        self.payload_rows = payload_rows
+
+    def __getattr__(self, name):
+        attr = getattr(self.request, name)
+        if not callable(attr):
+            return attr
+
+        def step(*args, **kwargs):
+            action, payload_rows = self.action, self.payload_rows
+            if name in READ_ACTIONS or name in WRITE_ACTIONS or name == "delete":
+                action = name
+                payload_rows = len(args[0]) if args and isinstance(args[0], list) else int(bool(args))
+            return CountingRequest(attr(*args, **kwargs), self.report, self.table, action, payload_rows)
+        return step
+
+    def execute(self):
+        response = self.request.execute()
+        report = self.report
+        report.count("round_trips")
+        report.count(f"requests.{self.table}")
+        data = getattr(response, "data", None)
+        if self.action in WRITE_ACTIONS:
+            report.count("rows_written", self.payload_rows)
+        elif self.action == "delete":
+            report.count("rows_deleted", len(data) if isinstance(data, list) else 0)
+        elif self.action in READ_ACTIONS and isinstance(data, list):
+            report.count("rows_read", len(data))
+        return response
+
+
+def attach(source, report):
+    """Count the requests of every Supabase client source reads through; returns a function undoing it
+
+    Follows .source, so a snapshot's underlying database source is counted too.
+    """
+    wrapped = []
+    while isinstance(source, TableDataSource):
+        client = getattr(source, "client", None)
+        if client is not None and not isinstance(client, CountingClient):
+            source.client = CountingClient(client, report)
+            wrapped.append((source, client))
+        source = getattr(source, "source", None)
+
+    def restore():
+        for owner, client in wrapped:
+            owner.client = client
+    return restore
@@ -1,134 +1,251 @@
-import os
-import re
-from dotenv import load_dotenv
-from supabase import create_client
-
-# Load environment variables from .env file
-backend_env = os.path.join(os.path.dirname(__file__), '.env')
-project_env = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env'))
-
-# Try to load from backend directory first, then project root
-if os.path.exists(backend_env):
-    load_dotenv(dotenv_path=backend_env)
-    print(f"Loaded .env from {backend_env}")
-elif os.path.exists(project_env):
-    load_dotenv(dotenv_path=project_env)
-    print(f"Loaded .env from {project_env}")
-else:
-    print("No .env file found")
-
-# Get Supabase credentials from environment variables with VITE_ prefix
-SUPABASE_URL = os.getenv("VITE_SUPABASE_URL")
-SUPABASE_KEY = os.getenv("VITE_SUPABASE_ANON_KEY")
-
-# Remove quotes if present (sometimes .env parsers keep the quotes)
-if SUPABASE_URL and SUPABASE_URL.startswith('"') and SUPABASE_URL.endswith('"'):
-    SUPABASE_URL = SUPABASE_URL[1:-1]
-if SUPABASE_KEY and SUPABASE_KEY.startswith('"') and SUPABASE_KEY.endswith('"'):
-    SUPABASE_KEY = SUPABASE_KEY[1:-1]
-
-# Debug output
-print("SUPABASE_URL:", SUPABASE_URL)
-print("SUPABASE_KEY is set:", bool(SUPABASE_KEY))
-print("SUPABASE_KEY first 10 chars:", SUPABASE_KEY[:10] + "..." if SUPABASE_KEY else "None")
-
-# Initialize Supabase client
+import argparse
+import functools
+import logging
+
+from backend.allocation_core import (DEFAULT_POSITIONS, INTERVIEW_CAPACITY, INTERVIEWS_PER_STUDENT,
+                                     allocate_interview_slots, order_students)
+from backend.capacities import CapacityCache, interview_capacities
+from backend.bulk_writes import DEFAULT_CHUNK_SIZE, DEFAULT_RETRIES, DEFAULT_RETRY_DELAY, is_missing_function
+from backend.data_sources import INTERVIEW_ALLOCATION_FUNCTION, SupabaseDataSource
+from backend.instrumentation import RunReport
+from backend.pagination import DEFAULT_PAGE_SIZE
+from backend.snapshot import INTERVIEW_TABLES, load_snapshot
+from backend.supabase_client import get_client
+
+logger = logging.getLogger(__name__)
+
+# Supabase client override; when left as None the shared client is created on first use
 supabase = None
-if SUPABASE_URL and SUPABASE_KEY:
-    try:
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-        print("Supabase client initialized successfully")
-    except Exception as e:
-        print(f"Error initializing Supabase client: {e}")
-else:
-    print("Supabase client not initialized — URL or key missing")
+
+def get_supabase():
+    """Return the client this module should use, creating the shared one lazily"""
+    return supabase if supabase is not None else get_client()
 
 # Helper functions
+def iter_sorted_students(page_size=DEFAULT_PAGE_SIZE):
+    """Stream students by QCA (highest first), one page at a time"""
+    client = get_supabase()
+    if client is None:
+        logger.warning("Supabase is not initialized. Returning empty student list.")
+        return iter(())
+    return SupabaseDataSource(client, page_size=page_size).iter_students()
+
 def get_sorted_students():
-    if supabase is None:
-        print("Supabase is not initialized. Returning empty student list.")
-        return []
-    result = supabase.table("Student").select("StudentID, QCA").order("QCA", desc=True).execute()
-    return result.data
+    return list(iter_sorted_students())
 
 def get_student_rankings(student_id):
-    if supabase is None:
+    client = get_supabase()
+    if client is None:
         return []
-    result = supabase.table("StudentRank1") \
+    result = client.table("StudentRank1") \
         .select("CompanyID, Rank") \
         .eq("StudentID", student_id) \
         .order("Rank", desc=False) \
         .execute()
     return result.data
 
+def get_all_student_rankings(page_size=DEFAULT_PAGE_SIZE):
+    """Load every student's ranked preferences in one paged read, keyed by StudentID"""
+    client = get_supabase()
+    if client is None:
+        return {}
+    return SupabaseDataSource(client, page_size=page_size).load_student_rankings()
+
 def get_company_allocation_counts():
-    if supabase is None:
+    client = get_supabase()
+    if client is None:
         return {}
-    result = supabase.table("InterviewAllocated").select("CompanyID, count:StudentID", count="exact").execute()
+    result = client.table("InterviewAllocated").select("CompanyID, count:StudentID", count="exact").execute()
     allocation_counts = {}
     for record in result.data:
         company_id = record['CompanyID']
         allocation_counts[company_id] = allocation_counts.get(company_id, 0) + 1
     return allocation_counts
 
-def allocate_interviews():
-    # Get students sorted by QCA (highest first)
-    students = get_sorted_students()
-
-    # Start with empty allocation counts
-    allocation_counts = {}
-    student_allocations = {}
-
-    # Clear any existing allocations to start fresh
-    supabase.table("InterviewAllocated").delete().neq("StudentID", 0).execute()
-
-    # Process students in strict QCA order
-    for student in students:
-        student_id = student["StudentID"]
-        preferences = get_student_rankings(student_id)
-
-        # Diagnostic: Check if student has preferences
-        if not preferences:
-            print(f"Student {student_id} has no preferences in StudentRank1 table")
-            student_allocations[student_id] = []
-            continue
-
-        allocated = 0
-        student_allocations[student_id] = []
-
-        # Try to allocate based on preferences in ranked order
-        for pref in preferences:
-            company_id = pref["CompanyID"]
-            current_count = allocation_counts.get(company_id, 0)
-
-            if current_count < 6:
-                # Allocate
-                supabase.table("InterviewAllocated").insert({
-                    "StudentID": student_id,
-                    "CompanyID": company_id
-                }).execute()
-
-                allocation_counts[company_id] = current_count + 1
-                student_allocations[student_id].append(company_id)
-                allocated += 1
-
-                if allocated >= 3:
-                    break
-
-        # Report allocation results for this student
-        if allocated == 0:
-            print(f"Student {student_id} could not be allocated to any companies - all preferences at capacity")
-        elif allocated < 3:
-            print(f"Student {student_id} only allocated to {allocated} companies - not enough available preferences")
+def allocation_rows(student_allocations):
+    """Flatten {StudentID: [CompanyID, ...]} into InterviewAllocated rows"""
+    return [
+        {"StudentID": student_id, "CompanyID": company_id}
+        for student_id, company_ids in student_allocations.items()
+        for company_id in company_ids
+    ]
+
+def write_interview_allocations(student_allocations, chunk_size=DEFAULT_CHUNK_SIZE,
+                                retries=DEFAULT_RETRIES, retry_delay=DEFAULT_RETRY_DELAY):
+    """Replace InterviewAllocated with the given allocations using chunked bulk inserts"""
+    source = SupabaseDataSource(get_supabase(), chunk_size=chunk_size, retries=retries, retry_delay=retry_delay)
+    return source.save_interview_allocations(allocation_rows(student_allocations))
+
+def report_allocations(student_allocations, rankings, per_student=INTERVIEWS_PER_STUDENT, report=None):
+    """Count how students fared against their preferences, logging each student at DEBUG level"""
+    outcomes = {"no_preferences": 0, "unallocated": 0, "partly_allocated": 0, "fully_allocated": 0}
+    detailed = logger.isEnabledFor(logging.DEBUG)
+    for student_id, companies in student_allocations.items():
+        allocated = len(companies)
+        if not rankings.get(student_id):
+            outcomes["no_preferences"] += 1
+            if detailed:
+                logger.debug("Student %s has no preferences in StudentRank1 table", student_id)
+        elif allocated == 0:
+            outcomes["unallocated"] += 1
+            if detailed:
+                logger.debug("Student %s could not be allocated to any companies - all preferences at capacity",
+                             student_id)
+        elif allocated < per_student:
+            outcomes["partly_allocated"] += 1
+            if detailed:
+                logger.debug("Student %s only allocated to %d companies - not enough available preferences",
+                             student_id, allocated)
         else:
-            print(f"Student {student_id} successfully allocated to {allocated} companies")
-
+            outcomes["fully_allocated"] += 1
+            if detailed:
+                logger.debug("Student %s successfully allocated to %d companies", student_id, allocated)
+
+    logger.info("Students: %d fully allocated, %d partly, %d unallocated, %d without preferences",
+                outcomes["fully_allocated"], outcomes["partly_allocated"], outcomes["unallocated"],
+                outcomes["no_preferences"])
+    if report is not None:
+        for outcome, n in outcomes.items():
+            report.count(f"students.{outcome}", n)
+    return outcomes
+
+def get_allocator(allocator):
+    """Look up an interview allocator by name: loop, indexed or sharded"""
+    if allocator == "loop":
+        return allocate_interview_slots
+    if allocator == "indexed":
+        # Imported here so NumPy is only loaded when the indexed allocator is used
+        from backend.indexed_allocation import allocate_interview_slots_indexed
+        return allocate_interview_slots_indexed
+    if allocator == "sharded":
+        from backend.sharded_allocation import allocate_interview_slots_sharded
+        return allocate_interview_slots_sharded
+    raise ValueError(f"Unknown interview allocator: {allocator}")
+
+def allocate_in_database(source, capacity=INTERVIEW_CAPACITY, per_student=INTERVIEWS_PER_STUDENT):
+    """Allocate and write InterviewAllocated with one database call (allocator "database")
+
+    Returns the per-student outcomes of the allocate_interviews database function
+    (see supabase/migrations), or None when the source has no database or the
+    function is not installed, in which case the caller allocates in Python.
+    """
+    try:
+        return source.allocate_interviews_in_database(capacity, per_student, DEFAULT_POSITIONS)
+    except NotImplementedError:
+        logger.warning("%s cannot allocate in the database, allocating in Python", type(source).__name__)
+    except Exception as e:
+        if not is_missing_function(e):
+            raise
+        logger.warning("Database function %s not found, allocating in Python", INTERVIEW_ALLOCATION_FUNCTION)
+    return None
+
+def allocate_interviews(source=None, page_size=DEFAULT_PAGE_SIZE, chunk_size=DEFAULT_CHUNK_SIZE,
+                        retries=DEFAULT_RETRIES, retry_delay=DEFAULT_RETRY_DELAY, capacity_cache=None,
+                        allocator="loop", max_concurrency=None, capacity=INTERVIEW_CAPACITY,
+                        per_student=INTERVIEWS_PER_STUDENT, report=None, tie_break_seed=None, workers=None):
+    """Allocate interviews from a data source (Supabase by default) and save the result
+
+    allocator selects the implementation (see get_allocator); all give the same
+    result. The sharded allocator runs independent parts of the cohort in up to
+    workers processes. With allocator "database" the whole allocation runs inside the
+    database in one round trip (see allocate_in_database), falling back to the
+    loop allocator where it cannot. Students with equal QCAs are taken in
+    StudentID order, or with tie_break_seed in an order drawn from that seed
+    (see allocation_core.order_students). capacity is the interview slots of a company
+    with the default number of positions, and per_student the interviews each
+    student can get. Pass a shared CapacityCache with a ttl to reuse Position
+    openings across runs.
+    With max_concurrency set, every input table is first read concurrently into a
+    snapshot (see snapshot.py) using at most that many simultaneous reads.
+    Pass a RunReport (see instrumentation.py) to get phase timings, request counts
+    and optional profiles of the run.
+    """
+    allocate = get_allocator("loop" if allocator == "database" else allocator)
+    if allocator == "sharded" and workers:
+        allocate = functools.partial(allocate, max_workers=workers)
+    if allocator == "database" and tie_break_seed is not None:
+        raise ValueError("The database allocator breaks QCA ties by StudentID; tie_break_seed needs another allocator")
+    if source is None:
+        client = get_supabase()
+        if client is None:
+            logger.error("Supabase client not initialized. Cannot allocate interviews.")
+            return {}
+        source = SupabaseDataSource(client, page_size=page_size, chunk_size=chunk_size,
+                                    retries=retries, retry_delay=retry_delay)
+    report = report or RunReport("interviews")
+
+    with report.run(source):
+        outcomes = None
+        if allocator == "database":
+            # Reading, matching and writing all happen in the database
+            with report.phase("match"):
+                outcomes = allocate_in_database(source, capacity, per_student)
+
+        if outcomes is not None:
+            student_allocations = {row["StudentID"]: row["CompanyIDs"] for row in outcomes}
+            with report.phase("report"):
+                # Only whether a student had any preferences matters to the report
+                report_allocations(student_allocations, {row["StudentID"]: row["HasPreferences"] for row in outcomes},
+                                   per_student, report)
+            written = sum(len(companies) for companies in student_allocations.values())
+        else:
+            with report.phase("load"):
+                if max_concurrency:
+                    source = load_snapshot(source, INTERVIEW_TABLES, max_concurrency=max_concurrency)
+
+                # Every student's preferences up front; students are streamed by QCA
+                # (highest first) while they are matched. The indexed allocator reads
+                # preferences compactly, straight into the arrays it works on.
+                rankings = source.load_preferences() if allocator == "indexed" else source.load_student_rankings()
+                students = source.iter_students()
+                if tie_break_seed is not None:
+                    # Reordering ties needs every student of a QCA, so the stream is read in full
+                    students = order_students(students, tie_break_seed)
+
+                # Interview slots per company, from one bulk read of the Position table
+                positions = (capacity_cache or CapacityCache()).get(source)
+                capacities = interview_capacities(positions, capacity=capacity)
+
+            # Process students in strict QCA order as they arrive
+            with report.phase("match"):
+                student_allocations = allocate(students, rankings, capacity=capacity, per_student=per_student,
+                                               capacities=capacities)
+            with report.phase("report"):
+                report_allocations(student_allocations, rankings, per_student, report)
+
+            # Write the whole result in bulk once allocation has finished
+            with report.phase("persist"):
+                written = source.save_interview_allocations(allocation_rows(student_allocations))
+        logger.info("Wrote %d interview allocations", written)
+        report.count("students", len(student_allocations))
+        report.count("interviews", sum(len(companies) for companies in student_allocations.values()))
+
+    logger.info(report.summary())
     return student_allocations
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Allocate interviews from Supabase")
+    parser.add_argument("--allocator", default="loop", help="loop, indexed, sharded or database")
+    parser.add_argument("--workers", type=int, help="processes for the sharded allocator (default: one per CPU)")
+    parser.add_argument("--tie-break-seed", help="break QCA ties in an order drawn from this seed")
+    parser.add_argument("--report", help="write a JSON run report to this file")
+    parser.add_argument("--profile", action="store_true", help="include a cProfile summary in the report")
+    parser.add_argument("--trace-memory", action="store_true", help="include tracemalloc peaks in the report")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every student's allocation")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(message)s")
+
+    if get_supabase() is None:
+        logger.error("Cannot allocate interviews: Supabase client not initialized")
+        return 1
+    report = RunReport("interviews", profile=args.profile, trace_memory=args.trace_memory)
+    allocations = allocate_interviews(allocator=args.allocator, report=report, tie_break_seed=args.tie_break_seed,
+                                      workers=args.workers)
+    for sid, companies in allocations.items():
+        logger.debug("Student %s allocated to companies: %s", sid, companies)
+    if args.report:
+        report.write(args.report)
+    return 0
+
 if __name__ == "__main__":
-    if supabase:
-        allocations = allocate_interviews()
-        for sid, companies in allocations.items():
-            print(f"Student {sid} allocated to companies: {companies}")
-    else:
-        print("Cannot allocate interviews: Supabase client not initialized")
\ No newline at end of file
+    raise SystemExit(main())
@@ -0,0 +1,484 @@
+"""
+A local stand-in for Supabase's REST API, for load testing without a network.
+
+LocalPostgREST serves the subset of PostgREST the allocation modules use over
+plain HTTP from an SQLite database, so the real supabase-py client, its query
+chains and the paging code all run exactly as they do against Supabase:
+
+    GET    /rest/v1/<table>?select=a,b&col=eq.1&order=a.desc,b.asc&offset=0&limit=1000
+    POST   /rest/v1/<table>          insert a row or a list of rows
+    PATCH  /rest/v1/<table>?filters  update the matching rows
+    DELETE /rest/v1/<table>?filters  delete the matching rows
+    POST   /rest/v1/rpc/<function>   call a function registered in functions
+
+FUNCTIONS holds twins of the database functions in supabase/migrations: an
+SQLite allocate_interviews, and the apply_final_matches_diff FakeSupabase uses
+too. The twins are hand-written translations, not the migrations themselves: tests
+that call them show the twin agrees with the Python engine, and say nothing
+about the plpgsql. Only test_database_allocation's Postgres test runs a
+migration, and it is skipped unless ALLOCATION_TEST_POSTGRES_URL names a
+server, so a change to the SQL is unverified until it is run there.
+
+Filters are eq, neq, gt, gte, lt, lte, in and is; "Prefer: count=exact" gives a
+Content-Range total and "return=minimal" an empty body. Errors come back as
+PostgREST error objects, so a missing function is a PGRST202 APIError.
+
+Every request sleeps for latency seconds before it is answered, outside the
+database lock, and is counted (round_trips, requests, rows_read, rows_written,
+as FakeSupabase counts them), so round-trip-bound code is as slow here as it
+would be over a real network. A server can be loaded with a synthetic cohort:
+
+    python -m backend.local_postgrest --students 5000 --latency-ms 2 --port 54321
+
+then run either stage with VITE_SUPABASE_URL=http://127.0.0.1:54321 and any
+VITE_SUPABASE_ANON_KEY.
+"""
+import argparse
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from backend.fake_supabase import apply_final_matches_diff
+
+# Column types of the tables the allocation modules use; other columns get a
+# type from the first value loaded into them. Typed columns compare correctly
+# against the text values that arrive in query strings.
+SCHEMA = {
+    "Student": {"StudentID": "INTEGER", "QCA": "REAL"},
+    "StudentRank1": {"StudentID": "INTEGER", "CompanyID": "INTEGER", "Rank": "INTEGER"},
+    "Position": {"CompanyID": "INTEGER", "Openings": "INTEGER"},
+    "Company": {"CompanyID": "INTEGER", "CompanyName": "TEXT"},
+    "InterviewAllocated": {"StudentID": "INTEGER", "CompanyID": "INTEGER"},
+    "StudentInterviewRank": {"StudentID": "INTEGER", "CompanyID": "INTEGER", "Rank": "INTEGER"},
+    "CompanyInterviewRank": {"StudentID": "INTEGER", "CompanyID": "INTEGER", "Rank": "INTEGER"},
+    "FinalMatches": {"StudentID": "INTEGER", "CompanyID": "INTEGER", "CombinedScore": "REAL"},
+    "User": {"ID": "INTEGER", "FirstName": "TEXT", "Surname": "TEXT"},
+    "CompanyFillStats": {"CompanyID": "INTEGER", "CompanyName": "TEXT", "Positions": "INTEGER",
+                         "Interviewees": "INTEGER", "Filled": "INTEGER", "FillRate": "REAL"},
+    "StudentOutcome": {"StudentID": "INTEGER", "StudentName": "TEXT", "CompanyID": "INTEGER", "CompanyName": "TEXT",
+                       "CombinedScore": "REAL", "StudentRank": "INTEGER", "CompanyRank": "INTEGER"},
+    "RankHistogram": {"Side": "TEXT", "Rank": "INTEGER", "Matches": "INTEGER"},
+}
+
+# Indexes created by supabase/migrations, as table -> [columns, ...]
+INDEXES = {
+    "StudentRank1": [("StudentID", "Rank")],
+    "StudentOutcome": [("StudentID",), ("CompanyID",)],
+    "CompanyFillStats": [("CompanyID",)],
+}
+
+DEFAULT_ANON_KEY = "local-anon-key"
+
+# Request kinds as FakeSupabase counts them
+ACTIONS = {"GET": "select", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
+
+FILTER_OPERATORS = {"eq": "=", "neq": "<>", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+class RequestError(Exception):
+    """Answered as a PostgREST error object with the given HTTP status and code"""
+
+    def __init__(self, status, code, message):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+class LocalPostgREST:
+    """An HTTP server answering PostgREST requests from an SQLite database"""
+
+    def __init__(self, tables=None, latency=0.0, max_rows=None, functions=None, path=":memory:",
+                 host="127.0.0.1", port=0):
+        self.latency = latency
+        # Like PostgREST's db-max-rows: no response carries more rows than this
+        self.max_rows = max_rows
+        self.functions = dict(functions or {})
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.RLock()
+        self.round_trips = 0
+        self.requests = Counter()
+        self.requests_by_table = Counter()
+        self.rows_read = 0
+        self.rows_written = 0
+        self.server = ThreadingHTTPServer((host, port), _handler_for(self))
+        self.server.daemon_threads = True
+        self._thread = None
+        self.load_tables(tables or {})
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve requests on a background thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving; the database stays readable through rows()"""
+        if self._thread is not None:
+            self.server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def client(self, key=DEFAULT_ANON_KEY):
+        """A real supabase-py client pointed at this server"""
+        from supabase import create_client
+        return create_client(self.url, key)
+
+    def reset_counters(self):
+        with self.lock:
+            self.round_trips = 0
+            self.requests = Counter()
+            self.requests_by_table = Counter()
+            self.rows_read = 0
+            self.rows_written = 0
+
+    # Tables ---------------------------------------------------------------
+
+    def load_tables(self, tables):
+        """Create the allocation tables, then (re)fill the given ones with rows"""
+        with self.lock, self.db:
+            for table in SCHEMA:
+                self._create_table(table, [])
+            for table, rows in tables.items():
+                self._create_table(table, rows)
+                self.db.execute(f"DELETE FROM {_quote(table)}")
+                self._insert(table, rows)
+
+    def rows(self, table):
+        """Every row of table, in insertion order"""
+        with self.lock:
+            cursor = self.db.execute(f"SELECT * FROM {_quote(table)} ORDER BY rowid")
+            names = [d[0] for d in cursor.description]
+            return [dict(zip(names, values)) for values in cursor.fetchall()]
+
+    def delete_keys(self, table, columns, keys):
+        """Delete the rows whose values in columns are one of keys; for database function twins"""
+        where = " AND ".join(f"{_quote(c)} = ?" for c in columns)
+        return sum(self.db.execute(f"DELETE FROM {_quote(table)} WHERE {where}", tuple(map(_to_sql, key))).rowcount
+                   for key in keys)
+
+    def insert_rows(self, table, rows):
+        """Insert rows into table; for database function twins"""
+        return self._insert(table, rows)
+
+    def _columns(self, table):
+        return [row[1] for row in self.db.execute(f"PRAGMA table_info({_quote(table)})")]
+
+    def _create_table(self, table, rows):
+        types = dict(SCHEMA.get(table, {}))
+        for row in rows:
+            for column, value in row.items():
+                if column not in types and value is not None:
+                    types[column] = _sql_type(value)
+                types.setdefault(column, "")
+        existing = self._columns(table)
+        if not existing:
+            columns = ", ".join(f"{_quote(c)} {t}".strip() for c, t in types.items()) or '"id" INTEGER'
+            self.db.execute(f"CREATE TABLE {_quote(table)} ({columns})")
+            for index in INDEXES.get(table, []):
+                self.db.execute(f"CREATE INDEX {_quote(table + '_' + '_'.join(index) + '_idx')}"
+                                f" ON {_quote(table)} ({', '.join(map(_quote, index))})")
+            return
+        for column, sql_type in types.items():
+            if column not in existing:
+                self.db.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(column)} {sql_type}".strip())
+
+    def _insert(self, table, rows):
+        if not rows:
+            return 0
+        columns = list(dict.fromkeys(column for row in rows for column in row))
+        unknown = set(columns) - set(self._columns(table))
+        if unknown:
+            raise RequestError(400, "PGRST204", f"Could not find the '{sorted(unknown)[0]}' column of '{table}'")
+        placeholders = ", ".join("?" for _ in columns)
+        self.db.executemany(
+            f"INSERT INTO {_quote(table)} ({', '.join(map(_quote, columns))}) VALUES ({placeholders})",
+            [tuple(_to_sql(row.get(c)) for c in columns) for row in rows])
+        return len(rows)
+
+    # Requests -------------------------------------------------------------
+
+    def handle(self, method, path, params, headers, body):
+        """Answer one request, returning (status, headers, JSON-serialisable body or None)"""
+        parts = [part for part in path.split("/") if part]
+        if parts[:2] != ["rest", "v1"] or len(parts) < 3:
+            raise RequestError(404, "PGRST125", f"Invalid path specified in request URL: {path}")
+        prefer = headers.get("Prefer") or ""
+        if parts[2] == "rpc" and len(parts) == 4 and method == "POST":
+            return self._call(parts[3], body)
+        table = parts[2]
+        with self.lock:
+            self.requests_by_table[table] += 1
+            if not self._columns(table):
+                raise RequestError(404, "42P01", f'relation "public.{table}" does not exist')
+            if method == "GET":
+                return self._select(table, params, prefer)
+            if method == "POST":
+                return self._write(table, "INSERT", params, body, prefer)
+            if method == "PATCH":
+                return self._write(table, "UPDATE", params, body, prefer)
+            if method == "DELETE":
+                return self._write(table, "DELETE", params, body, prefer)
+        raise RequestError(405, "PGRST117", f"Unsupported HTTP method: {method}")
+
+    def _call(self, name, params):
+        with self.lock:
+            self.requests_by_table[name] += 1
+            if name not in self.functions:
+                raise RequestError(404, "PGRST202", f"Could not find the function public.{name} in the schema cache")
+            # One transaction, as PostgREST runs every function call
+            with self.db:
+                return 200, {}, self.functions[name](self, params or {})
+
+    def _select(self, table, params, prefer):
+        columns = _select_columns(params.get("select", "*"))
+        where, values = _where(params)
+        order = _order_by(params.get("order"))
+        limit = int(params["limit"]) if "limit" in params else None
+        offset = int(params.get("offset", 0))
+        if self.max_rows is not None:
+            limit = self.max_rows if limit is None else min(limit, self.max_rows)
+
+        cursor = self.db.execute(f"SELECT {columns} FROM {_quote(table)}{where}{order}"
+                                 f" LIMIT {-1 if limit is None else limit} OFFSET {offset}", values)
+        names = [d[0] for d in cursor.description]
+        rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+        self.rows_read += len(rows)
+
+        response_headers = {}
+        if "count=exact" in prefer:
+            total = self.db.execute(f"SELECT COUNT(*) FROM {_quote(table)}{where}", values).fetchone()[0]
+            end = offset + len(rows) - 1
+            response_headers["Content-Range"] = f"{offset}-{end}/{total}" if rows else f"*/{total}"
+        return 200, response_headers, rows
+
+    def _write(self, table, action, params, body, prefer):
+        where, values = _where(params)
+        with self.db:
+            if action == "INSERT":
+                rows = body if isinstance(body, list) else [body]
+                self.rows_written += self._insert(table, rows)
+                changed = rows
+            else:
+                changed = self._select(table, {"select": "*", **params}, "")[2]
+                self.rows_read -= len(changed)
+                if action == "UPDATE":
+                    assignments = ", ".join(f"{_quote(c)} = ?" for c in body)
+                    self.db.execute(f"UPDATE {_quote(table)} SET {assignments}{where}",
+                                    [_to_sql(v) for v in body.values()] + values)
+                    changed = [dict(row, **body) for row in changed]
+                    self.rows_written += len(changed)
+                else:
+                    self.db.execute(f"DELETE FROM {_quote(table)}{where}", values)
+        status = 201 if action == "INSERT" else 200
+        if "return=minimal" in prefer:
+            return (status if action == "INSERT" else 204), {}, None
+        return status, {}, changed
+
+    def _request(self, handler):
+        """Parse, delay, answer and count one HTTP request"""
+        url = urlsplit(handler.path)
+        params = dict(parse_qsl(url.query, keep_blank_values=True))
+        length = int(handler.headers.get("Content-Length") or 0)
+        raw = handler.rfile.read(length) if length else b""
+        rpc = url.path.rstrip("/").rsplit("/", 2)[-2] == "rpc"
+        with self.lock:
+            self.round_trips += 1
+            self.requests["rpc" if rpc else ACTIONS.get(handler.command, handler.command)] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        try:
+            body = json.loads(raw) if raw else None
+            status, headers, payload = self.handle(handler.command, url.path, params, handler.headers, body)
+        except RequestError as e:
+            status, headers, payload = e.status, {}, _error(e.code, str(e))
+        except (sqlite3.Error, ValueError) as e:
+            status, headers, payload = 400, {}, _error("PGRST100", str(e))
+        encoded = b"" if payload is None else json.dumps(payload).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json; charset=utf-8")
+        handler.send_header("Content-Length", str(len(encoded)))
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(encoded)
+
+
+def allocate_interviews(server, params):
+    """SQLite twin of the allocate_interviews database function, statement for statement"""
+    capacity = params.get("capacity", 6)
+    per_student = params.get("per_student", 3)
+    default_positions = params.get("default_positions", 2)
+    db = server.db
+    db.execute("CREATE TEMP TABLE interview_slots (company_id PRIMARY KEY, slots INTEGER NOT NULL,"
+               " used INTEGER NOT NULL DEFAULT 0)")
+    try:
+        db.execute('INSERT INTO interview_slots (company_id, slots)'
+                   ' SELECT "CompanyID", SUM("Openings") * ? / ? FROM "Position" WHERE "Openings" IS NOT NULL'
+                   ' GROUP BY "CompanyID"', (capacity, default_positions))
+        db.execute('INSERT OR IGNORE INTO interview_slots (company_id, slots)'
+                   ' SELECT DISTINCT "CompanyID", ? FROM "StudentRank1"', (capacity,))
+        db.execute('DELETE FROM "InterviewAllocated"')
+
+        outcomes = []
+        students = db.execute('SELECT "StudentID" FROM "Student" ORDER BY "QCA" DESC NULLS FIRST, "StudentID"')
+        for (student_id,) in students.fetchall():
+            allocated = []
+            has_preferences = False
+            prefs = db.execute('SELECT "CompanyID" FROM "StudentRank1" WHERE "StudentID" = ?'
+                               ' ORDER BY "Rank", "CompanyID"', (student_id,))
+            for (company_id,) in prefs.fetchall():
+                has_preferences = True
+                taken = db.execute("UPDATE interview_slots SET used = used + 1"
+                                   " WHERE company_id = ? AND used < slots", (company_id,)).rowcount
+                if taken:
+                    db.execute('INSERT INTO "InterviewAllocated" ("StudentID", "CompanyID") VALUES (?, ?)',
+                               (student_id, company_id))
+                    allocated.append(company_id)
+                    if len(allocated) >= per_student:
+                        break
+            outcomes.append({"StudentID": student_id, "CompanyIDs": allocated, "HasPreferences": has_preferences})
+        server.rows_written += sum(len(outcome["CompanyIDs"]) for outcome in outcomes)
+        return outcomes
+    finally:
+        db.execute("DROP TABLE temp.interview_slots")
+
+
+# Database functions of supabase/migrations, as the stand-in's functions argument
+FUNCTIONS = {
+    "apply_final_matches_diff": apply_final_matches_diff,
+    "allocate_interviews": allocate_interviews,
+}
+
+
+def _handler_for(server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            server._request(self)
+
+        do_POST = do_PATCH = do_DELETE = do_GET
+
+        def log_message(self, *args):
+            pass
+    return Handler
+
+
+def _error(code, message):
+    return {"code": code, "message": message, "details": None, "hint": None}
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sql_type(value):
+    if isinstance(value, (bool, int)):
+        return "INTEGER"
+    if isinstance(value, float):
+        return "REAL"
+    return "TEXT"
+
+
+def _to_sql(value):
+    return json.dumps(value) if isinstance(value, (dict, list)) else value
+
+
+def _select_columns(select):
+    columns = []
+    for item in _split_list(select):
+        if item == "*":
+            return "*"
+        # alias:column renames the column in the response
+        alias, _, column = item.rpartition(":")
+        columns.append(f"{_quote(column)} AS {_quote(alias or column)}")
+    return ", ".join(columns) or "*"
+
+
+def _where(params):
+    clauses = []
+    values = []
+    for column, expression in params.items():
+        if column in ("select", "order", "limit", "offset", "columns", "on_conflict"):
+            continue
+        negate = expression.startswith("not.")
+        operator, _, value = expression[4 if negate else 0:].partition(".")
+        if operator in FILTER_OPERATORS:
+            clause = f"{_quote(column)} {FILTER_OPERATORS[operator]} ?"
+            values.append(value)
+        elif operator == "in":
+            items = _split_list(value.strip("()"))
+            clause = f"{_quote(column)} IN ({', '.join('?' for _ in items)})" if items else "0"
+            values.extend(items)
+        elif operator == "is":
+            clause = f"{_quote(column)} IS {dict(null='NULL', true='1', false='0')[value]}"
+        else:
+            raise RequestError(400, "PGRST100", f"Unsupported filter operator: {operator}")
+        clauses.append(f"NOT ({clause})" if negate else clause)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), values
+
+
+def _order_by(order):
+    if not order:
+        return ""
+    terms = []
+    for term in _split_list(order):
+        column, *modifiers = term.split(".")
+        desc = "desc" in modifiers
+        # Postgres puts NULLs last ascending and first descending unless told otherwise
+        nulls_first = "nullsfirst" in modifiers or (desc and "nullslast" not in modifiers)
+        terms.append(f"{_quote(column)} {'DESC' if desc else 'ASC'} NULLS {'FIRST' if nulls_first else 'LAST'}")
+    return " ORDER BY " + ", ".join(terms)
+
+
+def _split_list(text):
+    """Split a PostgREST comma list, honouring double-quoted items"""
+    return [item[1:-1].replace('\\"', '"') if item.startswith('"') else item.strip()
+            for item in re.findall(r'"(?:[^"\\]|\\.)*"|[^,]+', text)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic cohort through a local PostgREST stand-in")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--companies", type=int, default=100)
+    parser.add_argument("--prefs", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay added to every request")
+    parser.add_argument("--max-rows", type=int, default=1000, help="most rows any response may carry")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    args = parser.parse_args()
+
+    from backend.benchmarks.cohort import make_allocation_cohort
+    tables = make_allocation_cohort(args.students, args.companies, args.prefs, seed=args.seed)
+    server = LocalPostgREST(tables, latency=args.latency_ms / 1000, max_rows=args.max_rows, functions=FUNCTIONS,
+                            host=args.host, port=args.port)
+    print(f"Serving {args.students} students at {server.url} (VITE_SUPABASE_URL)")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
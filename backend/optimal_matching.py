@@ -0,0 +1,164 @@
+"""
+Optimal final matching as a capacitated assignment problem.
+
+Each company is expanded into one column per open position and each student is
+a row, giving a dense NumPy cost matrix built from the combined rank scores.
+Pairs that did not interview (or were not ranked by both sides) are forbidden
+with a cost larger than any complete valid assignment, so the solver first
+matches as many students as possible and then minimises the total combined
+score. QCA breaks ties between otherwise equal assignments, as in the greedy
+matcher.
+
+The assignment is solved with scipy.optimize.linear_sum_assignment when scipy
+is installed, and otherwise with the shortest augmenting path algorithm below,
+vectorised over columns.
+"""
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment as _scipy_linear_sum_assignment
+except ImportError:
+    _scipy_linear_sum_assignment = None
+
+
+def linear_sum_assignment(cost):
+    """Minimum-cost assignment of every row of cost to a distinct column
+
+    Returns (rows, cols) index arrays like scipy's function of the same name.
+    The matrix must not have more rows than columns.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    n_rows, n_cols = cost.shape
+    if n_rows > n_cols:
+        raise ValueError("cost matrix must not have more rows than columns")
+    if _scipy_linear_sum_assignment is not None:
+        return _scipy_linear_sum_assignment(cost)
+
+    u = np.zeros(n_rows)
+    v = np.zeros(n_cols)
+    col4row = np.full(n_rows, -1, dtype=np.int64)
+    row4col = np.full(n_cols, -1, dtype=np.int64)
+
+    for cur_row in range(n_rows):
+        shortest = np.full(n_cols, np.inf)
+        path = np.full(n_cols, -1, dtype=np.int64)
+        visited_cols = np.zeros(n_cols, dtype=bool)
+        visited_rows = [cur_row]
+        min_val = 0.0
+        i = cur_row
+        sink = -1
+
+        # Grow a shortest path tree from cur_row until it reaches a free column
+        while sink == -1:
+            reduced = min_val + cost[i] - u[i] - v
+            better = ~visited_cols & (reduced < shortest)
+            path[better] = i
+            shortest[better] = reduced[better]
+
+            candidates = np.where(visited_cols, np.inf, shortest)
+            j = int(np.argmin(candidates))
+            min_val = candidates[j]
+            if not np.isfinite(min_val):
+                raise ValueError("cost matrix is infeasible")
+
+            visited_cols[j] = True
+            if row4col[j] == -1:
+                sink = j
+            else:
+                i = int(row4col[j])
+                visited_rows.append(i)
+
+        # Update the dual variables
+        u[cur_row] += min_val
+        for row in visited_rows[1:]:
+            u[row] += min_val - shortest[col4row[row]]
+        v[visited_cols] -= min_val - shortest[visited_cols]
+
+        # Augment along the path back to cur_row
+        j = sink
+        while True:
+            i = int(path[j])
+            row4col[j] = i
+            col4row[i], j = j, int(col4row[i])
+            if i == cur_row:
+                break
+
+    return np.arange(n_rows), col4row
+
+
+def build_cost_matrix(matches, company_positions):
+    """Build the student x position-slot cost matrix for the scored pairs
+
+    Returns (cost, student_ids, slot_companies, forbidden) where any entry at or
+    above forbidden marks a pair that must not be matched.
+    """
+    student_ids = sorted({m["StudentID"] for m in matches}, key=str)
+    companies = sorted({m["CompanyID"] for m in matches if company_positions.get(m["CompanyID"], 0) > 0}, key=str)
+    student_index = {sid: i for i, sid in enumerate(student_ids)}
+
+    # One column per position, but never more columns than a company has candidates
+    candidates = {}
+    for m in matches:
+        candidates[m["CompanyID"]] = candidates.get(m["CompanyID"], 0) + 1
+    slots_per_company = [min(company_positions[cid], candidates[cid]) for cid in companies]
+    slot_companies = np.repeat(np.arange(len(companies)), slots_per_company)
+    company_index = {cid: i for i, cid in enumerate(companies)}
+
+    rows = np.array([student_index[m["StudentID"]] for m in matches if m["CompanyID"] in company_index], dtype=np.int64)
+    cols = np.array([company_index[m["CompanyID"]] for m in matches if m["CompanyID"] in company_index], dtype=np.int64)
+    scores = np.array([m["CombinedScore"] for m in matches if m["CompanyID"] in company_index], dtype=np.float64)
+    qcas = np.array([m["QCA"] or 0.0 for m in matches if m["CompanyID"] in company_index], dtype=np.float64)
+
+    # QCA only separates assignments whose total combined score is equal
+    n_matched_max = min(len(student_ids), len(slot_companies))
+    qca_weight = 1.0 / ((qcas.max(initial=0.0) + 1.0) * (n_matched_max + 1))
+    pair_cost = scores - qca_weight * qcas
+
+    # Forbidden pairs cost more than any full assignment of valid pairs
+    forbidden = (np.abs(pair_cost).max(initial=0.0) + 1.0) * (n_matched_max + 1)
+    company_cost = np.full((len(student_ids), len(companies)), forbidden)
+    np.minimum.at(company_cost, (rows, cols), pair_cost)
+
+    cost = company_cost[:, slot_companies]
+    return cost, student_ids, [companies[c] for c in slot_companies], forbidden
+
+
+def match_optimal(matches, company_positions):
+    """Match students to companies minimising total combined score
+
+    Takes the same scored pairs and capacities as match_greedy and returns the
+    same (final_matches, company_allocations) shape.
+    """
+    company_allocations = {cid: 0 for cid in company_positions}
+    if not matches:
+        return [], company_allocations
+
+    cost, student_ids, slot_companies, forbidden = build_cost_matrix(matches, company_positions)
+    if not slot_companies:
+        return [], company_allocations
+
+    # The solver assigns every row, so put the smaller side on the rows
+    if cost.shape[0] <= cost.shape[1]:
+        rows, cols = linear_sum_assignment(cost)
+        assigned = zip(rows, cols)
+    else:
+        cols, rows = linear_sum_assignment(cost.T)
+        assigned = zip(rows, cols)
+
+    best_pair = {}
+    for m in matches:
+        key = (m["StudentID"], m["CompanyID"])
+        if key not in best_pair or m["CombinedScore"] < best_pair[key]["CombinedScore"]:
+            best_pair[key] = m
+
+    final_matches = []
+    for row, col in assigned:
+        if cost[row, col] >= forbidden:
+            continue
+        match = best_pair[(student_ids[row], slot_companies[col])]
+        final_matches.append(match)
+        company_allocations[match["CompanyID"]] += 1
+
+    # Report matches best first, in the same order the greedy matcher uses
+    final_matches.sort(key=lambda m: (m["CombinedScore"], -m["QCA"] if m["QCA"] is not None else 0))
+    return final_matches, company_allocations
@@ -0,0 +1,57 @@
+"""
+Paged reads from Supabase tables.
+
+PostgREST caps how many rows a single request returns, so large tables are read
+one page at a time and streamed back row by row. Only the current page is held
+in memory, and a server-side row cap smaller than the page size is detected
+rather than mistaken for the end of the table.
+"""
+
+DEFAULT_PAGE_SIZE = 1000
+
+
+def fetch_pages(build_query, page_size=DEFAULT_PAGE_SIZE):
+    """Yield every row of a query using range (offset) pagination, one page per round trip
+
+    build_query must return a fresh, fully filtered and ordered query builder each
+    time it is called; the page range is applied on top of it. The order must be
+    total (end on a unique column) for pages to be consistent.
+    """
+    if page_size <= 0:
+        raise ValueError("page_size must be positive")
+
+    start = 0
+    while True:
+        result = build_query().range(start, start + page_size - 1).execute()
+        rows = result.data or []
+        if not rows:
+            break
+        yield from rows
+        start += len(rows)
+
+        # A short page is either the end of the table or the server capping rows per
+        # request; ask for the next range to tell, and match any cap from then on
+        if len(rows) < page_size:
+            page_size = len(rows)
+
+
+def fetch_keyset(build_query, key_column, page_size=DEFAULT_PAGE_SIZE):
+    """Yield every row of a query using keyset pagination on a unique key column
+
+    Each page asks for rows with key_column greater than the last one seen, so
+    pages stay consistent while rows are inserted or deleted and deep pages cost
+    no more than the first. Rows come back in key_column order.
+    """
+    if page_size <= 0:
+        raise ValueError("page_size must be positive")
+
+    last_key = None
+    while True:
+        query = build_query()
+        if last_key is not None:
+            query = query.gt(key_column, last_key)
+        rows = query.order(key_column).limit(page_size).execute().data or []
+        if not rows:
+            break
+        yield from rows
+        last_key = rows[-1][key_column]
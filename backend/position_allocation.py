@@ -1,60 +1,44 @@
-import os
-import re
-from dotenv import load_dotenv
-from supabase import create_client
-
-# Load environment variables from .env file
-backend_env = os.path.join(os.path.dirname(__file__), '.env')
-project_env = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env'))
-
-# Try to load from backend directory first, then project root
-if os.path.exists(backend_env):
-    load_dotenv(dotenv_path=backend_env)
-    print(f"Loaded .env from {backend_env}")
-elif os.path.exists(project_env):
-    load_dotenv(dotenv_path=project_env)
-    print(f"Loaded .env from {project_env}")
-else:
-    print("No .env file found")
-
-# Get Supabase credentials from environment variables with VITE_ prefix
-SUPABASE_URL = os.getenv("VITE_SUPABASE_URL")
-SUPABASE_KEY = os.getenv("VITE_SUPABASE_ANON_KEY")
-
-# Remove quotes if present (sometimes .env parsers keep the quotes)
-if SUPABASE_URL and SUPABASE_URL.startswith('"') and SUPABASE_URL.endswith('"'):
-    SUPABASE_URL = SUPABASE_URL[1:-1]
-if SUPABASE_KEY and SUPABASE_KEY.startswith('"') and SUPABASE_KEY.endswith('"'):
-    SUPABASE_KEY = SUPABASE_KEY[1:-1]
-
-# Debug output
-print("SUPABASE_URL:", SUPABASE_URL)
-print("SUPABASE_KEY is set:", bool(SUPABASE_KEY))
-print("SUPABASE_KEY first 10 chars:", SUPABASE_KEY[:10] + "..." if SUPABASE_KEY else "None")
-
-# Initialize Supabase client
+import argparse
+import functools
+import logging
+from collections import Counter
+
+from backend.allocation_core import match_greedy, score_pairs
+from backend.capacities import CapacityCache, positions_for
+from backend.data_sources import SupabaseDataSource
+from backend.entity_cache import company_names, student_names
+from backend.instrumentation import RunReport
+from backend.pagination import DEFAULT_PAGE_SIZE
+from backend.result_views import build_result_views, company_ids_of, save_result_views
+from backend.snapshot import FINAL_MATCH_TABLES, load_snapshot
+from backend.supabase_client import get_client
+
+logger = logging.getLogger(__name__)
+
+# Supabase client override; when left as None the shared client is created on first use
 supabase = None
-if SUPABASE_URL and SUPABASE_KEY:
-    try:
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-        print("Supabase client initialized successfully")
-    except Exception as e:
-        print(f"Error initializing Supabase client: {e}")
-else:
-    print("Supabase client not initialized — URL or key missing")
+
+def get_supabase():
+    """Return the client this module should use, creating the shared one lazily"""
+    return supabase if supabase is not None else get_client()
+
+def iter_interview_pairs(page_size=DEFAULT_PAGE_SIZE):
+    """Stream all student-company pairs that were allocated for interviews"""
+    client = get_supabase()
+    if client is None:
+        return iter(())
+    return SupabaseDataSource(client, page_size=page_size).iter_interview_pairs()
 
 def get_interview_pairs():
     """Get all student-company pairs that were allocated for interviews"""
-    if supabase is None:
-        return []
-    result = supabase.table("InterviewAllocated").select("StudentID", "CompanyID").execute()
-    return result.data
+    return list(iter_interview_pairs())
 
 def get_student_rank(student_id, company_id):
     """Get a student's ranking of a company after interviews"""
-    if supabase is None:
+    client = get_supabase()
+    if client is None:
         return None
-    result = supabase.table("StudentInterviewRank")\
+    result = client.table("StudentInterviewRank")\
         .select("Rank")\
         .eq("StudentID", student_id)\
         .eq("CompanyID", company_id)\
@@ -63,9 +47,10 @@ def get_student_rank(student_id, company_id):
 
 def get_company_rank(company_id, student_id):
     """Get a company's ranking of a student after interviews"""
-    if supabase is None:
+    client = get_supabase()
+    if client is None:
         return None
-    result = supabase.table("CompanyInterviewRank")\
+    result = client.table("CompanyInterviewRank")\
         .select("Rank")\
         .eq("CompanyID", company_id)\
         .eq("StudentID", student_id)\
@@ -74,136 +59,211 @@ def get_company_rank(company_id, student_id):
 
 def get_student_qca(student_id):
     """Get a student's QCA"""
-    if supabase is None:
+    client = get_supabase()
+    if client is None:
         return None
-    result = supabase.table("Student").select("QCA").eq("StudentID", student_id).execute()
+    # Read fresh every time: QCAs can be corrected between runs and nothing invalidates a cache
+    result = client.table("Student").select("QCA").eq("StudentID", student_id).execute()
     return float(result.data[0]["QCA"]) if result.data and result.data[0]["QCA"] else None
 
-def get_company_positions_count(company_id):
-    """Get the number of positions available at a company"""
-    if supabase is None:
-        return 0
-
-    # For now, let's assume each company has 2 positions available
-    # You can modify this to fetch the actual number from a database table if needed
-    return 2
-
-def run_final_match():
-    """Run the final matching algorithm to allocate students to companies"""
-    if supabase is None:
-        print("Supabase client not initialized. Cannot run matching algorithm.")
-        return []
+def load_rank_index(table):
+    """Read a post-interview rank table once, indexed by (StudentID, CompanyID)"""
+    client = get_supabase()
+    if client is None:
+        return {}
+    return SupabaseDataSource(client).load_rank_index(table)
 
-    print("Starting final matching process...")
+def load_student_qcas():
+    """Read every student's QCA once, keyed by StudentID"""
+    client = get_supabase()
+    if client is None:
+        return {}
+    return SupabaseDataSource(client).load_student_qcas()
 
-    # Clear any existing final matches
-    try:
-        supabase.table("FinalMatches").delete().neq("StudentID", 0).execute()
-        print("Cleared existing final matches")
-    except Exception as e:
-        print(f"Error clearing existing matches: {e}")
-
-    # Get all interview pairs
-    interview_pairs = get_interview_pairs()
-    print(f"Found {len(interview_pairs)} interview pairs")
+# Position openings shared by get_company_positions_count calls, reused for a minute
+positions_cache = CapacityCache(ttl=60)
 
-    # Get company position counts (how many students each company can take)
+def get_company_positions_count(company_id):
+    """Get the number of positions available at a company"""
+    client = get_supabase()
+    if client is None:
+        return 0
+    return positions_for(company_id, positions_cache.get(SupabaseDataSource(client)))
+
+def get_matcher(algorithm):
+    """Look up a final matching algorithm by name: greedy, optimal or stable"""
+    if algorithm == "greedy":
+        return match_greedy
+    if algorithm == "optimal":
+        # Imported here so NumPy is only loaded when the optimal matcher is used
+        from backend.optimal_matching import match_optimal
+        return match_optimal
+    if algorithm == "stable":
+        from backend.stable_matching import match_stable
+        return match_stable
+    raise ValueError(f"Unknown matching algorithm: {algorithm}")
+
+def run_matcher(source, positions, algorithm, matcher, report):
+    """Score every interview pair from the rank indexes and run matcher on them"""
+    # Load both rank tables and every QCA once
+    with report.phase("load"):
+        student_ranks = source.load_rank_index("StudentInterviewRank")
+        company_ranks = source.load_rank_index("CompanyInterviewRank")
+        qcas = source.load_student_qcas()
+
+    # Stream the interview pairs, noting each company's position count as it appears
     company_positions = {}
-    for pair in interview_pairs:
-        company_id = pair["CompanyID"]
-        if company_id not in company_positions:
-            company_positions[company_id] = get_company_positions_count(company_id)
-
-    print(f"Companies with positions: {len(company_positions)}")
-
-    matches = []
-
-    # Calculate combined scores for each student-company pair
-    for pair in interview_pairs:
-        student_id = pair["StudentID"]
-        company_id = pair["CompanyID"]
-
-        # Get rankings from both sides
-        s_rank = get_student_rank(student_id, company_id)
-        c_rank = get_company_rank(company_id, student_id)
-
-        # Only consider pairs where both have ranked each other
-        if s_rank is not None and c_rank is not None:
-            combined_score = s_rank + c_rank
-            qca = get_student_qca(student_id)
-
-            matches.append({
-                "StudentID": student_id,
-                "CompanyID": company_id,
-                "CombinedScore": combined_score,
-                "QCA": qca
-            })
-
-    print(f"Calculated scores for {len(matches)} valid pairs")
-
-    # Sort by lowest combined score (best match), then highest QCA
-    matches.sort(key=lambda m: (m["CombinedScore"], -m["QCA"] if m["QCA"] is not None else 0))
+    interviews = Counter()
+    interviewed = {}
+
+    def interview_pairs():
+        for pair in source.iter_interview_pairs():
+            company_id = pair["CompanyID"]
+            interviews[company_id] += 1
+            interviewed[pair["StudentID"]] = None
+            if company_id not in company_positions:
+                company_positions[company_id] = positions_for(company_id, positions)
+            yield pair
+
+    # Calculate combined scores for each student-company pair as it arrives
+    with report.phase("score"):
+        matches = score_pairs(interview_pairs(), student_ranks, company_ranks, qcas)
+    log_scoring(report, sum(interviews.values()), company_positions, len(matches))
+
+    # Deferred acceptance needs each side's own ranks, not just their sum
+    if algorithm == "stable":
+        matcher = functools.partial(matcher, student_ranks=student_ranks, company_ranks=company_ranks)
 
     # Allocate students to companies (allowing multiple students per company)
-    assigned_students = set()
-    company_allocations = {cid: 0 for cid in company_positions}
-    final_matches = []
-
-    for match in matches:
-        sid = match["StudentID"]
-        cid = match["CompanyID"]
-
-        # Only allocate if:
-        # 1. Student hasn't been assigned yet
-        # 2. Company still has positions available
-        if sid not in assigned_students and company_allocations[cid] < company_positions[cid]:
-            # Allocate
-            final_matches.append(match)
-            assigned_students.add(sid)
-            company_allocations[cid] += 1
-
-            # Insert into FinalMatches table
+    with report.phase("match"):
+        final_matches, company_allocations = matcher(matches, company_positions)
+    details = {"interviews": interviews, "interviewed": list(interviewed),
+               "ranks": matched_ranks(final_matches, student_ranks, company_ranks)}
+    return final_matches, company_allocations, company_positions, details
+
+def matched_ranks(final_matches, student_ranks, company_ranks):
+    """{(StudentID, CompanyID): (student rank, company rank)} for the matched pairs only"""
+    pairs = [(m["StudentID"], m["CompanyID"]) for m in final_matches]
+    return {pair: (student_ranks[pair], company_ranks[pair]) for pair in pairs}
+
+def log_scoring(report, pair_count, company_positions, scored_count):
+    logger.info("Found %d interview pairs", pair_count)
+    logger.info("Companies with positions: %d", len(company_positions))
+    logger.info("Calculated scores for %d valid pairs", scored_count)
+    report.count("interview_pairs", pair_count)
+    report.count("scored_pairs", scored_count)
+
+def result_views_for(store, final_matches, company_positions, company_allocations, details):
+    """The dashboard views of a final match, with every name resolved in one bulk lookup per table"""
+    companies = store.load_company_names(company_ids_of(final_matches, company_positions))
+    students = store.load_student_names(list(dict.fromkeys(
+        list(details["interviewed"]) + [m["StudentID"] for m in final_matches])))
+    return build_result_views(final_matches, company_positions, company_allocations, details["interviews"],
+                              details["interviewed"], details["ranks"], companies, students)
+
+def persist_final_match(source, final_matches, views, report=None, store=None):
+    """Write the changed FinalMatches rows, then the dashboard views of the same matches
+
+    An error saving FinalMatches is raised before any view is written, so the
+    dashboards never show outcomes FinalMatches does not hold; an error saving
+    the views is logged. The views go to store, by default source. Returns the
+    number of FinalMatches rows changed.
+    """
+    written = source.save_final_matches([
+        {"StudentID": m["StudentID"], "CompanyID": m["CompanyID"], "CombinedScore": m["CombinedScore"]}
+        for m in final_matches
+    ])
+    try:
+        view_rows = save_result_views(store or source, views)
+    except Exception as e:
+        logger.error("Error saving result views: %s", e)
+    else:
+        if report is not None:
+            report.count("view_rows_written", view_rows)
+    return written
+
+def run_final_match(source=None, capacity_cache=None, algorithm="greedy", max_concurrency=None, report=None):
+    """Run the final matching algorithm to allocate students to companies
+
+    algorithm selects the matcher (see get_matcher). Pass a shared CapacityCache
+    with a ttl to reuse Position openings across runs. With max_concurrency set,
+    every input table is first read concurrently into a snapshot (see snapshot.py).
+    Pass a RunReport (see instrumentation.py) to get phase timings, request counts
+    and optional profiles of the run. The persist phase also writes the dashboard
+    views of the result (see result_views.py).
+    """
+    matcher = get_matcher(algorithm)
+    if source is None:
+        client = get_supabase()
+        if client is None:
+            logger.error("Supabase client not initialized. Cannot run matching algorithm.")
+            return []
+        source = SupabaseDataSource(client)
+    report = report or RunReport("final_match")
+
+    with report.run(source):
+        logger.info("Starting final matching process (%s)...", algorithm)
+        # Views and names come from the real source, not from a snapshot of its inputs
+        store = source
+        with report.phase("load"):
+            if max_concurrency:
+                source = load_snapshot(source, FINAL_MATCH_TABLES, max_concurrency=max_concurrency)
+            positions = (capacity_cache or CapacityCache()).get(source)
+
+        final_matches, company_allocations, company_positions, details = run_matcher(
+            source, positions, algorithm, matcher, report)
+        report.count("matches", len(final_matches))
+
+        with report.phase("persist"):
+            views = result_views_for(store, final_matches, company_positions, company_allocations, details)
+            # Write only the rows of FinalMatches that changed, then the views if that worked
             try:
-                supabase.table("FinalMatches").insert({
-                    "StudentID": sid,
-                    "CompanyID": cid,
-                    "CombinedScore": match["CombinedScore"]
-                }).execute()
-                print(f"Matched Student {sid} with Company {cid} (Score: {match['CombinedScore']}) - Position {company_allocations[cid]}/{company_positions[cid]}")
+                persist_final_match(source, final_matches, views, report, store=store)
             except Exception as e:
-                print(f"Error inserting match: {e}")
-
-    print(f"Final allocation: {len(final_matches)} students matched with companies")
-
-    # Print allocation stats
-    print("\nCompany allocation stats:")
-    for cid, allocated in company_allocations.items():
-        if allocated > 0:
-            company_result = supabase.table("Company").select("CompanyName").eq("CompanyID", cid).execute()
-            company_name = company_result.data[0]['CompanyName'] if company_result.data else f"Company {cid}"
-            print(f"{company_name}: {allocated}/{company_positions[cid]} positions filled")
-
+                logger.error("Error saving final matches, result views left as they were: %s", e)
+        if logger.isEnabledFor(logging.DEBUG):
+            for match in final_matches:
+                logger.debug("Matched Student %s with Company %s (Score: %s)",
+                             match["StudentID"], match["CompanyID"], match["CombinedScore"])
+        logger.info("Final allocation: %d students matched with companies", len(final_matches))
+
+        with report.phase("report"):
+            logger.info("Company allocation stats:")
+            for row in views["CompanyFillStats"]:
+                if row["Filled"] > 0:
+                    logger.info("%s: %d/%d positions filled", row["CompanyName"], row["Filled"], row["Positions"])
+
+    logger.info(report.summary())
     return final_matches
 
-if __name__ == "__main__":
-    if supabase:
-        final = run_final_match()
-        print("\nFinal Matching Results:")
-        print(f"Total matches: {len(final)}")
-
-        # Get student names for better output
-        for match in final:
-            student_id = match['StudentID']
-            company_id = match['CompanyID']
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the final match from Supabase")
+    parser.add_argument("--algorithm", default="greedy", help="greedy, optimal or stable")
+    parser.add_argument("--report", help="write a JSON run report to this file")
+    parser.add_argument("--profile", action="store_true", help="include a cProfile summary in the report")
+    parser.add_argument("--trace-memory", action="store_true", help="include tracemalloc peaks in the report")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every match")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(message)s")
+
+    client = get_supabase()
+    if client is None:
+        logger.error("Cannot run final match: Supabase client not initialized")
+        return 1
+    report = RunReport("final_match", profile=args.profile, trace_memory=args.trace_memory)
+    final = run_final_match(algorithm=args.algorithm, report=report)
+    if args.report:
+        report.write(args.report)
+
+    print("\nFinal Matching Results:")
+    print(f"Total matches: {len(final)}")
+
+    # Resolve every student and company name with one bulk fetch each
+    names = student_names(client, [match["StudentID"] for match in final])
+    companies = company_names(client, [match["CompanyID"] for match in final])
+    for match in final:
+        print(f"{names[match['StudentID']]} matched with {companies[match['CompanyID']]} (Score: {match['CombinedScore']})")
+    return 0
 
-            # Get student name
-            student_result = supabase.table("User").select("FirstName", "Surname").eq("ID", student_id).execute()
-            student_name = f"{student_result.data[0]['FirstName']} {student_result.data[0]['Surname']}" if student_result.data else f"Student {student_id}"
-
-            # Get company name
-            company_result = supabase.table("Company").select("CompanyName").eq("CompanyID", company_id).execute()
-            company_name = company_result.data[0]['CompanyName'] if company_result.data else f"Company {company_id}"
-
-            print(f"{student_name} matched with {company_name} (Score: {match['CombinedScore']})")
-    else:
-        print("Cannot run final match: Supabase client not initialized")
\ No newline at end of file
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,101 @@
+"""
+Precomputed views of the final match, written by run_final_match.
+
+The dashboards show the final match per company, per student and as how well
+both sides' preferences were met. Instead of every page joining FinalMatches
+with Company, User and the rank tables again, the persist phase writes three
+small denormalised tables (created in supabase/migrations):
+
+    CompanyFillStats  one row per interviewing company: name, positions, interviewees, filled, fill rate
+    StudentOutcome    one row per interviewed student: name, matched company and its name, score, both ranks
+    RankHistogram     matches by the rank each side gave the other, one row per (Side, Rank)
+
+A dashboard reads any of them with one query on its key: the student dashboard
+its own StudentOutcome row, and the partner dashboard the rows of the students
+matched with the company. Nothing reads CompanyFillStats or RankHistogram yet,
+and the interviewees page shows the interview stage, which no view covers.
+
+Names are resolved with one bulk lookup per table (see entity_cache.py), and
+each view is written as a diff on its key, like FinalMatches, so readers never
+see it empty. Only signed-in users may read the views, and a StudentOutcome row
+only its student and their matched company; writing them needs the service role
+key (see supabase_client.get_credentials), and a run without it logs the failure.
+"""
+from collections import Counter
+
+from backend.bulk_writes import diff_rows
+
+# Columns and key of every view, in the order they are written
+VIEW_COLUMNS = {
+    "CompanyFillStats": ["CompanyID", "CompanyName", "Positions", "Interviewees", "Filled", "FillRate"],
+    "StudentOutcome": ["StudentID", "StudentName", "CompanyID", "CompanyName", "CombinedScore",
+                       "StudentRank", "CompanyRank"],
+    "RankHistogram": ["Side", "Rank", "Matches"],
+}
+VIEW_KEYS = {
+    "CompanyFillStats": ["CompanyID"],
+    "StudentOutcome": ["StudentID"],
+    "RankHistogram": ["Side", "Rank"],
+}
+
+
+def build_result_views(final_matches, company_positions, company_allocations, interviews, interviewed, ranks,
+                       company_names, student_names):
+    """The rows of every view, as {table: rows}
+
+    interviews counts interview pairs per CompanyID, interviewed lists every
+    interviewed StudentID and ranks maps each matched (StudentID, CompanyID) to
+    (student's rank, company's rank). Names map IDs to display names.
+    """
+    companies = []
+    for company_id, positions in company_positions.items():
+        filled = company_allocations.get(company_id, 0)
+        companies.append({
+            "CompanyID": company_id,
+            "CompanyName": company_names[company_id],
+            "Positions": positions,
+            "Interviewees": interviews.get(company_id, 0),
+            "Filled": filled,
+            "FillRate": round(filled / positions, 4) if positions else None,
+        })
+
+    matched = {m["StudentID"]: m for m in final_matches}
+    students = []
+    for student_id in dict.fromkeys(list(interviewed) + list(matched)):
+        match = matched.get(student_id)
+        company_id = match["CompanyID"] if match else None
+        student_rank, company_rank = ranks.get((student_id, company_id), (None, None))
+        students.append({
+            "StudentID": student_id,
+            "StudentName": student_names[student_id],
+            "CompanyID": company_id,
+            "CompanyName": company_names[company_id] if match else None,
+            "CombinedScore": match["CombinedScore"] if match else None,
+            "StudentRank": student_rank,
+            "CompanyRank": company_rank,
+        })
+
+    histogram = []
+    for side, position in (("student", 0), ("company", 1)):
+        counts = Counter(pair_ranks[position] for pair_ranks in ranks.values())
+        histogram.extend({"Side": side, "Rank": rank, "Matches": n} for rank, n in sorted(counts.items()))
+
+    return {"CompanyFillStats": companies, "StudentOutcome": students, "RankHistogram": histogram}
+
+
+def company_ids_of(final_matches, company_positions):
+    """Every CompanyID a view names"""
+    return list(dict.fromkeys(list(company_positions) + [m["CompanyID"] for m in final_matches]))
+
+
+def save_result_views(source, views):
+    """Write each view as the difference from what is stored; returns the rows written"""
+    written = 0
+    for table, rows in views.items():
+        key = VIEW_KEYS[table]
+        current = list(source.read_rows(table, VIEW_COLUMNS[table], [(column, False) for column in key]))
+        inserts, deleted = diff_rows(current, rows, key)
+        if inserts or deleted:
+            source.update_rows(table, inserts, deleted, key)
+        written += len(inserts) + len(deleted)
+    return written
@@ -0,0 +1,152 @@
+"""
+What-if scenarios: run both allocation stages under different capacities and
+policies and compare the outcomes side by side.
+
+A scenario is a dict naming what to change from the defaults:
+
+    {"name": "8 slots, stable",
+     "interview_capacity": 8,          # slots of a company with default positions
+     "interviews_per_student": 3,
+     "positions": {12: 4},             # CompanyID -> positions, overriding Openings
+     "allocator": "loop",              # see interview_allocation.get_allocator
+     "tie_break_seed": 7,              # see allocation_core.order_students
+     "algorithm": "stable"}            # see position_allocation.get_matcher
+
+The inputs are read from the database once and written to a snapshot bundle
+(see snapshot_bundle.py), so the workers load them from local files rather
+than each querying Supabase. Every worker still turns the columns it reads
+into its own Python rows, so memory grows with the number of workers. Each
+scenario runs the real allocate_interviews and run_final_match on its own
+in-memory view, so nothing is written back to the bundle or the database.
+
+    python -m backend.scenarios <bundle directory> <scenarios.json>
+"""
+import json
+import os
+import sys
+import tempfile
+
+from backend.allocation_core import INTERVIEW_CAPACITY, INTERVIEWS_PER_STUDENT
+from backend.capacities import positions_for
+from backend.data_sources import InMemoryDataSource
+from backend.interview_allocation import allocate_interviews
+from backend.position_allocation import run_final_match
+from backend.sharded_allocation import process_pool
+from backend.snapshot import SNAPSHOT_TABLES
+from backend.snapshot_bundle import BundleDataSource, export_snapshot
+
+# Columns of the comparison table, in display order
+COMPARISON_COLUMNS = [
+    "scenario", "students", "interviewed", "interviews", "positions", "matched",
+    "unmatched", "fill_rate", "first_choice_rate", "mean_student_rank", "mean_company_rank",
+]
+
+
+class ScenarioDataSource(BundleDataSource):
+    """A bundle with some companies' positions overridden, keeping every write in memory"""
+
+    def __init__(self, path, positions=None):
+        super().__init__(path)
+        self.positions = positions or {}
+
+    def read_rows(self, table, columns, order):
+        if table == "Position" and self.positions and table not in self.tables:
+            rows = list(super().read_rows(table, ["CompanyID", "Openings"], []))
+            self.tables[table] = [row for row in rows if row["CompanyID"] not in self.positions] + [
+                {"CompanyID": company_id, "Openings": count} for company_id, count in self.positions.items()
+            ]
+        return super().read_rows(table, columns, order)
+
+    def replace_rows(self, table, rows):
+        return InMemoryDataSource.replace_rows(self, table, rows)
+
+
+def run_scenario(path, scenario):
+    """Run both stages for one scenario on the bundle at path and return its comparison row"""
+    source = ScenarioDataSource(path, _int_keys(scenario.get("positions")))
+
+    interviews = allocate_interviews(
+        source=source,
+        allocator=scenario.get("allocator", "loop"),
+        capacity=scenario.get("interview_capacity", INTERVIEW_CAPACITY),
+        per_student=scenario.get("interviews_per_student", INTERVIEWS_PER_STUDENT),
+        tie_break_seed=scenario.get("tie_break_seed"),
+    )
+    final_matches = run_final_match(source=source, algorithm=scenario.get("algorithm", "greedy"))
+
+    return summarise(scenario.get("name", "scenario"), source, interviews, final_matches)
+
+
+def summarise(name, source, interviews, final_matches):
+    """Fill rate, unmatched students and rank satisfaction for one scenario's results"""
+    students = source.load_student_qcas()
+    positions = source.load_company_positions()
+    interviewing = {company_id for companies in interviews.values() for company_id in companies}
+    offered = sum(positions_for(company_id, positions) for company_id in interviewing)
+
+    student_ranks = source.load_rank_index("StudentInterviewRank")
+    company_ranks = source.load_rank_index("CompanyInterviewRank")
+    pairs = [(m["StudentID"], m["CompanyID"]) for m in final_matches]
+    matched = len(pairs)
+
+    def mean(values):
+        return round(sum(values) / len(values), 3) if values else None
+
+    return {
+        "scenario": name,
+        "students": len(students),
+        "interviewed": sum(1 for companies in interviews.values() if companies),
+        "interviews": sum(len(companies) for companies in interviews.values()),
+        "positions": offered,
+        "matched": matched,
+        "unmatched": len(students) - matched,
+        "fill_rate": round(matched / offered, 3) if offered else None,
+        "first_choice_rate": round(sum(1 for pair in pairs if student_ranks[pair] == 1) / matched, 3) if matched else None,
+        "mean_student_rank": mean([student_ranks[pair] for pair in pairs]),
+        "mean_company_rank": mean([company_ranks[pair] for pair in pairs]),
+    }
+
+
+def run_scenarios(scenarios, source=None, bundle_path=None, max_workers=None):
+    """Run every scenario in parallel and return their comparison rows, in order
+
+    Inputs come from bundle_path if given, otherwise they are read once from
+    source into a temporary bundle. max_workers=1 runs in this process.
+    """
+    if bundle_path is not None:
+        return _run_all(bundle_path, scenarios, max_workers)
+    if source is None:
+        raise ValueError("run_scenarios needs a source or a bundle_path")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "inputs")
+        export_snapshot(source, path, tables=[t for t in SNAPSHOT_TABLES if t != "FinalMatches"])
+        return _run_all(path, scenarios, max_workers)
+
+
+def _run_all(path, scenarios, max_workers):
+    if max_workers == 1:
+        return [run_scenario(path, scenario) for scenario in scenarios]
+    # What-if jobs run on the allocation service's threads (see process_pool)
+    with process_pool(max_workers) as pool:
+        return list(pool.map(run_scenario, [path] * len(scenarios), scenarios))
+
+
+def _int_keys(positions):
+    # JSON scenario files can only have string keys
+    return {int(k) if isinstance(k, str) and k.isdigit() else k: v for k, v in (positions or {}).items()}
+
+
+def format_comparison(rows):
+    """Render comparison rows as a fixed-width text table"""
+    cells = [COMPARISON_COLUMNS] + [["-" if row[c] is None else str(row[c]) for c in COMPARISON_COLUMNS] for row in rows]
+    widths = [max(len(line[i]) for line in cells) for i in range(len(COMPARISON_COLUMNS))]
+    return "\n".join("  ".join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip() for line in cells)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m backend.scenarios <bundle directory> <scenarios.json>")
+        sys.exit(1)
+    with open(sys.argv[2]) as f:
+        scenarios = json.load(f)
+    print(format_comparison(run_scenarios(scenarios, bundle_path=sys.argv[1])))
@@ -0,0 +1,126 @@
+"""
+Interview allocation split into independent shards run in parallel processes.
+
+A student only ever takes slots at companies they ranked, so two students can
+only affect each other if their preferences are linked through companies:
+student A ranks company X, which student B also ranks, and so on. The connected
+components of the StudentRank1 graph (students and companies, joined by each
+preference) are therefore independent allocation problems. Each component is
+allocated on its own, with its students in the same relative order as the whole
+cohort, and the results are merged back in that order, so the allocation is
+identical to allocation_core.allocate_interview_slots over everyone.
+
+Cohorts of several universities, or of departments whose students rank
+disjoint sets of companies, fall apart into large components that run on
+separate cores. A cohort that is one big component runs as a single shard.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from backend.allocation_core import INTERVIEW_CAPACITY, INTERVIEWS_PER_STUDENT, allocate_interview_slots
+
+
+def process_pool(max_workers):
+    """A process pool that is safe to start from any thread
+
+    Its workers are spawned rather than forked: the allocation service runs jobs
+    on its threads, and a forked child can inherit locks another thread was holding.
+    """
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def preference_components(rankings):
+    """Group students by the connected component of the preference graph they are in
+
+    Returns a list of components, each a list of StudentIDs, in the order their
+    first student appears in rankings. Students without preferences are left out.
+    """
+    # Union-find over companies: every company a student ranks joins one set
+    parent = {}
+
+    def find(company_id):
+        root = company_id
+        while parent[root] != root:
+            root = parent[root]
+        while parent[company_id] != root:
+            parent[company_id], company_id = root, parent[company_id]
+        return root
+
+    for prefs in rankings.values():
+        first = None
+        for pref in prefs:
+            company_id = pref["CompanyID"]
+            if company_id not in parent:
+                parent[company_id] = company_id
+            root = find(company_id)
+            if first is None:
+                first = root
+            elif root != first:
+                parent[root] = first
+
+    components = {}
+    for student_id, prefs in rankings.items():
+        if prefs:
+            components.setdefault(find(prefs[0]["CompanyID"]), []).append(student_id)
+    return list(components.values())
+
+
+def plan_shards(rankings, n_shards):
+    """Spread the components over at most n_shards sets of StudentIDs of similar total size
+
+    Size is counted in preferences, the work each student brings. The biggest
+    components are placed first, each on the shard with the least work so far.
+    """
+    components = sorted(preference_components(rankings),
+                        key=lambda students: -sum(len(rankings[s]) for s in students))
+    shards = [[0, set()] for _ in range(max(1, min(n_shards, len(components))))]
+    for students in components:
+        lightest = min(shards, key=lambda shard: shard[0])
+        lightest[0] += sum(len(rankings[s]) for s in students)
+        lightest[1].update(students)
+    return [students for _, students in shards if students]
+
+
+def _allocate_shard(students, rankings, capacity, per_student, capacities):
+    return allocate_interview_slots(students, rankings, capacity=capacity, per_student=per_student,
+                                    capacities=capacities)
+
+
+def allocate_interview_slots_sharded(students, rankings, capacity=INTERVIEW_CAPACITY,
+                                     per_student=INTERVIEWS_PER_STUDENT, capacities=None, max_workers=None):
+    """allocate_interview_slots run as independent shards, in parallel processes
+
+    Takes and returns the same as allocate_interview_slots, with the same result.
+    max_workers caps the processes (and shards), by default one per CPU;
+    max_workers=1 runs a single sequential allocation in this process.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1:
+        # One shard would be the whole cohort, so skip finding the components
+        return allocate_interview_slots(students, rankings, capacity=capacity, per_student=per_student,
+                                        capacities=capacities)
+
+    students = list(students)
+    capacities = capacities or {}
+    shards = plan_shards(rankings, max_workers)
+
+    # Each shard gets its students in cohort order, and only the rankings and capacities it needs
+    jobs = []
+    for shard in shards:
+        shard_rankings = {sid: rankings[sid] for sid in shard}
+        companies = {pref["CompanyID"] for prefs in shard_rankings.values() for pref in prefs}
+        jobs.append(([s for s in students if s["StudentID"] in shard], shard_rankings, capacity, per_student,
+                     {cid: n for cid, n in capacities.items() if cid in companies}))
+
+    if len(jobs) <= 1:
+        results = [_allocate_shard(*job) for job in jobs]
+    else:
+        with process_pool(min(max_workers, len(jobs))) as pool:
+            results = list(pool.map(_allocate_shard, *zip(*jobs)))
+
+    allocated = {}
+    for result in results:
+        allocated.update(result)
+    # Back in cohort order; students without preferences get nothing, as in a single run
+    return {student["StudentID"]: allocated.get(student["StudentID"], []) for student in students}
@@ -0,0 +1,79 @@
+"""
+Concurrent loading of every table an allocation run reads into one snapshot.
+
+The tables a run reads are independent of each other, so instead of reading
+them one after another they are fetched side by side on a bounded thread pool.
+At most max_concurrency reads are in flight at once and further tables wait
+for a free worker, so a large run never floods the database with requests.
+Loading then takes about as long as the slowest table rather than the sum of
+all of them.
+
+The allocation engines run on the assembled snapshot exactly as they would on
+the live source; writes pass straight through to the source it was loaded from.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.data_sources import InMemoryDataSource, merge_rows
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+# Columns and a total order for every table a run may read
+SNAPSHOT_TABLES = {
+    "Student": (["StudentID", "QCA"], [("StudentID", False)]),
+    "StudentRank1": (["StudentID", "CompanyID", "Rank"], [("StudentID", False), ("Rank", False), ("CompanyID", False)]),
+    "Position": (["CompanyID", "Openings"], [("CompanyID", False)]),
+    "Company": (["CompanyID", "CompanyName"], [("CompanyID", False)]),
+    "InterviewAllocated": (["StudentID", "CompanyID"], [("StudentID", False), ("CompanyID", False)]),
+    "StudentInterviewRank": (["StudentID", "CompanyID", "Rank"], [("StudentID", False), ("CompanyID", False)]),
+    "CompanyInterviewRank": (["StudentID", "CompanyID", "Rank"], [("StudentID", False), ("CompanyID", False)]),
+    "FinalMatches": (["StudentID", "CompanyID", "CombinedScore"], [("StudentID", False), ("CompanyID", False)]),
+}
+
+# The tables each allocation stage reads
+INTERVIEW_TABLES = ("StudentRank1", "Student", "Position")
+FINAL_MATCH_TABLES = ("StudentInterviewRank", "CompanyInterviewRank", "Student", "Position",
+                      "InterviewAllocated", "Company")
+
+
+class SnapshotDataSource(InMemoryDataSource):
+    """Tables read from source up front; saves are written through to source as well"""
+
+    def __init__(self, tables, source):
+        super().__init__()
+        # Rows were just read and are owned by the snapshot, so skip the defensive copy
+        self.tables = tables
+        self.source = source
+
+    def replace_rows(self, table, rows):
+        written = self.source.replace_rows(table, rows)
+        super().replace_rows(table, rows)
+        return written
+
+    def save_final_matches(self, rows):
+        # The source diffs against its own stored matches, which the snapshot may not hold
+        written = self.source.save_final_matches(rows)
+        self.tables["FinalMatches"] = [dict(row) for row in rows]
+        return written
+
+    def update_rows(self, table, inserts, deleted, key_columns):
+        written = self.source.update_rows(table, inserts, deleted, key_columns)
+        self.tables[table] = merge_rows(self.tables.get(table, []), inserts, deleted, key_columns)
+        return written
+
+
+def load_snapshot(source, tables=SNAPSHOT_TABLES, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+    """Read tables from source concurrently, at most max_concurrency at a time
+
+    source is any TableDataSource. Returns a SnapshotDataSource holding every
+    table; if any read fails the error is raised once the other reads finish.
+    """
+    if max_concurrency <= 0:
+        raise ValueError("max_concurrency must be positive")
+
+    def read_table(table):
+        columns, order = SNAPSHOT_TABLES[table]
+        return list(source.read_rows(table, columns, order))
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        futures = {table: pool.submit(read_table, table) for table in tables}
+    return SnapshotDataSource({table: future.result() for table, future in futures.items()}, source)
@@ -0,0 +1,189 @@
+"""
+Offline snapshots of allocation inputs and results as memory-mappable NumPy bundles.
+
+A bundle is a directory holding one .npy file per table column plus a
+manifest.json describing every table:
+
+    manifest.json
+    Student.StudentID.npy
+    Student.QCA.npy
+    Student.QCA.null.npy     - only for columns containing NULLs
+    ...
+
+Numbers are stored as int64/float64, strings as fixed-width unicode and
+booleans as bool, so every column can be memory-mapped instead of parsed.
+Columns holding NULLs get a boolean mask next to them. Reading a bundle only
+touches the tables a run actually asks for, but each table read is converted
+into Python row dicts held by the reading process.
+
+BundleDataSource runs both allocation stages from a bundle with no database,
+and saves their results back into it:
+
+    python -m backend.snapshot_bundle export <directory>   # from Supabase
+    python -m backend.snapshot_bundle run <directory>      # both stages, offline
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+from backend.data_sources import InMemoryDataSource
+from backend.snapshot import DEFAULT_MAX_CONCURRENCY, SNAPSHOT_TABLES, load_snapshot
+
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+
+
+def _column_kind(values):
+    """The storage kind for a column's non-NULL values: int, float, str or bool"""
+    types = {type(value) for value in values if value is not None}
+    if not types:
+        return "float"
+    if types == {bool}:
+        return "bool"
+    if types == {int}:
+        return "int"
+    if types <= {int, float}:
+        return "float"
+    if types == {str}:
+        return "str"
+    raise ValueError(f"Cannot store a column mixing {sorted(t.__name__ for t in types)}")
+
+
+_FILL = {"int": 0, "float": 0.0, "str": "", "bool": False}
+_DTYPES = {"int": np.int64, "float": np.float64, "str": np.str_, "bool": np.bool_}
+
+
+def _column_path(path, table, column, suffix=""):
+    return os.path.join(path, f"{table}.{column}{suffix}.npy")
+
+
+def _save_array(file_path, array):
+    # Write beside the target and swap it in, so readers never see half a file
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, file_path)
+
+
+def write_table(path, table, rows, columns=None):
+    """Write one table's columns into the bundle at path and return its manifest entry"""
+    if columns is None:
+        columns = list(dict.fromkeys(column for row in rows for column in row))
+    entry = {"rows": len(rows), "columns": {}}
+    for column in columns:
+        values = [row.get(column) for row in rows]
+        kind = _column_kind(values)
+        nulls = np.fromiter((value is None for value in values), dtype=bool, count=len(values))
+        fill = _FILL[kind]
+        data = np.array([fill if value is None else value for value in values], dtype=_DTYPES[kind])
+        _save_array(_column_path(path, table, column), data)
+        if nulls.any():
+            _save_array(_column_path(path, table, column, ".null"), nulls)
+        entry["columns"][column] = {"kind": kind, "nullable": bool(nulls.any())}
+    return entry
+
+
+def write_manifest(path, tables):
+    manifest_path = os.path.join(path, MANIFEST)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"format": FORMAT_VERSION, "tables": tables}, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format: {manifest.get('format')}")
+    return manifest["tables"]
+
+
+def save_bundle(path, tables):
+    """Write {table: rows} as a bundle at path, replacing any tables already in it"""
+    os.makedirs(path, exist_ok=True)
+    manifest = read_manifest(path) if os.path.exists(os.path.join(path, MANIFEST)) else {}
+    for table, rows in tables.items():
+        columns = SNAPSHOT_TABLES[table][0] if table in SNAPSHOT_TABLES else None
+        manifest[table] = write_table(path, table, rows, columns)
+    write_manifest(path, manifest)
+
+
+def export_snapshot(source, path, tables=SNAPSHOT_TABLES, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+    """Read tables from source concurrently and save them as a bundle at path"""
+    snapshot = load_snapshot(source, tables, max_concurrency=max_concurrency)
+    save_bundle(path, snapshot.tables)
+    return snapshot
+
+
+def read_column(path, table, column, entry):
+    """A column as a list of Python values, with None where the column is NULL
+
+    The file is mapped only while it is copied into the list, so the list is this
+    process's own copy of the column.
+    """
+    values = np.load(_column_path(path, table, column), mmap_mode="r").tolist()
+    if entry["nullable"]:
+        nulls = np.load(_column_path(path, table, column, ".null"), mmap_mode="r")
+        for i in np.flatnonzero(nulls).tolist():
+            values[i] = None
+    return values
+
+
+def read_table(path, table, entry):
+    """A table's rows from the bundle at path"""
+    columns = list(entry["columns"])
+    data = [read_column(path, table, column, entry["columns"][column]) for column in columns]
+    if not columns:
+        return [{} for _ in range(entry["rows"])]
+    return [dict(zip(columns, values)) for values in zip(*data)]
+
+
+class BundleDataSource(InMemoryDataSource):
+    """Reads tables from a bundle directory on first use and saves results back into it"""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.manifest = read_manifest(path)
+
+    def read_rows(self, table, columns, order):
+        # Each table is mapped in the first time a run reads it
+        if table not in self.tables and table in self.manifest:
+            self.tables[table] = read_table(self.path, table, self.manifest[table])
+        return super().read_rows(table, columns, order)
+
+    def replace_rows(self, table, rows):
+        written = super().replace_rows(table, rows)
+        save_bundle(self.path, {table: self.tables[table]})
+        self.manifest = read_manifest(self.path)
+        return written
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] not in ("export", "run"):
+        print("Usage: python -m backend.snapshot_bundle export|run <directory>")
+        sys.exit(1)
+    command, path = sys.argv[1:]
+
+    if command == "export":
+        from backend.data_sources import SupabaseDataSource
+        from backend.supabase_client import get_client
+
+        client = get_client()
+        if client is None:
+            print("Cannot export snapshot: Supabase client not initialized")
+            sys.exit(1)
+        snapshot = export_snapshot(SupabaseDataSource(client), path)
+        for name, rows in snapshot.tables.items():
+            print(f"{name}: {len(rows)} rows")
+    else:
+        from backend.interview_allocation import allocate_interviews
+        from backend.position_allocation import run_final_match
+
+        source = BundleDataSource(path)
+        allocate_interviews(source=source)
+        final = run_final_match(source=source)
+        print(f"Total matches: {len(final)}")
@@ -0,0 +1,91 @@
+"""
+Stable final matching by student-proposing deferred acceptance (Gale-Shapley).
+
+Students propose to the companies they interviewed with in their own
+post-interview rank order. Each company holds on to its best proposals up to
+its number of positions, judged by its own post-interview rank with the higher
+QCA winning ties, exactly as the greedy sort key orders them. The result is
+stable: no student and company would both rather be matched to each other.
+
+Preferences are stored as flat arrays indexed by dense student numbers (a CSR
+layout), so the proposal loop does O(total preferences) work plus a heap
+operation per accepted proposal.
+"""
+import heapq
+
+
+def match_stable(matches, company_positions, student_ranks, company_ranks):
+    """Deferred acceptance over the scored pairs, within company capacities
+
+    matches and company_positions are the same inputs match_greedy takes, and
+    student_ranks / company_ranks are the {(StudentID, CompanyID): Rank} indexes
+    the pairs were scored from. Returns (final_matches, company_allocations).
+    """
+    # Keep one pair per (student, company), in the order they were scored
+    pairs = {}
+    for m in matches:
+        pairs.setdefault((m["StudentID"], m["CompanyID"]), m)
+
+    student_ids = []
+    student_index = {}
+    for sid, _ in pairs:
+        if sid not in student_index:
+            student_index[sid] = len(student_ids)
+            student_ids.append(sid)
+
+    company_ids = list(company_positions)
+    company_index = {cid: i for i, cid in enumerate(company_ids)}
+    capacity = [company_positions[cid] for cid in company_ids]
+
+    # Each student's proposals in their rank order, flattened into one array
+    proposals = [[] for _ in student_ids]
+    for (sid, cid), m in pairs.items():
+        if cid in company_index:
+            proposals[student_index[sid]].append((student_ranks[(sid, cid)], company_index[cid], m))
+    pref_start = [0]
+    pref_company = []
+    pref_key = []
+    pref_match = []
+    for s, props in enumerate(proposals):
+        props.sort(key=lambda p: (p[0], p[1]))
+        for _, c, m in props:
+            # The company's view of this student as a min-heap entry on the worst held proposal:
+            # a worse company rank, then a lower QCA, then a later student sits on top
+            qca = m["QCA"] if m["QCA"] is not None else 0
+            pref_company.append(c)
+            pref_key.append((-company_ranks[(m["StudentID"], company_ids[c])], qca, -s))
+            pref_match.append(m)
+        pref_start.append(len(pref_company))
+
+    next_pref = pref_start[:-1]
+    held = [[] for _ in company_ids]
+    free = list(range(len(student_ids) - 1, -1, -1))
+
+    while free:
+        s = free.pop()
+        position = next_pref[s]
+        if position == pref_start[s + 1]:
+            continue  # Rejected everywhere, stays unmatched
+        next_pref[s] = position + 1
+
+        c = pref_company[position]
+        entry = (pref_key[position], position, s)
+        if len(held[c]) < capacity[c]:
+            heapq.heappush(held[c], entry)
+        elif held[c] and entry[0] > held[c][0][0]:
+            # Better than the worst proposal the company holds, which is released
+            _, _, released = heapq.heapreplace(held[c], entry)
+            free.append(released)
+        else:
+            free.append(s)
+
+    final_matches = []
+    company_allocations = {cid: 0 for cid in company_ids}
+    for c, entries in enumerate(held):
+        for _, position, _ in entries:
+            final_matches.append(pref_match[position])
+        company_allocations[company_ids[c]] = len(entries)
+
+    # Report matches best first, in the same order the greedy matcher uses
+    final_matches.sort(key=lambda m: (m["CombinedScore"], -m["QCA"] if m["QCA"] is not None else 0))
+    return final_matches, company_allocations
@@ -0,0 +1,71 @@
+"""
+Shared, lazily created Supabase client.
+
+Nothing happens at import time: the .env file is read and the client created
+the first time get_client() is called, and the same client is returned to every
+caller after that.
+"""
+import functools
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+BACKEND_ENV = os.path.join(os.path.dirname(__file__), '.env')
+PROJECT_ENV = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+
+def load_env():
+    """Load environment variables from the backend .env file, falling back to the project root"""
+    from dotenv import load_dotenv
+
+    if os.path.exists(BACKEND_ENV):
+        load_dotenv(dotenv_path=BACKEND_ENV)
+        return BACKEND_ENV
+    if os.path.exists(PROJECT_ENV):
+        load_dotenv(dotenv_path=PROJECT_ENV)
+        return PROJECT_ENV
+    return None
+
+
+def _strip_quotes(value):
+    # Remove quotes if present (sometimes .env parsers keep the quotes)
+    if value and value.startswith('"') and value.endswith('"'):
+        return value[1:-1]
+    return value
+
+
+def get_credentials():
+    """Return (url, key) from the VITE_ prefixed variables the frontend also uses
+
+    SUPABASE_SERVICE_ROLE_KEY, when set, is used instead of the anon key. It has
+    no VITE_ prefix so it never reaches the frontend bundle, and only it can
+    write the dashboard views (see supabase/migrations).
+    """
+    load_env()
+    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("VITE_SUPABASE_ANON_KEY")
+    return _strip_quotes(os.getenv("VITE_SUPABASE_URL")), _strip_quotes(key)
+
+
+@functools.lru_cache(maxsize=None)
+def get_client():
+    """Create the Supabase client on first use and cache it; None if it cannot be created"""
+    url, key = get_credentials()
+    if not (url and key):
+        logger.error("Supabase client not initialized — URL or key missing")
+        return None
+
+    from supabase import create_client
+
+    try:
+        client = create_client(url, key)
+    except Exception as e:
+        logger.error("Error initializing Supabase client: %s", e)
+        return None
+    logger.info("Supabase client initialized successfully")
+    return client
+
+
+def reset_client():
+    """Forget the cached client so the next get_client() call builds a new one"""
+    get_client.cache_clear()
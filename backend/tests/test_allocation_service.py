@@ -0,0 +1,175 @@
+'''
+Backend Unit Test
+Test the allocation service: jobs run on the worker pool one per cohort at a
+time, stream their phases, keep reference data warm, and work over HTTP
+'''
+# Python's built in unit testing
+import json
+import threading
+import unittest
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from backend.allocation_service import AllocationService
+from backend.benchmarks.cohort import make_allocation_cohort, make_match_cohort, make_multi_university_cohort
+from backend.fake_supabase import FakeSupabase, apply_final_matches_diff
+
+
+def match_client(seed=1, latency=0.0):
+    tables = make_match_cohort(80, 10, seed=seed)
+    tables["Position"] = [{"CompanyID": cid, "Openings": 2} for cid in range(1, 11)]
+    return FakeSupabase(tables, latency=latency, functions={"apply_final_matches_diff": apply_final_matches_diff})
+
+
+class TestAllocationService(unittest.TestCase):
+    def setUp(self):
+        self.service = None
+
+    def tearDown(self):
+        if self.service:
+            self.service.shutdown()
+
+    def test_job_streams_phases_and_result(self):
+        client = FakeSupabase(make_allocation_cohort(150, 12, 4, seed=3))
+        self.service = AllocationService({"spring": client})
+        job = self.service.submit("interviews", "spring", {"allocator": "indexed"})
+        events = list(job.stream(timeout=10))
+
+        self.assertEqual(job.status, "succeeded")
+        self.assertEqual(job.result["students"], 150)
+        self.assertEqual(len(client.tables["InterviewAllocated"]), job.result["interviews"])
+        statuses = [event["status"] for event in events if "phase" not in event]
+        self.assertEqual(statuses, ["queued", "running", "succeeded"])
+        phases = [event["phase"] for event in events if "phase" in event and event["status"] == "finished"]
+        self.assertEqual(phases, ["load", "match", "report", "persist"])
+        self.assertEqual([event["seq"] for event in events], list(range(len(events))))
+        print("")
+        print("-----------------")
+        print("Service jobs stream their phases and result")
+        print("-----------------")
+
+    def test_sharded_job_in_worker_thread(self):
+        tables = make_multi_university_cohort(2, 75, 6, 4, seed=5)
+        self.service = AllocationService({"loop": FakeSupabase(tables), "sharded": FakeSupabase(tables)})
+#       The sharded allocator starts its processes from a service thread
+        jobs = [self.service.submit("interviews", cohort, {"allocator": cohort, "workers": 2})
+                for cohort in ("loop", "sharded")]
+        for job in jobs:
+            self.assertTrue(job.wait(60))
+        self.assertEqual([job.status for job in jobs], ["succeeded", "succeeded"])
+        self.assertEqual(jobs[1].result["interviews"], jobs[0].result["interviews"])
+
+    def test_one_job_per_cohort_at_a_time(self):
+        clients = {"a": match_client(1, latency=0.002), "b": match_client(2, latency=0.002)}
+        self.service = AllocationService(clients, workers=4)
+        jobs = [self.service.submit("final_match", cohort) for cohort in ("a", "a", "b", "a", "b")]
+        for job in jobs:
+            self.assertTrue(job.wait(10))
+        self.assertTrue(all(job.status == "succeeded" for job in jobs))
+
+#       Each job of a cohort starts after the one before it finished, in the order they were submitted
+        for cohort in ("a", "b"):
+            runs = [job for job in jobs if job.cohort == cohort]
+            for before, after in zip(runs, runs[1:]):
+                self.assertLessEqual(before.finished_at, after.started_at)
+#       while the other cohort's first job did not have to wait for them
+        self.assertLess(jobs[2].started_at, jobs[1].started_at)
+        print("")
+        print("-----------------")
+        print("Jobs of a cohort never overlap")
+        print("-----------------")
+
+    def test_reference_data_stays_warm(self):
+        client = match_client(3)
+        self.service = AllocationService({"default": client})
+        with self.assertLogs("backend.position_allocation", level="INFO"):
+            first = self.service.submit("final_match", params={"algorithm": "greedy"})
+            first.wait(10)
+            client.reset_counters()
+            second = self.service.submit("final_match")
+            second.wait(10)
+        self.assertEqual(second.status, "succeeded")
+        self.assertEqual(second.result["matches"], first.result["matches"])
+#       Position openings and company names come from the cohort's caches the second time
+        self.assertEqual(client.requests_by_table["Position"], 0)
+        self.assertEqual(client.requests_by_table["Company"], 0)
+
+    def test_names_expire_and_old_jobs_are_forgotten(self):
+        client = match_client(3)
+        self.service = AllocationService({"default": client}, entity_ttl=0, max_finished_jobs=2)
+        with self.assertLogs("backend.position_allocation", level="INFO"):
+            jobs = []
+            for _ in range(4):
+                client.reset_counters()
+                jobs.append(self.service.submit("final_match"))
+                jobs[-1].wait(10)
+#               With no time to live, every job reads company names again
+                self.assertEqual(client.requests_by_table["Company"], 1)
+#       Only the newest finished jobs are kept
+        self.assertEqual(list(self.service.jobs), [job.id for job in jobs[2:]])
+        self.assertIsNone(self.service.get(jobs[0].id))
+
+    def test_rejects_bad_jobs(self):
+        self.service = AllocationService({"default": match_client()})
+        with self.assertRaises(ValueError):
+            self.service.submit("everything")
+        with self.assertRaises(ValueError):
+            self.service.submit("interviews", params={"drop_tables": True})
+        with self.assertRaises(ValueError):
+            self.service.submit("final_match", cohort="unknown")
+        failing = self.service.submit("final_match", params={"algorithm": "random"})
+        failing.wait(10)
+        self.assertEqual(failing.status, "failed")
+        self.assertIn("random", failing.error)
+
+    def test_http_api(self):
+        self.service = AllocationService({"default": match_client(4)}, token="secret",
+                                         allowed_origin="http://localhost:5173")
+        server = self.service.make_server()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = "http://%s:%d" % server.server_address[:2]
+        body = json.dumps({"kind": "final_match"}).encode()
+        try:
+#           Jobs and their results need the token, and only the frontend's origin gets CORS access
+            for token in (None, "wrong"):
+                headers = {"Content-Type": "application/json"}
+                if token:
+                    headers["Authorization"] = f"Bearer {token}"
+                for request in (Request(url + "/jobs", data=body, headers=headers, method="POST"),
+                                Request(url + "/jobs", headers=headers)):
+                    with self.assertRaises(HTTPError) as error:
+                        urlopen(request, timeout=10)
+                    self.assertEqual(error.exception.code, 401)
+            self.assertEqual(self.service.jobs, {})
+            auth = {"Authorization": "Bearer secret"}
+
+            request = Request(url + "/jobs", data=body, method="POST",
+                              headers={"Content-Type": "application/json", "Authorization": "Bearer secret"})
+            with urlopen(request, timeout=10) as response:
+                self.assertEqual(response.status, 202)
+                self.assertEqual(response.headers["Access-Control-Allow-Origin"], "http://localhost:5173")
+                job = json.load(response)
+
+            with self.assertRaises(HTTPError) as error:
+                urlopen(f"{url}/jobs/{job['id']}/events", timeout=10)
+            self.assertEqual(error.exception.code, 401)
+            with urlopen(Request(f"{url}/jobs/{job['id']}/events", headers=auth), timeout=10) as response:
+                self.assertEqual(response.headers["Content-Type"], "text/event-stream")
+                events = [json.loads(line[len(b"data: "):]) for line in response if line.startswith(b"data: ")]
+            self.assertEqual(events[-1]["status"], "succeeded")
+            self.assertIn("persist", [event.get("phase") for event in events])
+
+            with urlopen(Request(f"{url}/jobs/{job['id']}", headers=auth), timeout=10) as response:
+                self.assertGreater(json.load(response)["result"]["matches"], 0)
+            with urlopen(Request(url + "/jobs", headers=auth), timeout=10) as response:
+                self.assertEqual(len(json.load(response)), 1)
+        finally:
+            server.shutdown()
+            server.server_close()
+        print("")
+        print("-----------------")
+        print("Allocation service works over HTTP")
+        print("-----------------")
+
+if __name__ == "__main__":
+    unittest.main()
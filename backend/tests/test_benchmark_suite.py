@@ -0,0 +1,67 @@
+'''
+Backend Unit Test
+Test the synthetic cohort generator and the benchmark suite's results and comparison
+'''
+# Python's built in unit testing
+import json
+import unittest
+
+from backend.benchmarks.bench_suite import compare_results, run_suite
+from backend.benchmarks.cohort import add_interview_rankings, make_allocation_cohort
+
+
+CONFIG = {"students": 120, "companies": 15, "prefs": 5, "popularity_skew": 1.0, "capacity_skew": 0.8,
+          "seed": 4, "allocator": "loop", "algorithm": "greedy", "latency_ms": 0.0}
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def test_cohort_is_seeded(self):
+        tables = make_allocation_cohort(200, 20, 5, seed=1, capacity_skew=1.0)
+        self.assertEqual(tables, make_allocation_cohort(200, 20, 5, seed=1, capacity_skew=1.0))
+        self.assertNotEqual(tables, make_allocation_cohort(200, 20, 5, seed=2, capacity_skew=1.0))
+
+#       Skewed capacities differ between companies, but every company keeps a position
+        counts = {row["CompanyID"]: row["Openings"] for row in tables["Position"]}
+        self.assertEqual(len(counts), 20)
+        self.assertTrue(all(count >= 1 for count in counts.values()))
+        self.assertGreater(len(set(counts.values())), 1)
+        flat = make_allocation_cohort(200, 20, 5, seed=1)
+        self.assertEqual(sum(row["Openings"] for row in flat["Position"]), 40)
+
+        tables["InterviewAllocated"] = [{"StudentID": 1, "CompanyID": c} for c in (3, 5, 7)]
+        add_interview_rankings(tables, seed=1, missing_rate=0)
+        self.assertEqual(sorted(r["Rank"] for r in tables["StudentInterviewRank"]), [1, 2, 3])
+        self.assertEqual([r["Rank"] for r in tables["CompanyInterviewRank"]], [1, 1, 1])
+        print("")
+        print("-----------------")
+        print("Synthetic cohorts are reproducible from their seed")
+        print("-----------------")
+
+    def test_suite_reports_both_stages(self):
+        results = run_suite([CONFIG], trace_memory=True)
+        self.assertEqual([row["stage"] for row in results], ["interviews", "final_match"])
+        for row in results:
+            self.assertGreater(row["round_trips"], 0)
+            self.assertGreater(row["peak_memory_mb"], 0)
+            self.assertGreater(row["throughput_per_s"], 0)
+        self.assertEqual(results[0]["items"], 120)
+        self.assertGreater(results[1]["rows_written"], 0)
+#       The results are what gets written to the JSON file
+        report = json.loads(json.dumps({"results": results}))
+
+        lines, regressions = compare_results(report, report)
+        self.assertEqual(regressions, 0)
+        self.assertEqual(len(lines), 2)
+
+        slower = json.loads(json.dumps(report))
+        slower["results"][1]["round_trips"] += 5
+        lines, regressions = compare_results(report, slower)
+        self.assertEqual(regressions, 1)
+        self.assertIn("REGRESSION", lines[1])
+        print("")
+        print("-----------------")
+        print("Benchmark suite measures both stages and flags regressions")
+        print("-----------------")
+
+if __name__ == "__main__":
+    unittest.main()
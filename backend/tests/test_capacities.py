@@ -0,0 +1,75 @@
+'''
+Backend Unit Test
+Test that company capacities come from the Openings of each Position listing and are cached
+'''
+# Python's built in unit testing
+import unittest
+from unittest.mock import patch
+
+from backend import position_allocation
+from backend.interview_allocation import allocate_interviews
+from backend.capacities import CapacityCache, interview_capacities
+from backend.data_sources import SupabaseDataSource, InMemoryDataSource
+from backend.fake_supabase import FakeSupabase
+from backend.benchmarks.cohort import make_cohort
+
+
+class TestCapacities(unittest.TestCase):
+    def test_openings_read_per_company(self):
+        source = InMemoryDataSource({"Position": [{"CompanyID": 1, "Openings": 4}, {"CompanyID": 2, "Openings": None},
+                                                  {"CompanyID": 3, "Openings": 1}]})
+#       A listing without Openings is left to the default
+        self.assertEqual(source.load_company_positions(), {1: 4, 3: 1})
+
+    def test_interview_capacity_follows_positions(self):
+#       Everyone wants company 1, which has one listing with a single opening and so gets 3 interview slots
+        tables = make_cohort(10, 1, prefs_per_student=1, seed=7)
+        tables["Position"] = [{"CompanyID": 1, "Openings": 1}]
+        allocations = allocate_interviews(source=InMemoryDataSource(tables))
+        self.assertEqual(sum(len(c) for c in allocations.values()), 3)
+
+#       A listing is not an opening: without Openings the company keeps the default 6 slots
+        tables["Position"] = [{"CompanyID": 1, "Openings": None}]
+        allocations = allocate_interviews(source=InMemoryDataSource(tables))
+        self.assertEqual(sum(len(c) for c in allocations.values()), 6)
+
+#       An odd capacity is scaled before rounding: 2 openings keep all 5 slots, not 2 * (5 // 2)
+        tables["Position"] = [{"CompanyID": 1, "Openings": 2}]
+        self.assertEqual(interview_capacities({1: 2, 2: 3}, capacity=5), {1: 5, 2: 7})
+        for allocator in ("loop", "indexed"):
+            allocations = allocate_interviews(source=InMemoryDataSource(tables), capacity=5, allocator=allocator)
+            self.assertEqual(sum(len(c) for c in allocations.values()), 5)
+        print("")
+        print("-----------------")
+        print("Interview capacity read from Position table")
+        print("-----------------")
+
+    def test_cache_reused_within_ttl(self):
+        client = FakeSupabase({"Position": [{"CompanyID": 1, "Openings": 1}]})
+        cache = CapacityCache(ttl=300)
+
+        first = cache.get(SupabaseDataSource(client))
+        client.tables["Position"][0]["Openings"] = 2
+        second = cache.get(SupabaseDataSource(client))
+
+#       Second read served from the cache, until it is invalidated
+        self.assertEqual(first, second)
+#       One page of rows plus the empty page that ends the paged read
+        self.assertEqual(client.requests_by_table["Position"], 2)
+        cache.invalidate()
+        self.assertEqual(cache.get(SupabaseDataSource(client)), {1: 2})
+
+    def test_company_positions_count_uses_one_bulk_read(self):
+        client = FakeSupabase({"Position": [{"CompanyID": 1, "Openings": 3}, {"CompanyID": 2, "Openings": None}]})
+        position_allocation.positions_cache.invalidate()
+
+        with patch("backend.position_allocation.supabase", client):
+            counts = [position_allocation.get_company_positions_count(cid) for cid in (1, 2, 3)]
+
+#       Companies without a listing, or without Openings on it, keep the default of 2
+        self.assertEqual(counts, [3, 2, 2])
+        self.assertEqual(client.requests_by_table["Position"], 2)
+        position_allocation.positions_cache.invalidate()
+
+if __name__ == "__main__":
+    unittest.main()
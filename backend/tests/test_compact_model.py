@@ -0,0 +1,78 @@
+'''
+Backend Unit Test
+Test that the compact array-backed model holds the same data as the row dicts,
+and that both interview allocators give the same result from it
+'''
+# Python's built in unit testing
+import unittest
+
+from backend.allocation_core import allocate_interview_slots
+from backend.compact_model import IdIndex, Students
+from backend.indexed_allocation import allocate_interview_slots_indexed
+from backend.data_sources import InMemoryDataSource
+from backend.benchmarks.cohort import make_cohort
+
+
+class TestCompactModel(unittest.TestCase):
+    def test_id_index(self):
+        index = IdIndex([7, "a", 7, 3])
+        self.assertEqual(index.ids, [7, "a", 3])
+        self.assertEqual(index.add("a"), 1)
+        self.assertEqual(index.add(None), 3)
+        self.assertIn(3, index)
+        self.assertEqual(len(index), 4)
+
+    def test_preferences_match_rankings(self):
+        tables = make_cohort(400, 40, 8, seed=3, popularity_skew=1.0)
+#       NULL ranks, string IDs and a student nobody else references
+        tables["StudentRank1"][5]["Rank"] = None
+        for row in tables["StudentRank1"]:
+            row["StudentID"] = f"s{row['StudentID']}"
+        tables["StudentRank1"].append({"StudentID": "ghost", "CompanyID": 999, "Rank": 1})
+        source = InMemoryDataSource(tables)
+        rankings = source.load_student_rankings()
+        preferences = source.load_preferences()
+
+        self.assertEqual(len(preferences), len(rankings))
+        for student_id, prefs in rankings.items():
+            self.assertIn(student_id, preferences)
+            self.assertEqual(preferences[student_id], prefs)
+        self.assertIsNone(preferences.get("s-1"))
+        self.assertEqual(preferences.get("s-1", []), [])
+        with self.assertRaises(KeyError):
+            preferences["s-1"]
+        print("")
+        print("-----------------")
+        print("Compact preferences hold the same rankings")
+        print("-----------------")
+
+    def test_allocators_accept_preferences(self):
+        for seed, skew in enumerate([0.0, 1.0, 1.5]):
+            source = InMemoryDataSource(make_cohort(2000, 100, 10, seed=seed, popularity_skew=skew))
+            students = source.load_students()
+            expected = allocate_interview_slots(students, source.load_student_rankings())
+            preferences = source.load_preferences()
+
+            self.assertEqual(allocate_interview_slots(students, preferences), expected)
+            self.assertEqual(allocate_interview_slots_indexed(students, preferences), expected)
+#       Students with no rankings at all, in a different order from the numbering
+        source = InMemoryDataSource(make_cohort(50, 10, 3, seed=9))
+        students = list(reversed(source.load_students())) + [{"StudentID": "new"}]
+        self.assertEqual(allocate_interview_slots_indexed(students, source.load_preferences(), capacity=2),
+                         allocate_interview_slots(students, source.load_student_rankings(), capacity=2))
+        print("")
+        print("-----------------")
+        print("Both interview allocators give the same result from compact preferences")
+        print("-----------------")
+
+    def test_students_first_qca_wins(self):
+        rows = [{"StudentID": 2, "QCA": 3.5}, {"StudentID": 1, "QCA": 0}, {"StudentID": 2, "QCA": 1.0},
+                {"StudentID": 3, "QCA": None}]
+        index = IdIndex([9])
+        students = Students.from_rows(rows, index)
+        self.assertEqual(index.ids, [9, 2, 1, 3])
+        self.assertEqual(students.qca.tolist()[1], 3.5)
+        self.assertEqual(sum(1 for qca in students.qca.tolist() if qca == qca), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+'''
+Backend Unit Test
+Test that both allocation stages give the same result whichever data source they run against
+'''
+# Python's built in unit testing
+import os
+import tempfile
+import unittest
+
+from backend.interview_allocation import allocate_interviews
+from backend.position_allocation import run_final_match
+from backend.data_sources import SupabaseDataSource, InMemoryDataSource, FileDataSource
+from backend.fake_supabase import FakeSupabase
+from backend.benchmarks.cohort import make_cohort, make_match_cohort
+
+
+class TestDataSources(unittest.TestCase):
+    def test_interview_allocation_same_for_every_source(self):
+        tables = make_cohort(80, 15, prefs_per_student=5, seed=5)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cohort.json")
+#           Save the cohort as an offline snapshot file
+            file_source = FileDataSource(path)
+            file_source.tables = tables
+            file_source.flush()
+
+            results = [
+                allocate_interviews(source=SupabaseDataSource(FakeSupabase(tables))),
+                allocate_interviews(source=InMemoryDataSource(tables)),
+                allocate_interviews(source=FileDataSource(path)),
+            ]
+
+#           The file source persists its result for the next stage to read
+            saved = FileDataSource(path).load_interview_pairs()
+
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], results[2])
+        self.assertEqual(len(saved), sum(len(c) for c in results[0].values()))
+        print("")
+        print("-----------------")
+        print("Interview allocation identical across data sources")
+        print("-----------------")
+
+    def test_rankings_with_tied_ranks(self):
+#       Student 1 ranks two companies equally; pages of one row must still read both, in CompanyID order
+        rows = [{"StudentID": 1, "CompanyID": 9, "Rank": 1}, {"StudentID": 1, "CompanyID": 4, "Rank": 1},
+                {"StudentID": 1, "CompanyID": 7, "Rank": 2}, {"StudentID": 2, "CompanyID": 4, "Rank": 1}]
+        expected = {1: [{"CompanyID": 4, "Rank": 1}, {"CompanyID": 9, "Rank": 1}, {"CompanyID": 7, "Rank": 2}],
+                    2: [{"CompanyID": 4, "Rank": 1}]}
+        for source in (SupabaseDataSource(FakeSupabase({"StudentRank1": rows}), page_size=1),
+                       InMemoryDataSource({"StudentRank1": list(reversed(rows))})):
+            self.assertEqual(source.load_student_rankings(), expected)
+            self.assertEqual(source.load_preferences()[1], expected[1])
+        print("")
+        print("-----------------")
+        print("Tied ranks page in a total order")
+        print("-----------------")
+
+    def test_final_match_same_for_every_source(self):
+        tables = make_match_cohort(60, 10, seed=6)
+
+        supabase_matches = run_final_match(source=SupabaseDataSource(FakeSupabase(tables)))
+        memory_source = InMemoryDataSource(tables)
+        memory_matches = run_final_match(source=memory_source)
+
+        self.assertEqual(supabase_matches, memory_matches)
+        self.assertEqual(len(memory_source.tables["FinalMatches"]), len(memory_matches))
+        print("")
+        print("-----------------")
+        print("Final match identical across data sources")
+        print("-----------------")
+
+if __name__ == "__main__":
+    unittest.main()
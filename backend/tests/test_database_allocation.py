@@ -0,0 +1,171 @@
+'''
+Backend Unit Test
+Test the push-down interview allocation: the allocate_interviews database
+function (here its SQLite twin on the local PostgREST stand-in) must allocate
+exactly what the Python engine does, in one round trip. The migration itself
+runs against a throwaway Postgres database when ALLOCATION_TEST_POSTGRES_URL
+names a server, and is skipped otherwise
+'''
+# Python's built in unit testing
+import os
+import unittest
+import uuid
+
+from backend.benchmarks.cohort import make_allocation_cohort
+from backend.data_sources import InMemoryDataSource, SupabaseDataSource
+from backend.fake_supabase import FakeSupabase
+from backend.instrumentation import RunReport
+from backend.interview_allocation import allocate_interviews
+from backend.local_postgrest import FUNCTIONS, SCHEMA, LocalPostgREST
+
+try:
+    import psycopg
+    from psycopg.conninfo import make_conninfo
+except ImportError:
+    psycopg = None
+
+# A Postgres server the test may create and drop databases on, e.g. postgresql://postgres@localhost/postgres
+POSTGRES_URL = os.environ.get("ALLOCATION_TEST_POSTGRES_URL")
+MIGRATIONS = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "supabase", "migrations"))
+# The migrations the function needs, in the order they are applied
+ALLOCATION_MIGRATIONS = ["20261017110000_position_openings.sql", "20261017120000_allocate_interviews.sql"]
+POSTGRES_TYPES = {"INTEGER": "bigint", "REAL": "double precision", "TEXT": "text"}
+
+
+def pairs(rows):
+    return sorted((row["StudentID"], row["CompanyID"]) for row in rows)
+
+
+def edge_cohort():
+    tables = make_allocation_cohort(400, 30, 6, seed=7, popularity_skew=1.2, capacity_skew=1.0)
+#   Students without a QCA come first, equal QCAs go by StudentID, some students rank nothing
+    for row in tables["Student"][:20]:
+        row["QCA"] = None
+    for row in tables["Student"][20:60]:
+        row["QCA"] = 3.5
+    tables["StudentRank1"] = [row for row in tables["StudentRank1"] if row["StudentID"] % 37]
+#   Companies without a listing, or without Openings on it, fall back to the default capacity
+    tables["Position"] = [row for row in tables["Position"] if row["CompanyID"] % 4]
+    for row in tables["Position"][::5]:
+        row["Openings"] = None
+    return tables
+
+
+class TestDatabaseAllocation(unittest.TestCase):
+    def test_parity_with_python_engine(self):
+        tables = edge_cohort()
+        expected_source = InMemoryDataSource(tables)
+        with self.assertLogs("backend.interview_allocation", level="INFO"):
+            expected = allocate_interviews(source=expected_source)
+
+        with LocalPostgREST(tables, max_rows=100, functions=FUNCTIONS) as server:
+            report = RunReport("interviews")
+            with self.assertLogs("backend.interview_allocation", level="INFO") as logs:
+                allocations = allocate_interviews(source=SupabaseDataSource(server.client()), allocator="database",
+                                                  report=report)
+#           The same students in the same order, each with the same companies in the same order
+            self.assertEqual(list(allocations.items()), list(expected.items()))
+            self.assertEqual(pairs(server.rows("InterviewAllocated")),
+                             pairs(expected_source.tables["InterviewAllocated"]))
+            self.assertEqual(server.round_trips, 1)
+            self.assertEqual(report.counters["requests.allocate_interviews"], 1)
+            self.assertEqual(report.counters["students.no_preferences"], 10)
+            self.assertTrue(any("without preferences" in line for line in logs.output))
+        print("")
+        print("-----------------")
+        print("Database allocation matches the Python engine in one round trip")
+        print("-----------------")
+
+    def test_replaces_previous_allocations(self):
+        tables = make_allocation_cohort(50, 8, 4, seed=1)
+        tables["InterviewAllocated"] = [{"StudentID": 999, "CompanyID": 1}]
+        with LocalPostgREST(tables, functions=FUNCTIONS) as server:
+            source = SupabaseDataSource(server.client())
+            allocate_interviews(source=source, allocator="database")
+            first = server.rows("InterviewAllocated")
+            self.assertNotIn(999, [row["StudentID"] for row in first])
+            allocate_interviews(source=source, allocator="database")
+            self.assertEqual(pairs(server.rows("InterviewAllocated")), pairs(first))
+
+    def test_falls_back_to_python(self):
+        tables = edge_cohort()
+        expected = allocate_interviews(source=InMemoryDataSource(tables))
+
+#       No database function installed
+        client = FakeSupabase(tables)
+        with self.assertLogs("backend.interview_allocation", level="WARNING") as logs:
+            allocations = allocate_interviews(source=SupabaseDataSource(client), allocator="database")
+        self.assertEqual(allocations, expected)
+        self.assertTrue(any("allocate_interviews not found" in line for line in logs.output))
+        self.assertEqual(pairs(client.rows("InterviewAllocated")), pairs(
+            {"StudentID": sid, "CompanyID": cid} for sid, cids in expected.items() for cid in cids))
+
+#       No database at all
+        with self.assertLogs("backend.interview_allocation", level="WARNING"):
+            self.assertEqual(allocate_interviews(source=InMemoryDataSource(tables), allocator="database"), expected)
+        print("")
+        print("-----------------")
+        print("Database allocation falls back to Python where it cannot run")
+        print("-----------------")
+
+
+@unittest.skipUnless(POSTGRES_URL and psycopg, "needs ALLOCATION_TEST_POSTGRES_URL and psycopg")
+class TestAllocationMigration(unittest.TestCase):
+    def setUp(self):
+        name = f"allocation_test_{uuid.uuid4().hex[:12]}"
+        with psycopg.connect(POSTGRES_URL, autocommit=True) as admin:
+            admin.execute(f'create database "{name}"')
+        self.addCleanup(self.drop_database, name)
+        self.db = psycopg.connect(make_conninfo(POSTGRES_URL, dbname=name), autocommit=True)
+        self.addCleanup(self.db.close)
+
+    def drop_database(self, name):
+        with psycopg.connect(POSTGRES_URL, autocommit=True) as admin:
+            admin.execute(f'drop database if exists "{name}" with (force)')
+
+    def load(self, tables):
+#       The tables as they stand before the migrations: Position without Openings
+        for table in ("Student", "StudentRank1", "Position", "InterviewAllocated"):
+            columns = {c: t for c, t in SCHEMA[table].items() if (table, c) != ("Position", "Openings")}
+            self.db.execute(f'create table public."{table}" ('
+                            + ", ".join(f'"{c}" {POSTGRES_TYPES[t]}' for c, t in columns.items()) + ")")
+        for migration in ALLOCATION_MIGRATIONS:
+            with open(os.path.join(MIGRATIONS, migration)) as f:
+                self.db.execute(f.read())
+        for table, rows in tables.items():
+            if table not in ("Student", "StudentRank1", "Position", "InterviewAllocated") or not rows:
+                continue
+            columns = list(SCHEMA[table])
+            with self.db.cursor() as cursor:
+                cursor.executemany(
+                    f'insert into public."{table}" (' + ", ".join(f'"{c}"' for c in columns) + ") values ("
+                    + ", ".join(["%s"] * len(columns)) + ")",
+                    [[row.get(c) for c in columns] for row in rows])
+
+    def test_migration_matches_python_engine(self):
+        tables = edge_cohort()
+        tables["InterviewAllocated"] = [{"StudentID": 999, "CompanyID": 1}]
+        expected_source = InMemoryDataSource(tables)
+        with self.assertLogs("backend.interview_allocation", level="INFO"):
+            expected = allocate_interviews(source=expected_source)
+        self.load(tables)
+
+        result = self.db.execute("select public.allocate_interviews(6, 3, 2)").fetchone()[0]
+#       The plpgsql itself, not its SQLite twin, gives the Python engine's allocation
+        self.assertEqual([(row["StudentID"], row["CompanyIDs"]) for row in result], list(expected.items()))
+        self.assertEqual(sum(1 for row in result if not row["HasPreferences"]), 10)
+        written = self.db.execute('select "StudentID", "CompanyID" from public."InterviewAllocated"').fetchall()
+        self.assertEqual(sorted(written), pairs(expected_source.tables["InterviewAllocated"]))
+
+#       An odd capacity is scaled by Openings before rounding, as in Python
+        with self.assertLogs("backend.interview_allocation", level="INFO"):
+            expected = allocate_interviews(source=InMemoryDataSource(tables), capacity=5)
+        result = self.db.execute("select public.allocate_interviews(5, 3, 2)").fetchone()[0]
+        self.assertEqual([(row["StudentID"], row["CompanyIDs"]) for row in result], list(expected.items()))
+        print("")
+        print("-----------------")
+        print("allocate_interviews migration matches the Python engine on Postgres")
+        print("-----------------")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+'''
+Backend Unit Test
+Test the LRU entity cache: bulk fetches, eviction, invalidation, that names cost
+one request per run instead of one per row, and that QCAs are read fresh
+'''
+# Python's built in unit testing
+import unittest
+from unittest.mock import patch
+
+from backend import position_allocation
+from backend.data_sources import SupabaseDataSource
+from backend.entity_cache import EntityCache, LRUCache, company_names
+from backend.fake_supabase import FakeSupabase
+from backend.benchmarks.cohort import make_match_cohort
+
+
+def company_tables(n):
+    return {"Company": [{"CompanyID": cid, "CompanyName": f"Firm {cid}"} for cid in range(1, n + 1)]}
+
+
+class TestEntityCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = LRUCache(max_size=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+#       "b" is now the least recently used, so it goes first
+        cache.put("c", 3)
+        self.assertNotIn("b", cache)
+        self.assertEqual((cache.get("a"), cache.get("c"), len(cache)), (1, 3, 2))
+        self.assertEqual((cache.hits, cache.misses), (3, 0))
+
+    def test_bulk_fetch_and_invalidation(self):
+        client = FakeSupabase(company_tables(450))
+        cache = EntityCache(chunk_size=200)
+
+        names = company_names(client, list(range(1, 451)) + [999, 3, 3], cache)
+        self.assertEqual(names[7], "Firm 7")
+        self.assertEqual(names[999], "Company 999")
+#       451 distinct IDs in chunks of 200, and nothing more once cached (even the missing one)
+        self.assertEqual(client.round_trips, 3)
+        company_names(client, [5, 999], cache)
+        self.assertEqual(client.round_trips, 3)
+
+        client.tables["Company"][4]["CompanyName"] = "Renamed"
+        self.assertEqual(company_names(client, [5], cache)[5], "Firm 5")
+        cache.invalidate("Company", [5])
+        self.assertEqual(company_names(client, [5, 6], cache), {5: "Renamed", 6: "Firm 6"})
+        self.assertEqual(client.round_trips, 4)
+        cache.invalidate("Company")
+        company_names(client, [6], cache)
+        self.assertEqual(client.round_trips, 5)
+
+#       Another client never sees this client's rows
+        other = FakeSupabase({"Company": [{"CompanyID": 6, "CompanyName": "Elsewhere"}]})
+        self.assertEqual(company_names(other, [6], cache)[6], "Elsewhere")
+        print("")
+        print("-----------------")
+        print("Entity cache fetches in bulk and honours invalidation")
+        print("-----------------")
+
+    def test_bounded_size(self):
+        client = FakeSupabase(company_tables(50))
+        cache = EntityCache(max_size=10)
+        company_names(client, range(1, 51), cache)
+        self.assertEqual(len(cache.rows), 10)
+#       The most recent IDs are still cached
+        trips = client.round_trips
+        company_names(client, range(41, 51), cache)
+        self.assertEqual(client.round_trips, trips)
+
+    def test_qca_read_fresh_and_stats_lookups_cached(self):
+        tables = make_match_cohort(60, 12, seed=5)
+        client = FakeSupabase(tables)
+        student_id = tables["Student"][0]["StudentID"]
+        with patch("backend.position_allocation.supabase", client):
+            self.assertEqual(position_allocation.get_student_qca(student_id), tables["Student"][0]["QCA"])
+#           QCAs are not cached, so a corrected grade is seen straight away
+            client.tables["Student"][0]["QCA"] = 2.5
+            self.assertEqual(position_allocation.get_student_qca(student_id), 2.5)
+        self.assertEqual(client.requests_by_table["Student"], 2)
+
+#       The fill stats resolve every company's name with one request
+        client.reset_counters()
+        with self.assertLogs("backend.position_allocation", level="INFO") as logs:
+            position_allocation.run_final_match(source=SupabaseDataSource(client, entity_cache=EntityCache()))
+        self.assertEqual(client.requests_by_table["Company"], 1)
+        self.assertTrue(any("Company " in line and "positions filled" in line for line in logs.output))
+        print("")
+        print("-----------------")
+        print("QCAs read fresh and names resolved with one request per run")
+        print("-----------------")
+
+if __name__ == "__main__":
+    unittest.main()
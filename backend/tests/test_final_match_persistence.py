@@ -0,0 +1,101 @@
+'''
+Backend Unit Test
+Test that final matches are saved as a diff, in one atomic call where the
+database function exists and as batched deletes and inserts where it does not
+'''
+# Python's built in unit testing
+import unittest
+
+from backend.position_allocation import run_final_match
+from backend.data_sources import InMemoryDataSource, SupabaseDataSource
+from backend.fake_supabase import FakeSupabase, apply_final_matches_diff, sorted_rows
+from backend.bulk_writes import FINAL_MATCHES_FUNCTION
+from backend.benchmarks.cohort import make_match_cohort
+
+
+def change_a_match(client):
+    # The company behind the first stored match now ranks that student last
+    matched = client.tables["FinalMatches"][0]
+    for row in client.tables["CompanyInterviewRank"]:
+        if (row["StudentID"], row["CompanyID"]) == (matched["StudentID"], matched["CompanyID"]):
+            row["Rank"] = 99
+
+
+class TestFinalMatchPersistence(unittest.TestCase):
+    def setUp(self):
+        self.tables = make_match_cohort(80, 12, seed=51)
+
+    def expected_rows(self, client):
+        source = InMemoryDataSource(client.tables)
+        run_final_match(source=source)
+        return sorted_rows(source.tables["FinalMatches"])
+
+    def test_changes_applied_in_one_call(self):
+        client = FakeSupabase(self.tables, functions={FINAL_MATCHES_FUNCTION: apply_final_matches_diff})
+        run_final_match(source=SupabaseDataSource(client))
+        change_a_match(client)
+        expected = self.expected_rows(client)
+
+        client.reset_counters()
+        run_final_match(source=SupabaseDataSource(client))
+
+#       One function call carries the whole diff; the table is never cleared. Besides it,
+#       FinalMatches only sees the two page reads of the current matches (the dashboard
+#       views are written separately)
+        self.assertEqual(sorted_rows(client.tables["FinalMatches"]), expected)
+        self.assertEqual(client.requests["rpc"], 1)
+        self.assertEqual(client.requests_by_table["FinalMatches"], 2)
+        self.assertLess(client.rows_written, len(expected))
+        print("")
+        print("-----------------")
+        print("Final match diff applied in one call")
+        print("-----------------")
+
+    def test_fallback_without_the_database_function(self):
+        client = FakeSupabase(self.tables)
+        run_final_match(source=SupabaseDataSource(client))
+        change_a_match(client)
+        expected = self.expected_rows(client)
+
+        client.reset_counters()
+        run_final_match(source=SupabaseDataSource(client))
+
+#       Only the changed rows are deleted and inserted
+        self.assertEqual(sorted_rows(client.tables["FinalMatches"]), expected)
+        self.assertLess(client.rows_written, len(expected))
+        print("")
+        print("-----------------")
+        print("Final match diff written without the database function")
+        print("-----------------")
+
+    def test_unchanged_matches_write_nothing(self):
+        client = FakeSupabase(self.tables, functions={FINAL_MATCHES_FUNCTION: apply_final_matches_diff})
+        run_final_match(source=SupabaseDataSource(client))
+
+        client.reset_counters()
+        run_final_match(source=SupabaseDataSource(client))
+
+        self.assertEqual(client.requests["rpc"] + client.requests["delete"] + client.requests["insert"], 0)
+        print("")
+        print("-----------------")
+        print("Unchanged final matches not rewritten")
+        print("-----------------")
+
+    def test_failed_call_leaves_previous_matches(self):
+        client = FakeSupabase(self.tables, functions={FINAL_MATCHES_FUNCTION: apply_final_matches_diff})
+        run_final_match(source=SupabaseDataSource(client))
+        previous = sorted_rows(client.tables["FinalMatches"])
+        change_a_match(client)
+        client.fail_when = lambda query: query.action == "rpc"
+
+#       run_final_match reports the failed save; readers still see the old matches
+        run_final_match(source=SupabaseDataSource(client, retry_delay=0))
+
+        self.assertEqual(sorted_rows(client.tables["FinalMatches"]), previous)
+        print("")
+        print("-----------------")
+        print("Failed save left the previous final matches")
+        print("-----------------")
+
+if __name__ == "__main__":
+    unittest.main()
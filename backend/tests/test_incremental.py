@@ -0,0 +1,106 @@
+'''
+Backend Unit Test
+Test that incremental re-allocation gives the same result as a full run while
+recomputing and writing only what a ranking change affects
+'''
+# Python's built in unit testing
+import unittest
+
+from backend.interview_allocation import allocate_interviews
+from backend.position_allocation import run_final_match
+from backend.data_sources import InMemoryDataSource, SupabaseDataSource
+from backend.fake_supabase import FakeSupabase, sorted_rows
+from backend.incremental import allocate_interviews_incremental, run_final_match_incremental, diff_rows
+from backend.benchmarks.cohort import make_cohort, make_match_cohort
+
+
+class TestIncremental(unittest.TestCase):
+    def test_late_ranking_change_recomputes_from_that_student(self):
+        tables = make_cohort(200, 80, prefs_per_student=5, seed=41)
+        client = FakeSupabase(tables)
+        source = SupabaseDataSource(client)
+        first_run, state = allocate_interviews_incremental(source)
+
+#       A student late in the QCA order withdraws their preference for one of their interviews
+        late = [s["StudentID"] for s in source.load_students()][150:]
+        late = next(sid for sid in late if first_run[sid])
+        client.tables["StudentRank1"] = [r for r in client.tables["StudentRank1"]
+                                         if (r["StudentID"], r["CompanyID"]) != (late, first_run[late][0])]
+
+        client.reset_counters()
+        allocations, state = allocate_interviews_incremental(source, state)
+
+        expected = allocate_interviews(source=InMemoryDataSource(client.tables))
+        self.assertEqual(allocations, expected)
+        self.assertEqual(sorted_rows(client.tables["InterviewAllocated"]),
+                         sorted_rows(InMemoryDataSource(client.tables).load_interview_pairs()))
+#       Only a handful of rows are rewritten instead of the whole table
+        self.assertGreater(client.rows_written, 0)
+        self.assertLess(client.rows_written, len(client.tables["InterviewAllocated"]) // 4)
+        print("")
+        print("-----------------")
+        print("Late ranking change recomputed incrementally")
+        print("-----------------")
+
+    def test_interviews_match_a_full_run_after_qca_change(self):
+        tables = make_cohort(120, 15, prefs_per_student=5, seed=42)
+        source = InMemoryDataSource(tables)
+        _, state = allocate_interviews_incremental(source)
+
+#       Moving a student up the QCA order changes everyone after their new place
+        source.tables["Student"][5]["QCA"] = 4.2
+        allocations, _ = allocate_interviews_incremental(source, state)
+
+        self.assertEqual(allocations, allocate_interviews(source=InMemoryDataSource(source.tables)))
+        print("")
+        print("-----------------")
+        print("QCA change reallocated like a full run")
+        print("-----------------")
+
+    def test_final_match_writes_only_the_diff(self):
+        tables = make_match_cohort(80, 12, seed=43)
+        client = FakeSupabase(tables)
+        source = SupabaseDataSource(client)
+        _, state = run_final_match_incremental(source)
+
+#       Nothing changed: nothing is written
+        client.reset_counters()
+        _, state = run_final_match_incremental(source, state)
+        self.assertEqual(client.requests["insert"] + client.requests["delete"], 0)
+
+#       One company changes its mind about a student
+        matched = client.tables["FinalMatches"][0]
+        for row in client.tables["CompanyInterviewRank"]:
+            if (row["StudentID"], row["CompanyID"]) == (matched["StudentID"], matched["CompanyID"]):
+                row["Rank"] = 99
+        matches, state = run_final_match_incremental(source, state)
+
+        expected_source = InMemoryDataSource(client.tables)
+        self.assertEqual(matches, run_final_match(source=expected_source))
+        self.assertEqual(sorted_rows(client.tables["FinalMatches"]),
+                         sorted_rows(expected_source.tables["FinalMatches"]))
+        self.assertLess(client.rows_written, len(matches))
+        print("")
+        print("-----------------")
+        print("Final match diff written")
+        print("-----------------")
+
+    def test_diff_rows_by_key(self):
+        current = [{"StudentID": 1, "CompanyID": 1, "CombinedScore": 2},
+                   {"StudentID": 2, "CompanyID": 1, "CombinedScore": 3}]
+        desired = [{"StudentID": 1, "CompanyID": 1, "CombinedScore": 2},
+                   {"StudentID": 2, "CompanyID": 1, "CombinedScore": 4},
+                   {"StudentID": 3, "CompanyID": 2, "CombinedScore": 2}]
+
+        inserts, deleted = diff_rows(current, desired)
+
+#       Unchanged rows are left alone, a changed score is a delete plus an insert
+        self.assertEqual(deleted, [current[1]])
+        self.assertEqual(inserts, desired[1:])
+        print("")
+        print("-----------------")
+        print("Row diff computed by key")
+        print("-----------------")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+'''
+Backend Unit Test
+Test that the indexed interview allocator gives exactly the same result as the original loop
+'''
+# Python's built in unit testing
+import random
+import unittest
+
+from backend.allocation_core import allocate_interview_slots
+from backend.compact_model import Preferences
+from backend.indexed_allocation import allocate_interview_slots_indexed
+from backend.interview_allocation import allocate_interviews
+from backend.data_sources import InMemoryDataSource
+from backend.benchmarks.cohort import make_cohort
+
+
+class TestIndexedAllocation(unittest.TestCase):
+    def assertSameAllocation(self, students, rankings, **kwargs):
+        self.assertEqual(allocate_interview_slots_indexed(students, rankings, **kwargs),
+                         allocate_interview_slots(students, rankings, **kwargs))
+
+    def test_matches_loop_on_random_cohorts(self):
+        for seed, skew in enumerate([0.0, 0.5, 1.0, 1.5]):
+            source = InMemoryDataSource(make_cohort(5000, 200, 20, seed=seed, popularity_skew=skew))
+            students = source.load_students()
+            rankings = source.load_student_rankings()
+            rng = random.Random(seed)
+            capacities = {cid: rng.randint(0, 8) for cid in range(1, 201) if rng.random() < 0.5}
+
+            self.assertSameAllocation(students, rankings)
+            self.assertSameAllocation(students, rankings, capacities=capacities, per_student=4)
+        print("")
+        print("-----------------")
+        print("Indexed allocator matches the original loop")
+        print("-----------------")
+
+    def test_matches_loop_on_edge_cases(self):
+#       String and mixed IDs, duplicate preferences, students without preferences
+        students = [{"StudentID": sid} for sid in ["a", "b", "c", "d", 5]]
+        rankings = {
+            "a": [{"CompanyID": "x"}, {"CompanyID": "x"}, {"CompanyID": 7}],
+            "b": [{"CompanyID": "x"}, {"CompanyID": 7}, {"CompanyID": "y"}, {"CompanyID": "x"}],
+            "d": [{"CompanyID": "y"}],
+            5: [{"CompanyID": 7}, {"CompanyID": "z"}],
+        }
+        for capacity in (0, 1, 2, 3):
+            self.assertSameAllocation(students, rankings, capacity=capacity)
+        self.assertSameAllocation(students, {})
+        self.assertSameAllocation([], rankings)
+
+    def test_no_preferences_at_all(self):
+#       An empty StudentRank1 gives empty CSR arrays rather than an IndexError
+        students = [{"StudentID": 1, "QCA": 3.0}, {"StudentID": 2, "QCA": 2.0}]
+        preferences = Preferences.from_rows([])
+        start, company = preferences.in_order([1, 2])
+        self.assertEqual(start.tolist(), [0, 0, 0])
+        self.assertEqual(len(company), 0)
+        self.assertSameAllocation(students, preferences)
+        for allocator in ("loop", "indexed"):
+            self.assertEqual(allocate_interviews(source=InMemoryDataSource({"Student": students}),
+                                                 allocator=allocator), {1: [], 2: []})
+        print("")
+        print("-----------------")
+        print("Indexed allocator handles a cohort without preferences")
+        print("-----------------")
+
+    def test_allocate_interviews_indexed_mode(self):
+        tables = make_cohort(300, 30, 10, seed=11, popularity_skew=1.0)
+        self.assertEqual(allocate_interviews(source=InMemoryDataSource(tables), allocator="indexed"),
+                         allocate_interviews(source=InMemoryDataSource(tables)))
+
+if __name__ == "__main__":
+    unittest.main()
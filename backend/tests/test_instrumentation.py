@@ -0,0 +1,68 @@
+'''
+Backend Unit Test
+Test that run reports time each phase, count requests the way the database sees
+them, and that per-student output only happens when debug logging is on
+'''
+# Python's built in unit testing
+import json
+import unittest
+
+from backend.interview_allocation import allocate_interviews
+from backend.position_allocation import run_final_match
+from backend.data_sources import SupabaseDataSource
+from backend.fake_supabase import FakeSupabase, apply_final_matches_diff
+from backend.instrumentation import RunReport
+from backend.benchmarks.cohort import make_cohort, make_match_cohort
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_interview_report_counts_requests(self):
+        client = FakeSupabase(make_cohort(300, 20, 5, seed=2))
+        source = SupabaseDataSource(client, page_size=100)
+        report = RunReport("interviews")
+        allocations = allocate_interviews(source=source, report=report)
+
+#       Counted on the wrapped client, so the totals agree with what the database saw
+        self.assertEqual(report.counters["round_trips"], client.round_trips)
+        self.assertEqual(report.counters["rows_read"], client.rows_read)
+        self.assertEqual(report.counters["rows_written"], client.rows_written)
+        self.assertEqual(report.counters["requests.StudentRank1"], client.requests_by_table["StudentRank1"])
+        self.assertEqual(report.counters["students"], len(allocations))
+        self.assertEqual(sum(n for name, n in report.counters.items() if name.startswith("students.")),
+                         len(allocations))
+        self.assertEqual(list(report.phases), ["load", "match", "report", "persist"])
+#       The original client is put back afterwards
+        self.assertIs(source.client, client)
+        print("")
+        print("-----------------")
+        print("Run report counts every round trip and row")
+        print("-----------------")
+
+    def test_final_match_report_with_profiles(self):
+        client = FakeSupabase(make_match_cohort(100, 10, seed=3),
+                              functions={"apply_final_matches_diff": apply_final_matches_diff})
+        report = RunReport("final_match", profile=True, trace_memory=True)
+        with self.assertLogs("backend.position_allocation", level="INFO"):
+            matches = run_final_match(source=SupabaseDataSource(client), report=report)
+
+        self.assertEqual(report.counters["matches"], len(matches))
+        self.assertEqual(report.counters["requests.apply_final_matches_diff"], 1)
+        for phase in ("load", "score", "match", "persist", "report"):
+            self.assertIn(phase, report.phases)
+        data = json.loads(json.dumps(report.to_dict()))
+        self.assertTrue(data["profile"])
+        self.assertGreater(data["memory"]["peak_mb"], 0)
+        self.assertGreater(data["wall_time_s"], 0)
+
+    def test_per_student_lines_only_at_debug(self):
+        tables = make_cohort(40, 5, 3, seed=1)
+        with self.assertLogs("backend.interview_allocation", level="DEBUG") as logs:
+            allocate_interviews(source=SupabaseDataSource(FakeSupabase(tables)))
+        self.assertEqual(sum(1 for line in logs.output if "Student " in line and "DEBUG" in line), 40)
+
+        with self.assertLogs("backend.interview_allocation", level="INFO") as logs:
+            allocate_interviews(source=SupabaseDataSource(FakeSupabase(tables)))
+        self.assertFalse(any("DEBUG" in line for line in logs.output))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,9 +4,11 @@ Test to ensure that the interview allocation proccess is functional
 '''
 # Python's built in unit testing
 import unittest
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 # Function being tested
-from backend.interview_allocation import get_sorted_students
+from backend.interview_allocation import get_sorted_students, allocate_interviews
+from backend.fake_supabase import FakeSupabase, FakeAPIError
+from backend.benchmarks.cohort import make_cohort
 
 # Test case for student sorting logic
 class TestInterviewAllocation(unittest.TestCase):
@@ -16,10 +18,14 @@ class TestInterviewAllocation(unittest.TestCase):
         '''
         Ensure students returned by get_sorted_students() are ordered by QCA descending.
         '''
-        mock_supabase.table().select().order().execute.return_value.data = [
-            {"StudentID": "s1", "QCA": 3.8},
-            {"StudentID": "s2", "QCA": 3.2},
-            {"StudentID": "s3", "QCA": 2.5},
+#       Students are read a page at a time until an empty page comes back
+        mock_supabase.table().select().order().order().range().execute.side_effect = [
+            MagicMock(data=[
+                {"StudentID": "s1", "QCA": 3.8},
+                {"StudentID": "s2", "QCA": 3.2},
+                {"StudentID": "s3", "QCA": 2.5},
+            ]),
+            MagicMock(data=[]),
         ]
 
 #       Confirm result is sorted in descending order
@@ -32,5 +38,95 @@ class TestInterviewAllocation(unittest.TestCase):
         print("Students sorted correctly by QCA")
         print("-----------------")
 
+    def test_allocate_interviews_prefetches_rankings_in_pages(self):
+        '''
+        Ensure allocate_interviews reads StudentRank1 in a fixed number of pages, not once per student.
+        '''
+        trips = {}
+        for n_students in (50, 400):
+            client = FakeSupabase(make_cohort(n_students, 20, prefs_per_student=5, seed=1))
+            with patch("backend.interview_allocation.supabase", client):
+                allocations = allocate_interviews(page_size=5000)
+            trips[n_students] = client.requests["select"]
+            self.assertEqual(len(allocations), n_students)
+
+#       Reads are one page of students plus one page of rankings, whatever the cohort size
+        self.assertEqual(trips[50], trips[400])
+        print("")
+        print("-----------------")
+        print("Rankings prefetched in bulk")
+        print("-----------------")
+
+    def test_allocations_written_in_chunks(self):
+        '''
+        Ensure allocations are written as bulk inserts of at most chunk_size rows.
+        '''
+        client = FakeSupabase(make_cohort(40, 10, prefs_per_student=4, seed=2))
+        with patch("backend.interview_allocation.supabase", client):
+            allocations = allocate_interviews(chunk_size=25)
+
+        total = sum(len(companies) for companies in allocations.values())
+        self.assertEqual(len(client.tables["InterviewAllocated"]), total)
+        self.assertEqual(client.requests["insert"], -(-total // 25))
+        print("")
+        print("-----------------")
+        print("Allocations written in chunks")
+        print("-----------------")
+
+    def test_failed_chunk_restores_previous_allocations(self):
+        '''
+        Ensure a chunk that keeps failing rolls InterviewAllocated back to its previous contents.
+        '''
+        tables = make_cohort(40, 10, prefs_per_student=4, seed=3)
+        previous = [{"StudentID": 1, "CompanyID": 1}, {"StudentID": 2, "CompanyID": 2}]
+        tables["InterviewAllocated"] = previous
+        client = FakeSupabase(tables)
+
+#       Fail every insert after the first chunk, but let the rollback through
+        client.fail_when = lambda q: q.action == "insert" and len(q.payload) == 10 and client.requests["insert"] > 1
+
+        with patch("backend.interview_allocation.supabase", client):
+            with self.assertRaises(FakeAPIError), self.assertLogs("backend.bulk_writes", level="WARNING") as logs:
+                allocate_interviews(chunk_size=10, retries=2, retry_delay=0)
+
+        self.assertEqual(client.tables["InterviewAllocated"], previous)
+#       The retries and the rollback are logged, not printed
+        self.assertTrue(any("retrying" in line for line in logs.output))
+        self.assertTrue(any("restoring the previous 2 rows" in line for line in logs.output))
+        print("")
+        print("-----------------")
+        print("Failed write rolled back")
+        print("-----------------")
+
+    def test_rollback_snapshot_paged_in_key_order(self):
+        '''
+        Ensure the rollback copy is paged in a total order, so a table of several pages is restored exactly.
+        '''
+        tables = make_cohort(40, 10, prefs_per_student=4, seed=3)
+#       Three rows per student over several pages: StudentID alone is not a total order
+        previous = [{"StudentID": sid, "CompanyID": cid} for sid in range(1, 801) for cid in (3, 1, 2)]
+        tables["InterviewAllocated"] = previous
+        client = FakeSupabase(tables)
+        orders = []
+
+        def fail_when(q):
+            if q.action == "select" and q.table_name == "InterviewAllocated":
+                orders.append(list(q.orders))
+#           Fail the second insert only, so the rollback gets through
+            return q.action == "insert" and client.requests["insert"] == 2
+        client.fail_when = fail_when
+
+        with patch("backend.interview_allocation.supabase", client):
+            with self.assertRaises(FakeAPIError):
+                allocate_interviews(chunk_size=10, retries=0, retry_delay=0)
+
+        self.assertGreater(len(orders), 2)
+        self.assertTrue(all(order == [("StudentID", False), ("CompanyID", False)] for order in orders))
+        self.assertCountEqual(client.tables["InterviewAllocated"], previous)
+        print("")
+        print("-----------------")
+        print("Rollback snapshot paged in key order")
+        print("-----------------")
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
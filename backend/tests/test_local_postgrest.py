@@ -0,0 +1,106 @@
+'''
+Backend Unit Test
+Test the local PostgREST stand-in: the real supabase client's queries, errors,
+and both allocation stages end to end over HTTP, matching FakeSupabase
+'''
+# Python's built in unit testing
+import time
+import unittest
+
+from postgrest.exceptions import APIError
+
+from backend.benchmarks.bench_suite import run_suite
+from backend.benchmarks.cohort import add_interview_rankings, make_allocation_cohort
+from backend.data_sources import SupabaseDataSource
+from backend.entity_cache import EntityCache
+from backend.fake_supabase import FakeSupabase, apply_final_matches_diff
+from backend.interview_allocation import allocate_interviews
+from backend.local_postgrest import LocalPostgREST
+from backend.position_allocation import run_final_match
+
+FUNCTIONS = {"apply_final_matches_diff": apply_final_matches_diff}
+
+
+class TestLocalPostgREST(unittest.TestCase):
+    def test_queries_through_supabase_client(self):
+        tables = {"Company": [{"CompanyID": cid, "CompanyName": f"Firm {cid}"} for cid in range(1, 8)],
+                  "Student": [{"StudentID": 1, "QCA": 3.2}, {"StudentID": 2, "QCA": None},
+                              {"StudentID": 3, "QCA": 2.5}]}
+        with LocalPostgREST(tables) as server:
+            client = server.client()
+            result = client.table("Company").select("CompanyID, CompanyName", count="exact") \
+                .gt("CompanyID", 2).order("CompanyID", desc=True).range(1, 2).execute()
+            self.assertEqual([row["CompanyID"] for row in result.data], [6, 5])
+            self.assertEqual(result.count, 5)
+            names = client.table("Company").select("CompanyName").in_("CompanyID", [2, 4, 99]).execute()
+            self.assertEqual(sorted(row["CompanyName"] for row in names.data), ["Firm 2", "Firm 4"])
+
+#           NULLs sort first when descending, as in Postgres
+            qcas = client.table("Student").select("StudentID").order("QCA", desc=True).execute()
+            self.assertEqual([row["StudentID"] for row in qcas.data], [2, 1, 3])
+
+            client.table("InterviewAllocated").insert([{"StudentID": 1, "CompanyID": 2},
+                                                       {"StudentID": 1, "CompanyID": 3}]).execute()
+            deleted = client.table("InterviewAllocated").delete().eq("CompanyID", 2).execute()
+            self.assertEqual(deleted.data, [{"StudentID": 1, "CompanyID": 2}])
+            self.assertEqual(server.rows("InterviewAllocated"), [{"StudentID": 1, "CompanyID": 3}])
+            self.assertEqual(server.requests["insert"], 1)
+            self.assertEqual(server.rows_written, 2)
+
+            with self.assertRaises(APIError) as error:
+                client.rpc("apply_final_matches_diff", {"deletes": [], "upserts": []}).execute()
+            self.assertEqual(error.exception.code, "PGRST202")
+            with self.assertRaises(APIError) as error:
+                client.table("Missing").select("*").execute()
+            self.assertEqual(error.exception.code, "42P01")
+        print("")
+        print("-----------------")
+        print("Local PostgREST answers the supabase client's queries")
+        print("-----------------")
+
+    def test_stages_match_fake_supabase(self):
+        tables = make_allocation_cohort(300, 25, 6, seed=3, capacity_skew=0.8)
+        with LocalPostgREST(tables, max_rows=100, functions=FUNCTIONS) as server:
+            client = server.client()
+            fake = FakeSupabase(tables, max_rows=100, functions={"apply_final_matches_diff": apply_final_matches_diff})
+            allocations = allocate_interviews(source=SupabaseDataSource(client, page_size=100))
+            self.assertEqual(allocations, allocate_interviews(source=SupabaseDataSource(fake, page_size=100)))
+#           The same queries, so the same number of round trips
+            self.assertEqual(server.round_trips, fake.round_trips)
+            self.assertEqual(sorted(map(tuple, map(dict.values, server.rows("InterviewAllocated")))),
+                             sorted(map(tuple, map(dict.values, fake.rows("InterviewAllocated")))))
+
+            tables = dict(tables, InterviewAllocated=fake.rows("InterviewAllocated"))
+            add_interview_rankings(tables, seed=3)
+            server.load_tables(tables)
+            fake = FakeSupabase(tables, functions={"apply_final_matches_diff": apply_final_matches_diff})
+            with self.assertLogs("backend.position_allocation", level="INFO"):
+                matches = run_final_match(source=SupabaseDataSource(client, entity_cache=EntityCache()))
+            self.assertEqual(matches, run_final_match(source=SupabaseDataSource(fake, entity_cache=EntityCache())))
+            self.assertEqual(server.requests_by_table["apply_final_matches_diff"], 1)
+            self.assertEqual(len(server.rows("FinalMatches")), len(matches))
+        print("")
+        print("-----------------")
+        print("Both stages run end to end over HTTP")
+        print("-----------------")
+
+    def test_latency_is_added_per_request(self):
+        with LocalPostgREST({"Student": [{"StudentID": 1, "QCA": 3.0}]}, latency=0.05) as server:
+            client = server.client()
+            start = time.perf_counter()
+            for _ in range(3):
+                client.table("Student").select("*").execute()
+            self.assertGreaterEqual(time.perf_counter() - start, 0.15)
+            self.assertEqual(server.round_trips, 3)
+
+    def test_bench_suite_over_http(self):
+        config = {"students": 80, "companies": 10, "prefs": 4, "popularity_skew": 1.0, "capacity_skew": 0.5,
+                  "seed": 2, "allocator": "loop", "algorithm": "greedy", "latency_ms": 0.0}
+        fake, http = run_suite([config], trace_memory=False), run_suite([dict(config, backend="http")],
+                                                                        trace_memory=False)
+        for fake_row, http_row in zip(fake, http):
+            self.assertEqual(fake_row["round_trips"], http_row["round_trips"])
+            self.assertEqual(fake_row["rows_written"], http_row["rows_written"])
+
+if __name__ == "__main__":
+    unittest.main()
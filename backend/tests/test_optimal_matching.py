@@ -0,0 +1,69 @@
+'''
+Backend Unit Test
+Test that the optimal matcher finds minimum-cost assignments within company capacities
+'''
+# Python's built in unit testing
+import itertools
+import random
+import unittest
+
+import numpy as np
+
+from backend.allocation_core import match_greedy
+from backend.optimal_matching import linear_sum_assignment, match_optimal
+from backend.position_allocation import run_final_match
+from backend.data_sources import InMemoryDataSource
+from backend.benchmarks.cohort import make_match_cohort
+
+
+class TestOptimalMatching(unittest.TestCase):
+    def test_assignment_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        for _ in range(100):
+            n_rows = int(rng.integers(1, 5))
+            n_cols = int(rng.integers(n_rows, 7))
+            cost = rng.integers(0, 10, (n_rows, n_cols)).astype(float)
+
+            rows, cols = linear_sum_assignment(cost)
+            best = min(sum(cost[i, p[i]] for i in range(n_rows))
+                       for p in itertools.permutations(range(n_cols), n_rows))
+            self.assertAlmostEqual(cost[rows, cols].sum(), best)
+            self.assertEqual(len(set(cols)), n_rows)
+
+    def test_optimal_beats_greedy_when_capacity_is_tight(self):
+#       Greedy gives company 1 to student 1 (score 2) and leaves student 2 unmatched
+        matches = [
+            {"StudentID": 1, "CompanyID": 1, "CombinedScore": 2, "QCA": 3.0},
+            {"StudentID": 1, "CompanyID": 2, "CombinedScore": 3, "QCA": 3.0},
+            {"StudentID": 2, "CompanyID": 1, "CombinedScore": 3, "QCA": 3.5},
+        ]
+        greedy, _ = match_greedy(matches, {1: 1, 2: 1})
+        optimal, allocations = match_optimal(matches, {1: 1, 2: 1})
+
+        self.assertEqual(len(greedy), 1)
+        self.assertEqual({(m["StudentID"], m["CompanyID"]) for m in optimal}, {(1, 2), (2, 1)})
+        self.assertEqual(allocations, {1: 1, 2: 1})
+        print("")
+        print("-----------------")
+        print("Optimal matcher places every student")
+        print("-----------------")
+
+    def test_optimal_run_respects_capacity_and_pairs(self):
+        rng = random.Random(8)
+        tables = make_match_cohort(120, 15, seed=8)
+        tables["Position"] = [{"CompanyID": cid, "Openings": rng.randint(1, 4)} for cid in range(1, 16)]
+        source = InMemoryDataSource(tables)
+
+        greedy = run_final_match(source=InMemoryDataSource(tables))
+        optimal = run_final_match(source=source, algorithm="optimal")
+
+        positions = source.load_company_positions()
+        interviewed = {(p["StudentID"], p["CompanyID"]) for p in tables["InterviewAllocated"]}
+        for cid in positions:
+            self.assertLessEqual(sum(1 for m in optimal if m["CompanyID"] == cid), positions[cid])
+        self.assertTrue(all((m["StudentID"], m["CompanyID"]) in interviewed for m in optimal))
+        self.assertEqual(len({m["StudentID"] for m in optimal}), len(optimal))
+        self.assertGreaterEqual(len(optimal), len(greedy))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+'''
+Backend Unit Test
+Test that paged reads return every row, even when the server caps rows per request
+'''
+# Python's built in unit testing
+import unittest
+
+from backend.pagination import fetch_pages, fetch_keyset
+from backend.fake_supabase import FakeSupabase
+
+
+class TestPagination(unittest.TestCase):
+    def setUp(self):
+        self.rows = [{"StudentID": i, "QCA": 4.0 - i / 100} for i in range(1, 48)]
+
+    def test_range_pages_read_past_a_server_row_cap(self):
+#       The server returns at most 7 rows however many the page asks for
+        client = FakeSupabase({"Student": self.rows}, max_rows=7)
+        read = list(fetch_pages(lambda: client.table("Student").select("*").order("StudentID"), page_size=10))
+
+        self.assertEqual(read, self.rows)
+        print("")
+        print("-----------------")
+        print("Range pagination read every row past the row cap")
+        print("-----------------")
+
+    def test_keyset_pages_read_every_row_in_key_order(self):
+        client = FakeSupabase({"Student": list(reversed(self.rows))})
+        read = list(fetch_keyset(lambda: client.table("Student").select("*"), "StudentID", page_size=10))
+
+        self.assertEqual(read, self.rows)
+#       Five full or partial pages plus the empty page that ends the read
+        self.assertEqual(client.round_trips, 6)
+        print("")
+        print("-----------------")
+        print("Keyset pagination read every row in key order")
+        print("-----------------")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,9 +6,35 @@ using patch to mock external dependeices such as Supabase
 
 # Python's built in unit testing
 import unittest
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 # Function being tested
 from backend.interview_allocation import get_sorted_students
+from backend import position_allocation
+from backend.fake_supabase import FakeSupabase
+from backend.benchmarks.cohort import make_match_cohort
+
+
+def reference_final_match():
+    '''
+    The original per-pair scoring: three lookups for every interview pair.
+    '''
+    matches = []
+    for pair in position_allocation.get_interview_pairs():
+        sid, cid = pair["StudentID"], pair["CompanyID"]
+        s_rank = position_allocation.get_student_rank(sid, cid)
+        c_rank = position_allocation.get_company_rank(cid, sid)
+        if s_rank is not None and c_rank is not None:
+            matches.append({"StudentID": sid, "CompanyID": cid, "CombinedScore": s_rank + c_rank,
+                            "QCA": position_allocation.get_student_qca(sid)})
+    matches.sort(key=lambda m: (m["CombinedScore"], -m["QCA"] if m["QCA"] is not None else 0))
+
+    assigned, filled, final = set(), {}, []
+    for m in matches:
+        if m["StudentID"] not in assigned and filled.get(m["CompanyID"], 0) < 2:
+            final.append(m)
+            assigned.add(m["StudentID"])
+            filled[m["CompanyID"]] = filled.get(m["CompanyID"], 0) + 1
+    return final
 
 # Test case for student sorting logic
 class TestPositionAllocation(unittest.TestCase):
@@ -16,8 +42,9 @@ class TestPositionAllocation(unittest.TestCase):
     @patch("backend.interview_allocation.supabase")
     def test_get_sorted_students(self, mock_supabase):
 #       Mock response return from Supabase
-        mock_supabase.table().select().order().execute.return_value.data = [
-            {"StudentID": "24123456", "QCA": 3.8}
+        mock_supabase.table().select().order().order().range().execute.side_effect = [
+            MagicMock(data=[{"StudentID": "24123456", "QCA": 3.8}]),
+            MagicMock(data=[]),
         ]
 
 #       Call the function
@@ -35,6 +62,27 @@ class TestPositionAllocation(unittest.TestCase):
         print("Supabase student allocation logic passed")
         print("-----------------")
 
+    def test_final_match_matches_per_pair_lookups(self):
+#       Build a cohort where some rankings and QCAs are missing
+        tables = make_match_cohort(60, 12, seed=4)
+        tables["Student"][0]["QCA"] = None
+        client = FakeSupabase(tables)
+
+        with patch("backend.position_allocation.supabase", client):
+            expected = reference_final_match()
+            client.reset_counters()
+            matches = position_allocation.run_final_match()
+
+#       Same matches, and rank/QCA tables read in one page each (plus the empty page
+#       that ends the read) instead of once per pair
+        self.assertEqual(matches, expected)
+        for table in ("StudentInterviewRank", "CompanyInterviewRank", "Student"):
+            self.assertEqual(client.requests_by_table[table], 2)
+        print("")
+        print("-----------------")
+        print("Final match identical with bulk-loaded ranks")
+        print("-----------------")
+
 #Run test when the script is excuted directly
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,212 @@
+'''
+Backend Unit Test
+Test the dashboard views written by the final match: fill stats, student
+outcomes and rank histograms, the same from every matcher and written as a diff.
+Their row level security runs against a throwaway Postgres database when
+ALLOCATION_TEST_POSTGRES_URL names a server, and is skipped otherwise
+'''
+# Python's built in unit testing
+import json
+import os
+import unittest
+import uuid
+
+from backend.benchmarks.cohort import make_match_cohort
+from backend.data_sources import InMemoryDataSource, SupabaseDataSource
+from backend.entity_cache import EntityCache
+from backend.fake_supabase import FakeSupabase, apply_final_matches_diff
+from backend.incremental import run_final_match_incremental
+from backend.instrumentation import RunReport
+from backend.local_postgrest import FUNCTIONS, LocalPostgREST
+from backend.position_allocation import run_final_match
+from backend.result_views import VIEW_COLUMNS, build_result_views
+
+try:
+    import psycopg
+    from psycopg.conninfo import make_conninfo
+except ImportError:
+    psycopg = None
+
+POSTGRES_URL = os.environ.get("ALLOCATION_TEST_POSTGRES_URL")
+VIEWS_MIGRATION = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "supabase", "migrations",
+                                               "20261017130000_result_views.sql"))
+# What the migration expects of a Supabase database: its roles, auth.jwt() and the User table
+SUPABASE_STUBS = '''
+do $$ begin
+    if not exists (select from pg_roles where rolname = 'anon') then create role anon nologin; end if;
+    if not exists (select from pg_roles where rolname = 'authenticated') then create role authenticated nologin; end if;
+    if not exists (select from pg_roles where rolname = 'service_role') then create role service_role nologin; end if;
+end $$;
+create schema auth;
+create function auth.jwt() returns jsonb language sql stable
+    as $f$ select coalesce(nullif(current_setting('request.jwt.claims', true), ''), '{}')::jsonb $f$;
+grant usage on schema auth to anon, authenticated;
+create table public."User" ("ID" bigint primary key, "Email" text, "FirstName" text, "Surname" text);
+'''
+
+
+def cohort(seed=8):
+    tables = make_match_cohort(90, 12, seed=seed)
+    tables["User"] = [{"ID": row["StudentID"], "FirstName": "First", "Surname": f"S{row['StudentID']}"}
+                      for row in tables["Student"]]
+    tables["Position"] = [{"CompanyID": cid, "Openings": 1 + cid % 3} for cid in range(1, 13)]
+    return tables
+
+
+def run_views(tables):
+    source = InMemoryDataSource(tables)
+    matches = run_final_match(source=source)
+    return matches, {table: source.tables.get(table, []) for table in VIEW_COLUMNS}
+
+
+class TestResultViews(unittest.TestCase):
+    def test_build_views(self):
+        matches = [{"StudentID": 1, "CompanyID": 10, "CombinedScore": 3, "QCA": 3.1}]
+        views = build_result_views(matches, {10: 2, 11: 1}, {10: 1, 11: 0}, {10: 2, 11: 1}, [1, 2], {(1, 10): (1, 2)},
+                                   {10: "Acme", 11: "Initech"}, {1: "Ann A", 2: "Bob B"})
+        self.assertEqual(views["CompanyFillStats"], [
+            {"CompanyID": 10, "CompanyName": "Acme", "Positions": 2, "Interviewees": 2, "Filled": 1, "FillRate": 0.5},
+            {"CompanyID": 11, "CompanyName": "Initech", "Positions": 1, "Interviewees": 1, "Filled": 0,
+             "FillRate": 0.0}])
+        self.assertEqual(views["StudentOutcome"][1], {
+            "StudentID": 2, "StudentName": "Bob B", "CompanyID": None, "CompanyName": None,
+            "CombinedScore": None, "StudentRank": None, "CompanyRank": None})
+        self.assertEqual(views["StudentOutcome"][0]["CompanyName"], "Acme")
+        self.assertEqual(views["RankHistogram"], [{"Side": "student", "Rank": 1, "Matches": 1},
+                                                  {"Side": "company", "Rank": 2, "Matches": 1}])
+
+    def test_views_agree_with_matches(self):
+        tables = cohort()
+        with self.assertLogs("backend.position_allocation", level="INFO"):
+            matches, views = run_views(tables)
+        interviewed = {row["StudentID"] for row in tables["InterviewAllocated"]}
+
+        self.assertEqual({row["StudentID"] for row in views["StudentOutcome"]}, interviewed)
+        matched = [row for row in views["StudentOutcome"] if row["CompanyID"] is not None]
+        self.assertEqual(len(matched), len(matches))
+        self.assertTrue(all(row["StudentName"].startswith("First S") for row in views["StudentOutcome"]))
+        self.assertTrue(all(row["StudentRank"] + row["CompanyRank"] == row["CombinedScore"] for row in matched))
+        self.assertEqual(sum(row["Filled"] for row in views["CompanyFillStats"]), len(matches))
+        self.assertEqual(sum(row["Interviewees"] for row in views["CompanyFillStats"]),
+                         len(tables["InterviewAllocated"]))
+        for side in ("student", "company"):
+            self.assertEqual(sum(row["Matches"] for row in views["RankHistogram"] if row["Side"] == side),
+                             len(matches))
+        print("")
+        print("-----------------")
+        print("Result views agree with the final matches")
+        print("-----------------")
+
+    def test_views_written_as_diff(self):
+        client = FakeSupabase(cohort(), functions={"apply_final_matches_diff": apply_final_matches_diff})
+        with self.assertLogs("backend.position_allocation", level="INFO"):
+            run_final_match(source=SupabaseDataSource(client, entity_cache=EntityCache()))
+        self.assertGreater(len(client.tables["StudentOutcome"]), 0)
+#       Every name comes from one bulk request per table
+        self.assertEqual(client.requests_by_table["User"], 1)
+        self.assertEqual(client.requests_by_table["Company"], 1)
+
+        report = RunReport("final_match")
+        with self.assertLogs("backend.position_allocation", level="INFO"):
+            run_final_match(source=SupabaseDataSource(client, entity_cache=EntityCache()), report=report)
+        self.assertEqual(report.counters["view_rows_written"], 0)
+
+    def test_views_skipped_when_matches_not_saved(self):
+        client = FakeSupabase(cohort(), functions={"apply_final_matches_diff": apply_final_matches_diff})
+        client.fail_when = lambda q: q.action == "rpc"
+        with self.assertLogs("backend.position_allocation", level="ERROR") as logs:
+            run_final_match(source=SupabaseDataSource(client, retries=0, entity_cache=EntityCache()))
+#       FinalMatches was not written, so neither are views describing it
+        self.assertEqual(client.rows("FinalMatches"), [])
+        self.assertTrue(all(client.rows(table) == [] for table in VIEW_COLUMNS))
+        self.assertTrue(any("result views left as they were" in line for line in logs.output))
+
+    def test_incremental_run_refreshes_views(self):
+        tables = cohort(10)
+        source = InMemoryDataSource(tables)
+        _, state = run_final_match_incremental(source)
+        self.assertGreater(len(source.tables["StudentOutcome"]), 0)
+
+#       A company changes its mind about its match; the views follow the new matches
+        matched = source.tables["FinalMatches"][0]
+        for row in source.tables["CompanyInterviewRank"]:
+            if (row["StudentID"], row["CompanyID"]) == (matched["StudentID"], matched["CompanyID"]):
+                row["Rank"] = 99
+        run_final_match_incremental(source, state)
+        with self.assertLogs("backend.position_allocation", level="INFO"):
+            expected = run_views(source.tables)[1]
+        for table, rows in expected.items():
+            self.assertCountEqual(source.tables[table], rows)
+
+    def test_views_over_http(self):
+        tables = cohort(9)
+        with self.assertLogs("backend.position_allocation", level="INFO"):
+            expected = run_views(tables)[1]
+        with LocalPostgREST(tables, max_rows=1000, functions=FUNCTIONS) as server:
+            with self.assertLogs("backend.position_allocation", level="INFO"):
+                run_final_match(source=SupabaseDataSource(server.client(), entity_cache=EntityCache()))
+            for table, rows in expected.items():
+                self.assertCountEqual(server.rows(table), rows)
+#           A dashboard reads one student's outcome with one query on the key
+            outcome = server.client().table("StudentOutcome").select("*").eq("StudentID", 5).execute()
+            self.assertEqual(len(outcome.data), 1)
+        print("")
+        print("-----------------")
+        print("Result views are written through the REST API")
+        print("-----------------")
+
+
+@unittest.skipUnless(POSTGRES_URL and psycopg, "needs ALLOCATION_TEST_POSTGRES_URL and psycopg")
+class TestResultViewPolicies(unittest.TestCase):
+    def setUp(self):
+        name = f"views_test_{uuid.uuid4().hex[:12]}"
+        with psycopg.connect(POSTGRES_URL, autocommit=True) as admin:
+            admin.execute(f'create database "{name}"')
+        self.addCleanup(self.drop_database, name)
+        self.db = psycopg.connect(make_conninfo(POSTGRES_URL, dbname=name), autocommit=True)
+        self.addCleanup(self.db.close)
+        self.db.execute(SUPABASE_STUBS)
+        with open(VIEWS_MIGRATION) as f:
+            self.db.execute(f.read())
+
+    def drop_database(self, name):
+        with psycopg.connect(POSTGRES_URL, autocommit=True) as admin:
+            admin.execute(f'drop database if exists "{name}" with (force)')
+
+    def read_as(self, role, email=None, table="StudentOutcome"):
+        with self.db.transaction():
+            self.db.execute(f"set local role {role}")
+            if email:
+                self.db.execute("select set_config('request.jwt.claims', %s, true)", [json.dumps({"email": email})])
+            return sorted(row[0] for row in self.db.execute(f'select * from public."{table}"'))
+
+    def test_outcomes_visible_to_their_student_and_company(self):
+        with self.db.cursor() as cursor:
+            cursor.executemany('insert into public."User" values (%s, %s, %s, %s)',
+                               [(1, "ann@example.com", "Ann", "A"), (2, "bob@example.com", "Bob", "B"),
+                                (10, "Hire@Acme.com", "Acme", "")])
+            cursor.executemany('insert into public."StudentOutcome" ("StudentID", "CompanyID") values (%s, %s)',
+                               [(1, 10), (2, 11), (3, None)])
+        self.db.execute('insert into public."CompanyFillStats" values (10, %s, 1, 1, 1, 1.0)', ["Acme"])
+
+#       A student sees their own outcome, a company those of the students matched with it
+        self.assertEqual(self.read_as("authenticated", "ann@example.com"), [1])
+        self.assertEqual(self.read_as("authenticated", "BOB@example.com"), [2])
+        self.assertEqual(self.read_as("authenticated", "hire@acme.com"), [1])
+        self.assertEqual(self.read_as("authenticated", "nobody@example.com"), [])
+        self.assertEqual(self.read_as("authenticated", "ann@example.com", "CompanyFillStats"), [10])
+
+#       The anon key reads nothing, and browsers write nothing
+        for table in ("StudentOutcome", "CompanyFillStats", "RankHistogram"):
+            with self.assertRaises(psycopg.errors.InsufficientPrivilege):
+                self.read_as("anon", table=table)
+        with self.assertRaises(psycopg.errors.InsufficientPrivilege), self.db.transaction():
+            self.db.execute("set local role authenticated")
+            self.db.execute('delete from public."StudentOutcome"')
+        print("")
+        print("-----------------")
+        print("Student outcomes are visible to their student and company only")
+        print("-----------------")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+'''
+Backend Unit Test
+Test seeded tie-breaking and the sharded allocator: components of the preference
+graph are allocated apart, in parallel, with the same result as one sequential run
+'''
+# Python's built in unit testing
+import random
+import unittest
+
+from backend.allocation_core import allocate_interview_slots, order_students
+from backend.benchmarks.cohort import make_allocation_cohort, make_multi_university_cohort
+from backend.data_sources import InMemoryDataSource
+from backend.interview_allocation import allocate_interviews
+from backend.sharded_allocation import allocate_interview_slots_sharded, plan_shards, preference_components
+
+
+def rankings_of(tables):
+    return InMemoryDataSource(tables).load_student_rankings()
+
+
+class TestShardedAllocation(unittest.TestCase):
+    def test_components(self):
+        rankings = {
+            1: [{"CompanyID": 10}, {"CompanyID": 11}],
+            2: [{"CompanyID": 12}],
+            3: [{"CompanyID": 11}, {"CompanyID": 13}],
+            4: [],
+            5: [{"CompanyID": 13}, {"CompanyID": 12}],
+            6: [{"CompanyID": 20}],
+        }
+#       Student 5 links 13 (student 3's) with 12 (student 2's), so only student 6 stands apart
+        self.assertEqual(preference_components(rankings), [[1, 2, 3, 5], [6]])
+        self.assertEqual(sorted(map(sorted, plan_shards(rankings, 4))), [[1, 2, 3, 5], [6]])
+        self.assertEqual(plan_shards(rankings, 1), [{1, 2, 3, 5, 6}])
+
+    def test_sharded_matches_sequential(self):
+        tables = make_multi_university_cohort(4, 150, 12, 5, seed=3, popularity_skew=1.0, capacity_skew=0.8)
+        students = InMemoryDataSource(tables).load_students()
+        rankings = rankings_of(tables)
+        capacities = {row["CompanyID"]: 2 for row in tables["Position"][::3]}
+        self.assertEqual(len(preference_components(rankings)), 4)
+
+        expected = allocate_interview_slots(students, rankings, capacities=capacities)
+        for workers in (1, 3):
+            result = allocate_interview_slots_sharded(students, rankings, capacities=capacities, max_workers=workers)
+#           Same allocations, with students in the same order
+            self.assertEqual(list(result.items()), list(expected.items()))
+
+#       One university is a single component, which still gives the same result
+        tables = make_allocation_cohort(200, 15, 5, seed=4)
+        students = InMemoryDataSource(tables).load_students()
+        self.assertEqual(allocate_interview_slots_sharded(students, rankings_of(tables), max_workers=2),
+                         allocate_interview_slots(students, rankings_of(tables)))
+        print("")
+        print("-----------------")
+        print("Sharded allocation matches a sequential run")
+        print("-----------------")
+
+    def test_seeded_tie_break(self):
+        students = [{"StudentID": sid, "QCA": qca} for sid, qca in
+                    [(1, 3.5), (2, 3.5), (3, None), (4, 3.9), (5, 3.5), (6, 3.5), (7, 2.0)]]
+        ordered = order_students(students, seed=1)
+        self.assertEqual(ordered[0]["StudentID"], 3)
+        self.assertEqual(ordered[1]["StudentID"], 4)
+        self.assertEqual(ordered[-1]["StudentID"], 7)
+        shuffled = list(students)
+        random.Random(0).shuffle(shuffled)
+        self.assertEqual(order_students(shuffled, seed=1), ordered)
+#       Other seeds order the tied students differently
+        orders = {tuple(s["StudentID"] for s in order_students(students, seed)) for seed in range(10)}
+        self.assertGreater(len(orders), 1)
+
+    def test_allocate_interviews_with_seed(self):
+        tables = make_multi_university_cohort(3, 80, 6, 4, seed=5)
+        expected = allocate_interviews(source=InMemoryDataSource(tables), tie_break_seed="spring")
+
+#       Rows stored in another order give the same allocation, with any allocator
+        shuffled = dict(tables, Student=list(tables["Student"]))
+        random.Random(1).shuffle(shuffled["Student"])
+        for allocator in ("loop", "indexed", "sharded"):
+            self.assertEqual(allocate_interviews(source=InMemoryDataSource(shuffled), allocator=allocator,
+                                                 tie_break_seed="spring", workers=2), expected)
+        self.assertNotEqual(list(allocate_interviews(source=InMemoryDataSource(tables))), list(expected))
+        with self.assertRaises(ValueError):
+            allocate_interviews(source=InMemoryDataSource(tables), allocator="database", tie_break_seed=1)
+        print("")
+        print("-----------------")
+        print("Seeded tie-breaking is reproducible across allocators")
+        print("-----------------")
+
+if __name__ == "__main__":
+    unittest.main()
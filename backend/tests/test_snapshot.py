@@ -0,0 +1,78 @@
+'''
+Backend Unit Test
+Test that tables loaded concurrently into a snapshot give the same allocations,
+with no more simultaneous reads than the concurrency limit allows
+'''
+# Python's built in unit testing
+import time
+import unittest
+
+from backend.interview_allocation import allocate_interviews
+from backend.position_allocation import run_final_match
+from backend.data_sources import SupabaseDataSource
+from backend.fake_supabase import FakeSupabase, FakeAPIError
+from backend.snapshot import FINAL_MATCH_TABLES, load_snapshot
+from backend.benchmarks.cohort import make_cohort, make_match_cohort
+
+
+class TestSnapshot(unittest.TestCase):
+    def test_interview_allocation_same_from_snapshot(self):
+        tables = make_cohort(80, 15, prefs_per_student=5, seed=11)
+        sequential_client = FakeSupabase(tables)
+        concurrent_client = FakeSupabase(tables)
+
+        expected = allocate_interviews(source=SupabaseDataSource(sequential_client))
+        allocations = allocate_interviews(source=SupabaseDataSource(concurrent_client), max_concurrency=3)
+
+#       Same allocation, and it is still written back to the database
+        self.assertEqual(allocations, expected)
+        self.assertEqual(concurrent_client.tables["InterviewAllocated"],
+                         sequential_client.tables["InterviewAllocated"])
+        print("")
+        print("-----------------")
+        print("Interview allocation identical from a concurrent snapshot")
+        print("-----------------")
+
+    def test_final_match_same_from_snapshot(self):
+        tables = make_match_cohort(60, 10, seed=12)
+        sequential_client = FakeSupabase(tables)
+        concurrent_client = FakeSupabase(tables)
+
+        expected = run_final_match(source=SupabaseDataSource(sequential_client))
+        matches = run_final_match(source=SupabaseDataSource(concurrent_client), max_concurrency=4)
+
+        self.assertEqual(matches, expected)
+        self.assertEqual(concurrent_client.tables["FinalMatches"], sequential_client.tables["FinalMatches"])
+        print("")
+        print("-----------------")
+        print("Final match identical from a concurrent snapshot")
+        print("-----------------")
+
+    def test_reads_overlap_within_the_limit(self):
+        client = FakeSupabase(make_match_cohort(40, 8, seed=13), latency=0.05)
+
+        start = time.perf_counter()
+        load_snapshot(SupabaseDataSource(client), FINAL_MATCH_TABLES, max_concurrency=3)
+        elapsed = time.perf_counter() - start
+
+#       Six tables of two requests each would take 0.6s one after another
+        self.assertEqual(client.peak_in_flight, 3)
+        self.assertLess(elapsed, 0.45)
+        print("")
+        print("-----------------")
+        print("Snapshot tables read concurrently within the limit")
+        print("-----------------")
+
+    def test_failed_read_is_raised(self):
+        client = FakeSupabase(make_match_cohort(20, 5, seed=14))
+        client.fail_when = lambda query: query.table_name == "Company"
+
+        with self.assertRaises(FakeAPIError):
+            load_snapshot(SupabaseDataSource(client), FINAL_MATCH_TABLES)
+        print("")
+        print("-----------------")
+        print("Failed snapshot read raised")
+        print("-----------------")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+'''
+Backend Unit Test
+Test that both allocation stages run from an offline NumPy snapshot bundle
+and give the same result as running against the database
+'''
+# Python's built in unit testing
+import os
+import tempfile
+import unittest
+
+from backend.interview_allocation import allocate_interviews
+from backend.position_allocation import run_final_match
+from backend.data_sources import SupabaseDataSource
+from backend.fake_supabase import FakeSupabase
+from backend.snapshot_bundle import BundleDataSource, export_snapshot, save_bundle, read_manifest
+from backend.benchmarks.cohort import make_cohort, make_match_cohort
+
+
+class TestSnapshotBundle(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cohort")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_tables_round_trip_with_nulls(self):
+        tables = make_match_cohort(30, 6, seed=21)
+        tables["Student"][0]["QCA"] = None
+        export_snapshot(SupabaseDataSource(FakeSupabase(tables)), self.path)
+
+        source = BundleDataSource(self.path)
+        students = {row["StudentID"]: row["QCA"] for row in source.read_rows("Student", ["StudentID", "QCA"], [])}
+
+#       NULLs survive the trip, and every other value comes back as it went in
+        self.assertEqual(students, {row["StudentID"]: row["QCA"] for row in tables["Student"]})
+        self.assertIsNone(students[tables["Student"][0]["StudentID"]])
+        self.assertEqual(read_manifest(self.path)["Company"]["rows"], len(tables["Company"]))
+        print("")
+        print("-----------------")
+        print("Snapshot bundle tables round trip with NULLs")
+        print("-----------------")
+
+    def test_interview_allocation_runs_offline(self):
+        tables = make_cohort(80, 15, prefs_per_student=5, seed=22)
+        client = FakeSupabase(tables)
+        export_snapshot(SupabaseDataSource(client), self.path)
+
+        expected = allocate_interviews(source=SupabaseDataSource(client))
+        allocations = allocate_interviews(source=BundleDataSource(self.path))
+
+#       The result is saved back into the bundle for the next stage
+        self.assertEqual(allocations, expected)
+        saved = BundleDataSource(self.path).load_interview_pairs()
+        self.assertEqual(len(saved), sum(len(c) for c in expected.values()))
+        print("")
+        print("-----------------")
+        print("Interview allocation identical from a snapshot bundle")
+        print("-----------------")
+
+    def test_final_match_runs_offline(self):
+        tables = make_match_cohort(60, 10, seed=23)
+        client = FakeSupabase(tables)
+        export_snapshot(SupabaseDataSource(client), self.path)
+
+        for algorithm in ("greedy", "stable"):
+            expected = run_final_match(source=SupabaseDataSource(client), algorithm=algorithm)
+            self.assertEqual(run_final_match(source=BundleDataSource(self.path), algorithm=algorithm), expected)
+        print("")
+        print("-----------------")
+        print("Final match identical from a snapshot bundle")
+        print("-----------------")
+
+    def test_mixed_column_types_rejected(self):
+        with self.assertRaises(ValueError):
+            save_bundle(self.path, {"Company": [{"CompanyID": 1, "CompanyName": "A"},
+                                                {"CompanyID": "2", "CompanyName": "B"}]})
+        print("")
+        print("-----------------")
+        print("Mixed column types rejected")
+        print("-----------------")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+'''
+Backend Unit Test
+Test that deferred acceptance produces a stable matching within company capacities
+'''
+# Python's built in unit testing
+import random
+import unittest
+
+from backend.stable_matching import match_stable
+from backend.position_allocation import run_final_match
+from backend.data_sources import InMemoryDataSource
+from backend.benchmarks.cohort import make_match_cohort
+
+
+def blocking_pairs(final, pairs, positions, student_ranks, company_ranks, qcas):
+    '''
+    Pairs where the student and the company would both rather be matched together.
+    '''
+    matched_to = {m["StudentID"]: m["CompanyID"] for m in final}
+    held = {}
+    for m in final:
+        held.setdefault(m["CompanyID"], []).append(m["StudentID"])
+
+    def company_key(sid, cid):
+        qca = qcas.get(sid)
+        return (company_ranks[(sid, cid)], -qca if qca is not None else 0)
+
+    blocking = []
+    for sid, cid in pairs:
+        current = matched_to.get(sid)
+        if current == cid:
+            continue
+        if current is not None and student_ranks[(sid, current)] <= student_ranks[(sid, cid)]:
+            continue
+        students = held.get(cid, [])
+        if len(students) < positions[cid] or any(company_key(sid, cid) < company_key(o, cid) for o in students):
+            blocking.append((sid, cid))
+    return blocking
+
+
+class TestStableMatching(unittest.TestCase):
+    def test_matching_is_stable(self):
+        for seed in range(5):
+            tables = make_match_cohort(150, 20, seed=seed)
+            source = InMemoryDataSource(tables)
+            student_ranks = source.load_rank_index("StudentInterviewRank")
+            company_ranks = source.load_rank_index("CompanyInterviewRank")
+            qcas = source.load_student_qcas()
+            rng = random.Random(seed)
+            positions = {cid: rng.randint(0, 4) for cid in range(1, 21)}
+
+            matches = [
+                {"StudentID": sid, "CompanyID": cid,
+                 "CombinedScore": student_ranks[(sid, cid)] + company_ranks[(sid, cid)], "QCA": qcas[sid]}
+                for sid, cid in student_ranks if (sid, cid) in company_ranks
+            ]
+            final, allocations = match_stable(matches, positions, student_ranks, company_ranks)
+
+            pairs = [(m["StudentID"], m["CompanyID"]) for m in matches]
+            self.assertEqual(blocking_pairs(final, pairs, positions, student_ranks, company_ranks, qcas), [])
+            self.assertEqual(len({m["StudentID"] for m in final}), len(final))
+            for cid, count in allocations.items():
+                self.assertLessEqual(count, positions[cid])
+        print("")
+        print("-----------------")
+        print("Deferred acceptance matching is stable")
+        print("-----------------")
+
+    def test_qca_breaks_company_rank_ties(self):
+#       Both students are ranked 1 by the company, which has one position
+        matches = [
+            {"StudentID": 1, "CompanyID": 9, "CombinedScore": 2, "QCA": 3.1},
+            {"StudentID": 2, "CompanyID": 9, "CombinedScore": 2, "QCA": 3.9},
+        ]
+        ranks = {(1, 9): 1, (2, 9): 1}
+        final, _ = match_stable(matches, {9: 1}, ranks, ranks)
+        self.assertEqual([m["StudentID"] for m in final], [2])
+
+    def test_run_final_match_stable_mode(self):
+        tables = make_match_cohort(80, 10, seed=9)
+        final = run_final_match(source=InMemoryDataSource(tables), algorithm="stable")
+        self.assertTrue(final)
+        self.assertEqual(len({m["StudentID"] for m in final}), len(final))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+'''
+Backend Unit Test
+Test that importing the allocation modules has no side effects and that the client is created once
+'''
+# Python's built in unit testing
+import os
+import subprocess
+import sys
+import unittest
+from unittest.mock import patch
+
+from backend import supabase_client
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+class TestSupabaseClient(unittest.TestCase):
+    def setUp(self):
+        supabase_client.reset_client()
+
+    def tearDown(self):
+        supabase_client.reset_client()
+
+    def test_import_is_side_effect_free(self):
+        '''
+        Importing the allocation modules must not print, read .env or load the supabase package.
+        '''
+        code = (
+            "import sys\n"
+            "import backend.interview_allocation, backend.position_allocation\n"
+            "print(sorted(m for m in ('supabase', 'dotenv') if m in sys.modules))\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "[]")
+        print("")
+        print("-----------------")
+        print("Allocation modules import without side effects")
+        print("-----------------")
+
+    @patch.dict(os.environ, {"VITE_SUPABASE_URL": '"https://example.supabase.co"', "VITE_SUPABASE_ANON_KEY": "key"})
+    @patch("backend.supabase_client.load_env")
+    @patch("supabase.create_client")
+    def test_client_created_once_and_reused(self, mock_create_client, mock_load_env):
+        first = supabase_client.get_client()
+        second = supabase_client.get_client()
+
+#       Quotes stripped and the client built only on first use
+        self.assertIs(first, second)
+        mock_create_client.assert_called_once_with("https://example.supabase.co", "key")
+        print("")
+        print("-----------------")
+        print("Supabase client cached")
+        print("-----------------")
+
+    @patch.dict(os.environ, {"VITE_SUPABASE_URL": "https://example.supabase.co", "VITE_SUPABASE_ANON_KEY": "anon",
+                             "SUPABASE_SERVICE_ROLE_KEY": "service"})
+    @patch("backend.supabase_client.load_env")
+    def test_service_role_key_preferred(self, mock_load_env):
+#       The backend writes tables browsers may only read
+        self.assertEqual(supabase_client.get_credentials(), ("https://example.supabase.co", "service"))
+        with patch.dict(os.environ, {"SUPABASE_SERVICE_ROLE_KEY": ""}):
+            self.assertEqual(supabase_client.get_credentials()[1], "anon")
+
+if __name__ == "__main__":
+    unittest.main()
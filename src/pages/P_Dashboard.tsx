@@ -18,7 +18,7 @@ function MatchedStudentsDisplay({companyID}: { companyID: number | null }) {
 
     /**
      * Fetches students matched with this company from the database
-     * Combines data from FinalMatches, User, and Student tables
+     * Names come from the StudentOutcome view; email and QCA from the User and Student tables
      */
     useEffect(() => {
         async function fetchMatchedStudents() {
@@ -27,10 +27,10 @@ function MatchedStudentsDisplay({companyID}: { companyID: number | null }) {
             try {
                 setLoadingMatches(true);
 
-                // First, get the student IDs from FinalMatches table
+                // First, get the matched students from the StudentOutcome view
                 const {data: matchesData, error: matchesError} = await supabase
-                    .from('FinalMatches')
-                    .select('StudentID')
+                    .from('StudentOutcome')
+                    .select('StudentID, StudentName')
                     .eq('CompanyID', companyID);
 
                 if (matchesError) {
@@ -46,10 +46,10 @@ function MatchedStudentsDisplay({companyID}: { companyID: number | null }) {
                 // Extract student IDs from the matches data
                 const studentIDs = matchesData.map(match => match.StudentID);
 
-                // Now fetch student details from User table
+                // Now fetch contact emails from User table
                 const {data: studentsData, error: studentsError} = await supabase
                     .from('User')
-                    .select('ID, FirstName, Surname, Email')
+                    .select('ID, Email')
                     .in('ID', studentIDs);
 
                 if (studentsError) {
@@ -67,12 +67,12 @@ function MatchedStudentsDisplay({companyID}: { companyID: number | null }) {
                     console.error('Error fetching QCA data:', qcaError);
                 }
 
-                // Combine the data from User and Student tables
-                const students = studentsData.map(user => {
-                    const studentQCA = qcaData?.find(q => q.StudentID === user.ID)?.QCA || null;
+                // Combine the view's names with the User and Student tables
+                const students = matchesData.map(match => {
+                    const studentQCA = qcaData?.find(q => q.StudentID === match.StudentID)?.QCA || null;
                     return {
-                        studentName: `${user.FirstName || ''} ${user.Surname || ''}`.trim(),
-                        studentEmail: user.Email || '',
+                        studentName: match.StudentName || '',
+                        studentEmail: studentsData.find(user => user.ID === match.StudentID)?.Email || '',
                         qca: studentQCA
                     };
                 });
@@ -151,6 +151,7 @@ export default function PartnerDashboard() {
     const [location, setLocation] = useState('');
     const [daysInPerson, setDaysInPerson] = useState<number>(0);
     const [residencyTerm, setResidencyTerm] = useState('R1'); // Default to R1
+    const [openings, setOpenings] = useState(''); // Empty leaves the default interview slots
     
     // UI state
     const [loading, setLoading] = useState(false);
@@ -258,6 +259,7 @@ export default function PartnerDashboard() {
                 setLocation(data.Location || '');
                 setDaysInPerson(data.DaysInPerson || 0);
                 setResidencyTerm(data.ResidencyTerm || 'R1');
+                setOpenings(data.Openings ? String(data.Openings) : '');
 
                 // Add to preview section
                 setJobsPreview([{
@@ -317,6 +319,7 @@ export default function PartnerDashboard() {
         setLocation('');
         setDaysInPerson(0);
         setResidencyTerm('R1');
+        setOpenings('');
     };
 
     /**
@@ -348,7 +351,8 @@ export default function PartnerDashboard() {
                     Description: description,
                     Email: contactEmail,
                     DaysInPerson: daysInPerson || null,
-                    ResidencyTerm: residencyTerm // Include residency term in upsert
+                    ResidencyTerm: residencyTerm, // Include residency term in upsert
+                    Openings: openings ? Number(openings) : null // Interview slots scale with openings
                 }, {
                     onConflict: 'CompanyID',
                     returning: 'minimal'
@@ -486,6 +490,13 @@ export default function PartnerDashboard() {
                                 <option value="R5">R5</option>
                             </select>
                         </div>
+                        {/* Openings */}
+                        <div className="flex flex-col gap-2">
+                            <label className="font-medium" htmlFor="openings">Number of Openings</label>
+                            <input id="openings" type="number" min="1" step="1" value={openings}
+                                   onChange={(e) => setOpenings(e.target.value)} placeholder="2"
+                                   className="rounded-md border border-white/30 bg-slate-700/40 p-3 outline-none focus:ring-2 focus:ring-indigo-500"/>
+                        </div>
                         <button type="submit" disabled={loading}
                                 className="w-full rounded-md bg-indigo-600 py-3 text-lg font-semibold hover:bg-indigo-500 focus:outline-none focus:ring-2 focus:ring-indigo-400 disabled:opacity-60">
                             {loading ? 'Saving…' : 'Create Listing'}
@@ -75,20 +75,16 @@ function FinalMatchDisplay() {
 
                 if (!userData) return;
 
-                // Check for match in FinalMatches table
-                // Join with Company table to get company name
+                // Read the student's outcome from the StudentOutcome view,
+                // which already holds the matched company's name
                 const {data: matchData} = await supabase
-                    .from('FinalMatches')
-                    .select(`
-                        CompanyID,
-                        Company:CompanyID (
-                            CompanyName
-                        )
-                    `)
+                    .from('StudentOutcome')
+                    .select('CompanyID, CompanyName')
                     .eq('StudentID', userData.ID)
                     .maybeSingle();
 
-                if (matchData) {
+                // Interviewed students without a match have no CompanyID
+                if (matchData?.CompanyID) {
                     // Get position details from Position table
                     const {data: positionData} = await supabase
                         .from('Position')
@@ -97,7 +93,7 @@ function FinalMatchDisplay() {
                         .maybeSingle();
 
                     setMatchedCompany({
-                        companyName: matchData.Company.CompanyName || 'Unknown Company',
+                        companyName: matchData.CompanyName || 'Unknown Company',
                         position: positionData?.Title || null
                     });
                 }
@@ -0,0 +1,41 @@
+-- Applies a FinalMatches diff from the allocation backend (backend/bulk_writes.py)
+-- in one transaction, so dashboards reading FinalMatches see either the previous
+-- matches or the new ones, never an empty or partly written table.
+--
+--   upserts: [{"StudentID", "CompanyID", "CombinedScore"}, ...]  rows to write
+--   deletes: [{"StudentID", "CompanyID"}, ...]                    keys to remove
+--
+-- Runs with the caller's privileges, so the same row level security applies as
+-- to the direct deletes and inserts the backend falls back to.
+create or replace function public.apply_final_matches_diff(upserts jsonb, deletes jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+    deleted_count integer;
+    upserted_count integer;
+begin
+    -- One allocation run writes at a time; readers are never blocked
+    lock table public."FinalMatches" in share row exclusive mode;
+
+    -- Remove keys that are gone, and the old version of every key being rewritten
+    delete from public."FinalMatches" f
+    using (
+        select "StudentID", "CompanyID" from jsonb_populate_recordset(null::public."FinalMatches", deletes)
+        union
+        select "StudentID", "CompanyID" from jsonb_populate_recordset(null::public."FinalMatches", upserts)
+    ) k
+    where f."StudentID" = k."StudentID" and f."CompanyID" = k."CompanyID";
+    get diagnostics deleted_count = row_count;
+
+    insert into public."FinalMatches" ("StudentID", "CompanyID", "CombinedScore")
+    select "StudentID", "CompanyID", "CombinedScore"
+    from jsonb_populate_recordset(null::public."FinalMatches", upserts);
+    get diagnostics upserted_count = row_count;
+
+    return jsonb_build_object('deleted', deleted_count, 'upserted', upserted_count);
+end;
+$$;
+
+-- Let PostgREST see the new function without a restart
+notify pgrst, 'reload schema';
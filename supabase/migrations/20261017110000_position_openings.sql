@@ -0,0 +1,10 @@
+-- How many students a company will take, on its job listing. Each company has
+-- one Position row (the recruiter dashboard upserts it on "CompanyID"), so the
+-- allocation backend reads capacity from this column rather than counting rows.
+-- Listings that leave it empty keep the default of 2 positions and 6 interview
+-- slots (backend/capacities.py).
+alter table public."Position"
+    add column if not exists "Openings" integer check ("Openings" >= 0);
+
+-- Let PostgREST see the new column without a restart
+notify pgrst, 'reload schema';
@@ -0,0 +1,98 @@
+-- Runs the greedy interview allocation inside the database and replaces
+-- InterviewAllocated with the result, in one transaction and one round trip
+-- (backend/interview_allocation.py, allocator "database").
+--
+-- Matches allocation_core.allocate_interview_slots: students in QCA order
+-- (highest first, ties by StudentID) each get up to per_student of their
+-- preferences, in rank order, at companies with a free slot. A company has
+-- capacity * Openings / default_positions slots (rounded down) from its Position
+-- listing's "Openings", or capacity if it lists none (see
+-- 20261017110000_position_openings.sql). Each student
+-- depends on the slots left by the ones before, so this is one ordered pass
+-- rather than a single set-based statement.
+--
+-- Returns one entry per student, in processing order, for the run report:
+--   [{"StudentID", "CompanyIDs": [...], "HasPreferences": true|false}, ...]
+create or replace function public.allocate_interviews(
+    capacity integer default 6,
+    per_student integer default 3,
+    default_positions integer default 2
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    student record;
+    pref record;
+    allocated jsonb;
+    -- Named apart from interview_outcomes' columns, which plpgsql would find ambiguous
+    student_has_preferences boolean;
+    student_seq integer := 0;
+    result jsonb;
+begin
+    -- One allocation run writes at a time; readers see the old table until commit
+    lock table public."InterviewAllocated" in share row exclusive mode;
+
+    create temporary table interview_slots (
+        company_id bigint primary key,
+        slots integer not null,
+        used integer not null default 0
+    ) on commit drop;
+    insert into interview_slots (company_id, slots)
+    select "CompanyID", sum("Openings") * capacity / default_positions from public."Position"
+    where "Openings" is not null group by "CompanyID";
+    insert into interview_slots (company_id, slots)
+    select distinct "CompanyID", capacity from public."StudentRank1"
+    on conflict (company_id) do nothing;
+
+    create temporary table interview_outcomes (
+        seq integer primary key,
+        student_id jsonb not null,
+        company_ids jsonb not null,
+        has_preferences boolean not null
+    ) on commit drop;
+
+    delete from public."InterviewAllocated";
+
+    for student in
+        select "StudentID" from public."Student" order by "QCA" desc nulls first, "StudentID"
+    loop
+        allocated := '[]'::jsonb;
+        student_has_preferences := false;
+        for pref in
+            select "CompanyID" from public."StudentRank1"
+            where "StudentID" = student."StudentID"
+            order by "Rank", "CompanyID"
+        loop
+            student_has_preferences := true;
+            update interview_slots set used = used + 1
+            where company_id = pref."CompanyID" and used < slots;
+            if found then
+                insert into public."InterviewAllocated" ("StudentID", "CompanyID")
+                values (student."StudentID", pref."CompanyID");
+                allocated := allocated || to_jsonb(pref."CompanyID");
+                exit when jsonb_array_length(allocated) >= per_student;
+            end if;
+        end loop;
+
+        student_seq := student_seq + 1;
+        insert into interview_outcomes
+        values (student_seq, to_jsonb(student."StudentID"), allocated, student_has_preferences);
+    end loop;
+
+    select coalesce(jsonb_agg(jsonb_build_object(
+               'StudentID', o.student_id,
+               'CompanyIDs', o.company_ids,
+               'HasPreferences', o.has_preferences) order by o.seq), '[]'::jsonb)
+    into result
+    from interview_outcomes o;
+    return result;
+end;
+$$;
+
+-- Ranked preferences are read one student at a time
+create index if not exists "StudentRank1_StudentID_Rank_idx"
+    on public."StudentRank1" ("StudentID", "Rank");
+
+-- Let PostgREST see the new function without a restart
+notify pgrst, 'reload schema';
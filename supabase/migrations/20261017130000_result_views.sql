@@ -0,0 +1,81 @@
+-- Dashboard views of the final match, written by run_final_match's persist phase
+-- (backend/result_views.py). Each is keyed for a single indexed read: a company's
+-- fill, one student's outcome, or the whole rank histogram.
+create table if not exists public."CompanyFillStats" (
+    "CompanyID" bigint primary key,
+    "CompanyName" text,
+    "Positions" integer not null,
+    "Interviewees" integer not null,
+    "Filled" integer not null,
+    "FillRate" double precision
+);
+
+create table if not exists public."StudentOutcome" (
+    "StudentID" bigint primary key,
+    "StudentName" text,
+    "CompanyID" bigint,
+    "CompanyName" text,
+    "CombinedScore" double precision,
+    "StudentRank" integer,
+    "CompanyRank" integer
+);
+
+-- Company dashboards list the students matched with them
+create index if not exists "StudentOutcome_CompanyID_idx" on public."StudentOutcome" ("CompanyID");
+
+create table if not exists public."RankHistogram" (
+    "Side" text not null check ("Side" in ('student', 'company')),
+    "Rank" integer not null,
+    "Matches" integer not null,
+    primary key ("Side", "Rank")
+);
+
+-- The StudentID or CompanyID of the signed-in user: the frontend links an auth
+-- user to their "User" row by email, and a user's ID is their StudentID or
+-- CompanyID. Security definer so the policies below work whatever "User"'s own
+-- row level security allows.
+create or replace function public.dashboard_user_id()
+returns bigint
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    select "ID" from public."User" where lower("Email") = lower(auth.jwt() ->> 'email') limit 1
+$$;
+
+revoke all on function public.dashboard_user_id() from public, anon;
+grant execute on function public.dashboard_user_id() to authenticated;
+
+-- Only signed-in users read the views, and nobody writes them from a browser: the
+-- allocation backend writes them with the service role key
+-- (SUPABASE_SERVICE_ROLE_KEY, see backend/supabase_client.py), which bypasses row
+-- level security. Fill stats and the histogram are aggregates, but a student
+-- outcome is one person's result, so it is visible to that student and to the
+-- company they were matched with only.
+alter table public."CompanyFillStats" enable row level security;
+alter table public."StudentOutcome" enable row level security;
+alter table public."RankHistogram" enable row level security;
+
+drop policy if exists "Dashboards read company fill stats" on public."CompanyFillStats";
+create policy "Dashboards read company fill stats" on public."CompanyFillStats"
+    for select to authenticated using (true);
+drop policy if exists "Dashboards read student outcomes" on public."StudentOutcome";
+drop policy if exists "Students and their company read an outcome" on public."StudentOutcome";
+create policy "Students and their company read an outcome" on public."StudentOutcome"
+    for select to authenticated
+    using ("StudentID" = (select public.dashboard_user_id()) or "CompanyID" = (select public.dashboard_user_id()));
+drop policy if exists "Dashboards read the rank histogram" on public."RankHistogram";
+create policy "Dashboards read the rank histogram" on public."RankHistogram"
+    for select to authenticated using (true);
+
+-- Supabase grants every privilege on new public tables by default; take back all but select
+revoke all on public."CompanyFillStats", public."StudentOutcome", public."RankHistogram"
+    from anon, authenticated;
+grant select on public."CompanyFillStats", public."StudentOutcome", public."RankHistogram"
+    to authenticated;
+grant select, insert, delete on public."CompanyFillStats", public."StudentOutcome", public."RankHistogram"
+    to service_role;
+
+-- Let PostgREST see the new tables without a restart
+notify pgrst, 'reload schema';